@@ -0,0 +1,281 @@
+# backend/audio.py
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Hugging Face audio classifier (real vs. fake speech, 16 kHz wav2vec2-style)
+AUDIO_MODEL_NAME = os.getenv("SCAMP_AUDIO_MODEL", "MelodyMachine/Deepfake-audio-detection-V2")
+
+# Scoring windows: fixed length of voiced audio, scored AUDIO_BATCH_WINDOWS at a time
+AUDIO_WINDOW_SECONDS = float(os.getenv("SCAMP_AUDIO_WINDOW_SECONDS", "4"))
+AUDIO_BATCH_WINDOWS = int(os.getenv("SCAMP_AUDIO_BATCH_WINDOWS", "4"))
+
+# Stop decoding once this much voiced audio has been scored
+AUDIO_MAX_SECONDS = float(os.getenv("SCAMP_AUDIO_MAX_SECONDS", "120"))
+
+# Decoder read size
+AUDIO_CHUNK_SECONDS = 1.0
+
+# Energy VAD: 30 ms frames louder than this count as speech; a few frames of
+# hangover keep word endings and short pauses inside the voiced stream
+VAD_FRAME_MS = 30
+VAD_THRESHOLD_DBFS = float(os.getenv("SCAMP_AUDIO_VAD_DBFS", "-45"))
+VAD_HANGOVER_FRAMES = 5
+
+# Early stop: after at least AUDIO_MIN_WINDOWS, stop when the mean window
+# score is this many standard errors clear of a risk threshold
+AUDIO_MIN_WINDOWS = int(os.getenv("SCAMP_AUDIO_MIN_WINDOWS", "2"))
+AUDIO_EARLY_STOP_Z = float(os.getenv("SCAMP_AUDIO_EARLY_STOP_Z", "2.0"))
+
+# A window's score never counts as more certain than this spread (0–100 scale),
+# so two identical windows can't end the analysis on their own
+AUDIO_MIN_STDDEV = 5.0
+
+
+class NoSpeech(Exception):
+    """Nothing above the VAD threshold in the whole file."""
+
+
+# ---------- Decode ----------
+
+def iter_audio_chunks(path: str, sample_rate: int, chunk_seconds: float = AUDIO_CHUNK_SECONDS) -> Iterator[np.ndarray]:
+    """
+    Mono float32 chunks at `sample_rate`. Uses torchaudio's streaming
+    FFmpeg reader (OGG/Opus, MP3, ...; resampled in the decoder) so only a
+    chunk is in memory and the caller can stop reading at any point.
+    torchaudio builds without StreamReader decode the whole file instead.
+    """
+    frames = max(1, int(sample_rate * chunk_seconds))
+    try:
+        from torchaudio.io import StreamReader
+    except ImportError:
+        StreamReader = None
+
+    if StreamReader is not None:
+        reader = StreamReader(path)
+        reader.add_basic_audio_stream(frames_per_chunk=frames, sample_rate=sample_rate, num_channels=1)
+        for (chunk,) in reader.stream():
+            if chunk is not None and chunk.shape[0]:
+                yield chunk[:, 0].numpy().astype(np.float32, copy=False)
+        return
+
+    import torchaudio
+
+    waveform, source_rate = torchaudio.load(path)
+    mono = waveform.mean(dim=0)
+    if source_rate != sample_rate:
+        mono = torchaudio.functional.resample(mono, source_rate, sample_rate)
+    samples = mono.numpy().astype(np.float32, copy=False)
+    for start in range(0, len(samples), frames):
+        yield samples[start:start + frames]
+
+
+# ---------- Voice activity ----------
+
+class EnergyVAD:
+    """
+    Frame-energy voice activity detector. feed() takes decoded chunks and
+    returns only the voiced samples (silent frames dropped, with hangover).
+    """
+
+    def __init__(self, sample_rate: int, threshold_dbfs: float = VAD_THRESHOLD_DBFS):
+        self.frame = max(1, sample_rate * VAD_FRAME_MS // 1000)
+        # Compare mean squares directly, no log per frame
+        self.threshold = 10.0 ** (threshold_dbfs / 10.0)
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._hangover = 0
+        self.frames_seen = 0
+        self.frames_voiced = 0
+
+    def feed(self, chunk: np.ndarray) -> np.ndarray:
+        samples = np.concatenate([self._carry, chunk]) if self._carry.size else chunk
+        usable = samples.size - samples.size % self.frame
+        self._carry = samples[usable:].copy()
+        if not usable:
+            return samples[:0]
+
+        frames = samples[:usable].reshape(-1, self.frame)
+        loud = np.mean(frames * frames, axis=1) >= self.threshold
+
+        # Extend each loud frame by VAD_HANGOVER_FRAMES (carried across chunks)
+        keep = loud.copy()
+        hang = self._hangover
+        for i, is_loud in enumerate(loud):
+            if is_loud:
+                hang = VAD_HANGOVER_FRAMES
+            elif hang:
+                keep[i] = True
+                hang -= 1
+        self._hangover = hang
+
+        self.frames_seen += len(keep)
+        self.frames_voiced += int(keep.sum())
+        return frames[keep].reshape(-1)
+
+
+# ---------- Model ----------
+
+@lru_cache(maxsize=1)
+def get_audio_model():
+    """Lazy-load the feature extractor + classifier once (CPU, eval mode)."""
+    from transformers import AutoFeatureExtractor, AutoModelForAudioClassification
+
+    logger.info("Loading HF audio model: %s", AUDIO_MODEL_NAME)
+    extractor = AutoFeatureExtractor.from_pretrained(AUDIO_MODEL_NAME)
+    model = AutoModelForAudioClassification.from_pretrained(AUDIO_MODEL_NAME)
+    model.eval()
+    return extractor, model
+
+
+def _fake_index(id2label: Dict[int, str]) -> int:
+    for i, label in id2label.items():
+        if "fake" in label.lower() or "spoof" in label.lower():
+            return int(i)
+    return int(max(id2label))
+
+
+def score_windows(windows: List[np.ndarray]) -> List[float]:
+    """One forward pass over a batch of equal-length windows -> fake scores (0–100)."""
+    import torch
+
+    extractor, model = get_audio_model()
+    inputs = extractor(windows, sampling_rate=extractor.sampling_rate, return_tensors="pt", padding=True)
+    with torch.inference_mode():
+        logits = model(**inputs).logits
+    probs = torch.softmax(logits, dim=-1)[:, _fake_index(model.config.id2label)]
+    return [float(p) * 100.0 for p in probs]
+
+
+# ---------- Pipeline ----------
+
+class AudioVerdict:
+    __slots__ = (
+        "score", "window_scores", "voiced_seconds", "decoded_seconds", "stopped_early", "truncated",
+        "elapsed_ms", "scoring_ms",
+    )
+
+    def __init__(
+        self, score, window_scores, voiced_seconds, decoded_seconds, stopped_early, elapsed_ms,
+        scoring_ms=0.0, truncated=False,
+    ):
+        self.score = score
+        self.window_scores = window_scores
+        self.voiced_seconds = voiced_seconds
+        self.decoded_seconds = decoded_seconds
+        # stopped_early: the verdict was confident before the audio ended;
+        # truncated: AUDIO_MAX_SECONDS of speech were scored without that
+        self.stopped_early = stopped_early
+        self.truncated = truncated
+        self.elapsed_ms = elapsed_ms
+        self.scoring_ms = scoring_ms
+
+    def top_window(self) -> int:
+        return int(np.argmax(self.window_scores))
+
+
+def confident(scores: List[float], low: float, high: float) -> bool:
+    """True once the mean is AUDIO_EARLY_STOP_Z standard errors past a threshold."""
+    n = len(scores)
+    if n < AUDIO_MIN_WINDOWS:
+        return False
+    mean = sum(scores) / n
+    spread = max(AUDIO_MIN_STDDEV, float(np.std(scores, ddof=1)) if n > 1 else AUDIO_MIN_STDDEV)
+    margin = AUDIO_EARLY_STOP_Z * spread / math.sqrt(n)
+    return mean - margin >= high or mean + margin < low
+
+
+def analyze_audio_stream(
+    chunks: Iterator[np.ndarray],
+    sample_rate: int,
+    low: float,
+    high: float,
+    scorer: Callable[[List[np.ndarray]], List[float]] = score_windows,
+) -> AudioVerdict:
+    """
+    Pull decoded chunks through the VAD, cut the voiced stream into fixed
+    windows, score them in batches and stop as soon as the running mean is
+    confidently below `low` or above `high` (or AUDIO_MAX_SECONDS of speech
+    have been scored). Raises NoSpeech if nothing was voiced.
+    """
+    started = time.perf_counter()
+    window = int(AUDIO_WINDOW_SECONDS * sample_rate)
+    max_windows = max(1, int(AUDIO_MAX_SECONDS / AUDIO_WINDOW_SECONDS))
+    vad = EnergyVAD(sample_rate)
+
+    buffer = np.zeros(0, dtype=np.float32)
+    pending: List[np.ndarray] = []
+    scores: List[float] = []
+    decoded = 0
+    stopped_early = truncated = False
+    scoring = 0.0
+
+    def flush() -> bool:
+        """Score pending windows; True when analysis can stop (confident or at the cap)."""
+        nonlocal scoring, stopped_early, truncated
+        mark = time.perf_counter()
+        # Never score past the cap, even part-way through a batch
+        scores.extend(scorer(pending[: max_windows - len(scores)]))
+        scoring += time.perf_counter() - mark
+        pending.clear()
+        if confident(scores, low, high):
+            stopped_early = True
+        elif len(scores) >= max_windows:
+            truncated = True
+        return stopped_early or truncated
+
+    for chunk in chunks:
+        decoded += chunk.size
+        voiced = vad.feed(chunk)
+        if voiced.size:
+            buffer = np.concatenate([buffer, voiced]) if buffer.size else voiced
+        while buffer.size >= window:
+            pending.append(buffer[:window])
+            buffer = buffer[window:]
+            # The last batch before the cap is cut down to the windows left
+            if len(pending) >= min(AUDIO_BATCH_WINDOWS, max_windows - len(scores)) and flush():
+                break
+        if stopped_early or truncated:
+            break
+
+    if stopped_early or truncated:
+        if hasattr(chunks, "close"):
+            # Stop the decoder now rather than whenever the generator is collected
+            chunks.close()
+    else:
+        # Tail: a final short window counts if it's at least a second of speech
+        if buffer.size >= sample_rate or (not scores and not pending and buffer.size):
+            pending.append(buffer)
+        if pending:
+            # Scored after the whole stream was read: nothing was cut short
+            flush()
+            stopped_early = truncated = False
+
+    if not scores:
+        raise NoSpeech("no speech above the VAD threshold")
+
+    return AudioVerdict(
+        score=float(np.mean(scores)),
+        window_scores=scores,
+        voiced_seconds=vad.frames_voiced * vad.frame / sample_rate,
+        decoded_seconds=decoded / sample_rate,
+        stopped_early=stopped_early,
+        elapsed_ms=(time.perf_counter() - started) * 1000.0,
+        scoring_ms=scoring * 1000.0,
+        truncated=truncated,
+    )
+
+
+def analyze_audio_file(path: str, low: float, high: float) -> AudioVerdict:
+    extractor, _ = get_audio_model()
+    rate = int(extractor.sampling_rate)
+    return analyze_audio_stream(iter_audio_chunks(path, rate), rate, low, high)
@@ -0,0 +1,216 @@
+# backend/batcher.py
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .profiler import current_profile, profiled_thread
+
+logger = logging.getLogger(__name__)
+
+# Dynamic micro-batching knobs (env-overridable per deployment)
+BATCH_MAX_SIZE = int(os.getenv("SCAMP_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("SCAMP_BATCH_MAX_WAIT_MS", "5"))
+
+# How many recent samples we keep for percentile stats
+_STATS_WINDOW = 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class InferenceBatcher:
+    """
+    Collects concurrent inference requests for up to `max_wait_ms` and runs
+    them through `run_batch` as one call, then fans results back out.
+
+    `run_batch` receives a list of items and must return a list of results
+    of the same length (same order). If a batch fails, its items are
+    retried one by one, so only the callers whose own item fails get an
+    exception.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        name: str = "batcher",
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        # (item, future, enqueued at, caller's profile if it is being profiled)
+        self._queue: "queue.Queue[Tuple[Any, Future, float, Any]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Stats
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._failed_batches = 0
+        self._failed_items = 0
+        self._batch_sizes: Dict[int, int] = {}
+        self._queue_waits_ms: Deque[float] = deque(maxlen=_STATS_WINDOW)
+        self._run_ms: Deque[float] = deque(maxlen=_STATS_WINDOW)
+        self._max_queue_wait_ms = 0.0
+
+    # ---------- Public API ----------
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item and return a Future for its result."""
+        self._ensure_started()
+        fut: Future = Future()
+        self._queue.put((item, fut, time.perf_counter(), current_profile()))
+        return fut
+
+    def infer(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Blocking helper: submit one item and wait for its result."""
+        return self.submit(item).result(timeout=timeout)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            waits = list(self._queue_waits_ms)
+            runs = list(self._run_ms)
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "items": self._items,
+                "failed_batches": self._failed_batches,
+                "failed_items": self._failed_items,
+                "avg_batch_size": (self._items / self._batches) if self._batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "queue_depth": self._queue.qsize(),
+                "queue_wait_ms": {
+                    "p50": percentile(waits, 50),
+                    "p95": percentile(waits, 95),
+                    "p99": percentile(waits, 99),
+                    "max": self._max_queue_wait_ms,
+                },
+                "batch_run_ms": {
+                    "p50": percentile(runs, 50),
+                    "p95": percentile(runs, 95),
+                },
+            }
+
+    # ---------- Worker ----------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._loop,
+                name=f"scamp-{self.name}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _collect(self) -> List[Tuple[Any, Future, float, Any]]:
+        """Block for the first item, then gather more until full or the wait expires."""
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    # Take anything already queued, but don't wait for more
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+
+            # Skip callers that gave up (cancelled) before we ran
+            live = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not live:
+                continue
+
+            waits = [(started - entry[2]) * 1000.0 for entry in live]
+
+            try:
+                # The forward pass counts towards every profiled request in the batch
+                with profiled_thread(entry[3] for entry in live):
+                    results = self._run(live)
+            except Exception as e:
+                if len(live) == 1:
+                    logger.exception("%s: item failed: %s", self.name, e)
+                    live[0][1].set_exception(e)
+                    self._record(1, waits, started, failed=1)
+                    continue
+                # One bad item shouldn't fail its neighbours: find out whose it was
+                logger.warning("%s: batch of %d failed (%s); retrying items one by one", self.name, len(live), e)
+                failed = self._run_each(live)
+                self._record(len(live), waits, started, failed=failed)
+                continue
+
+            for entry, result in zip(live, results):
+                entry[1].set_result(result)
+            self._record(len(live), waits, started, failed=0)
+
+    def _run(self, entries: List[Tuple[Any, Future, float, Any]]) -> List[Any]:
+        results = self.run_batch([entry[0] for entry in entries])
+        if len(results) != len(entries):
+            raise RuntimeError(
+                f"{self.name}: run_batch returned {len(results)} results for {len(entries)} items"
+            )
+        return results
+
+    def _run_each(self, entries: List[Tuple[Any, Future, float, Any]]) -> int:
+        """Run entries as batches of one, settling each future on its own. Returns failures."""
+        failed = 0
+        for entry in entries:
+            try:
+                with profiled_thread([entry[3]]):
+                    result = self._run([entry])[0]
+            except Exception as e:
+                logger.exception("%s: item failed: %s", self.name, e)
+                entry[1].set_exception(e)
+                failed += 1
+            else:
+                entry[1].set_result(result)
+        return failed
+
+    def _record(self, size: int, waits: List[float], started: float, failed: int) -> None:
+        run_ms = (time.perf_counter() - started) * 1000.0
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            if failed:
+                self._failed_batches += 1
+                self._failed_items += failed
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._queue_waits_ms.extend(waits)
+            self._run_ms.append(run_ms)
+            if waits:
+                self._max_queue_wait_ms = max(self._max_queue_wait_ms, max(waits))
@@ -0,0 +1,229 @@
+# backend/blobstore.py
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from .db import blob_usage, delete_blobs, find_blobs, get_blob, save_blob
+from .phash import get_near_duplicate_index
+from .uploads import StoredUpload
+from .workers import get_inference_pool
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Uploads live here: blobs/ab/cd/<sha256><ext>, plus in-flight .incoming-* files
+UPLOAD_DIR = Path(os.getenv("SCAMP_UPLOAD_DIR", PROJECT_ROOT / "uploads"))
+
+# Retention: evict blobs unused for this long (0 = keep forever) ...
+BLOB_MAX_AGE_DAYS = float(os.getenv("SCAMP_BLOB_MAX_AGE_DAYS", "30"))
+
+# ... and least recently used ones while the store is over this size (0 = no cap)
+BLOB_BUDGET_BYTES = int(float(os.getenv("SCAMP_BLOB_BUDGET_MB", "5120")) * 1024 * 1024)
+
+# Blobs no event points at (the request failed before saving) go after this
+BLOB_ORPHAN_GRACE_SECONDS = int(os.getenv("SCAMP_BLOB_ORPHAN_GRACE_SECONDS", "3600"))
+
+# Never evict anything used this recently (it may be under analysis right now)
+BLOB_MIN_IDLE_SECONDS = int(os.getenv("SCAMP_BLOB_MIN_IDLE_SECONDS", "600"))
+
+# How often the background sweeper runs (0 = never; sweep() can still be called)
+BLOB_SWEEP_SECONDS = int(os.getenv("SCAMP_BLOB_SWEEP_SECONDS", "600"))
+
+# Blob rows examined per sweep batch
+SWEEP_BATCH = 500
+
+# Lock stripes: storing and evicting the same blob never overlap
+LOCK_STRIPES = 64
+
+_SUFFIX_RE = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+_DB_TIME = "%Y-%m-%d %H:%M:%S"
+
+
+def _cutoff(seconds: float) -> str:
+    return (datetime.utcnow() - timedelta(seconds=seconds)).strftime(_DB_TIME)
+
+
+def blob_suffix(filename: Optional[str]) -> str:
+    """Keep a short, safe extension (".jpg") so tools can tell file types apart."""
+    suffix = Path(filename or "").suffix.lower()
+    return suffix if _SUFFIX_RE.match(suffix) else ""
+
+
+class BlobStore:
+    """
+    Content-addressed upload store: one file per distinct SHA-256 under
+    two levels of hash-sharded directories, tracked in the `blobs` table.
+    Every event whose file_path is a blob's path adds to its refcount (in
+    the same transaction as the event insert). Evicting a blob releases
+    those references: the events keep their verdict but lose file_path.
+
+    Storing and evicting the same blob are serialized (per hash stripe),
+    so a sweep can never delete a file a request has just been handed.
+    """
+
+    def __init__(self, root: Path, pool):
+        self.root = root
+        self.blob_dir = root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.pool = pool
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.stored = 0
+        self.deduplicated = 0
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.last_sweep: Optional[Dict] = None
+
+    def path_for(self, sha256: str, suffix: str = "") -> Path:
+        return self.blob_dir / sha256[:2] / sha256[2:4] / f"{sha256}{suffix}"
+
+    def _stripe(self, sha256: str) -> int:
+        return int(sha256[:4], 16) % LOCK_STRIPES
+
+    def put(self, upload: StoredUpload, filename: Optional[str] = None) -> Path:
+        """
+        Move a streamed upload into the store, or drop it if the same bytes
+        are already stored. Returns the blob path either way.
+        """
+        with self._locks[self._stripe(upload.sha256)]:
+            known = get_blob(upload.sha256)
+            if known is not None and Path(known["path"]).exists():
+                upload.discard()
+                save_blob(upload.sha256, known["path"], upload.size)
+                self.deduplicated += 1
+                return Path(known["path"])
+
+            dest = self.path_for(upload.sha256, blob_suffix(filename))
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            upload.commit(dest)
+            save_blob(upload.sha256, str(dest), upload.size)
+            self.stored += 1
+            return dest
+
+    # ---------- Retention ----------
+
+    def _evict(self, candidates, used_before: str) -> int:
+        # Take the batch's stripes in a fixed order (put() only ever holds one)
+        stripes = sorted({self._stripe(b["sha256"]) for b in candidates})
+        for i in stripes:
+            self._locks[i].acquire()
+        try:
+            deleted = set(delete_blobs([b["sha256"] for b in candidates], used_before))
+            freed = 0
+            paths = []
+            for blob in candidates:
+                if blob["sha256"] not in deleted:
+                    continue
+                Path(blob["path"]).unlink(missing_ok=True)
+                freed += blob["size"]
+                paths.append(blob["path"])
+        finally:
+            for i in stripes:
+                self._locks[i].release()
+        # Their image_hashes rows went with the blob rows; drop them in memory too
+        get_near_duplicate_index().forget(paths)
+        self.evicted += len(deleted)
+        self.evicted_bytes += freed
+        return freed
+
+    def _sweep_leftovers(self) -> int:
+        """Remove temp files orphaned by crashed requests."""
+        removed = 0
+        stale = time.time() - max(BLOB_ORPHAN_GRACE_SECONDS, BLOB_MIN_IDLE_SECONDS)
+        for path in self.root.glob(".incoming-*"):
+            try:
+                if path.stat().st_mtime < stale:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def sweep(self) -> Dict:
+        """
+        One retention pass: drop orphaned blobs past the grace period and
+        blobs unused for BLOB_MAX_AGE_DAYS, then evict least recently used
+        blobs (orphans first) until the store fits BLOB_BUDGET_BYTES.
+        Referenced blobs are evicted too; their references are released.
+        """
+        started = time.perf_counter()
+        used_before = _cutoff(BLOB_MIN_IDLE_SECONDS)
+        evicted_before = self.evicted
+        freed = 0
+
+        # "0" sorts before every timestamp: no blob is ever that old
+        max_age_before = _cutoff(BLOB_MAX_AGE_DAYS * 86400) if BLOB_MAX_AGE_DAYS > 0 else "0"
+        orphaned_before = _cutoff(BLOB_ORPHAN_GRACE_SECONDS)
+        while True:
+            batch = find_blobs(used_before, max_age_before, orphaned_before, limit=SWEEP_BATCH)
+            if not batch:
+                break
+            freed += self._evict(batch, used_before)
+            if len(batch) < SWEEP_BATCH:
+                break
+
+        usage = blob_usage()
+        if BLOB_BUDGET_BYTES > 0:
+            while usage["bytes"] > BLOB_BUDGET_BYTES:
+                batch = find_blobs(used_before, limit=SWEEP_BATCH)
+                if not batch:
+                    logger.warning("Upload store is over budget but everything in it is in use")
+                    break
+                over = usage["bytes"] - BLOB_BUDGET_BYTES
+                take = []
+                for blob in batch:
+                    take.append(blob)
+                    over -= blob["size"]
+                    if over <= 0:
+                        break
+                freed += self._evict(take, used_before)
+                usage = blob_usage()
+
+        result = {
+            "evicted": self.evicted - evicted_before,
+            "freed_bytes": freed,
+            "leftovers_removed": self._sweep_leftovers(),
+            "seconds": round(time.perf_counter() - started, 3),
+            **usage,
+        }
+        self.last_sweep = result
+        if result["evicted"] or result["leftovers_removed"]:
+            logger.info("Upload retention sweep: %s", result)
+        return result
+
+    async def run_sweeper(self, interval: float = BLOB_SWEEP_SECONDS) -> None:
+        """Background task: sweep every `interval` seconds on the io lane."""
+        while True:
+            try:
+                await self.pool.run("io", self.sweep)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Upload retention sweep failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "evicted": self.evicted,
+            "evicted_bytes": self.evicted_bytes,
+            "budget_bytes": BLOB_BUDGET_BYTES,
+            "last_sweep": self.last_sweep,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_blob_store() -> BlobStore:
+    return BlobStore(UPLOAD_DIR, get_inference_pool())
@@ -0,0 +1,148 @@
+# backend/cache.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .db import get_cached_result, save_cached_result, purge_cached_results
+
+logger = logging.getLogger(__name__)
+
+# Entries kept in the in-memory LRU tier (SQLite holds everything else)
+RESULT_CACHE_SIZE = int(os.getenv("SCAMP_RESULT_CACHE_SIZE", "4096"))
+
+# Verdicts with these highlight types are fallbacks, never cache them
+UNCACHEABLE_TYPES = {"model_error"}
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_cacheable(highlights: List[Dict]) -> bool:
+    """False for fallback verdicts (e.g. model errors) that must be recomputed."""
+    return not any(h.get("type") in UNCACHEABLE_TYPES for h in highlights if isinstance(h, dict))
+
+
+class CachedResult:
+    __slots__ = ("score", "highlights", "file_path")
+
+    def __init__(self, score: float, highlights: List[Dict], file_path: str):
+        self.score = score
+        self.highlights = highlights
+        self.file_path = file_path
+
+
+class ResultCache:
+    """
+    Two-tier verdict cache keyed by (sha256 of uploaded bytes, model version):
+    an in-memory LRU in front of the persistent `result_cache` table.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE):
+        self.max_entries = max(0, int(max_entries))
+        self._lru: "OrderedDict[Tuple[str, str], CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _remember(self, key: Tuple[str, str], value: CachedResult) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def get(self, digest: str, model_version: str) -> Optional[CachedResult]:
+        key = (digest, model_version)
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return hit
+
+        row = get_cached_result(digest, model_version)
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            highlights = json.loads(row["highlights"] or "[]")
+        except ValueError:
+            highlights = []
+
+        value = CachedResult(float(row["score"]), highlights, row.get("file_path") or "")
+        self._remember(key, value)
+        with self._lock:
+            self.disk_hits += 1
+        return value
+
+    def put(
+        self,
+        digest: str,
+        model_version: str,
+        media_type: str,
+        score: float,
+        highlights: List[Dict],
+        file_path: str,
+    ) -> bool:
+        """Store a verdict. Returns False if it was a fallback and got skipped."""
+        if not is_cacheable(highlights):
+            return False
+
+        save_cached_result(
+            digest,
+            model_version,
+            media_type,
+            score,
+            json.dumps(highlights),
+            file_path,
+        )
+        self._remember((digest, model_version), CachedResult(float(score), highlights, file_path))
+        with self._lock:
+            self.stores += 1
+        return True
+
+    def invalidate_except(self, keep_versions: Iterable[str]) -> int:
+        """Drop every cached verdict not produced by one of keep_versions."""
+        keep = set(keep_versions)
+        with self._lock:
+            for key in [k for k in self._lru if k[1] not in keep]:
+                del self._lru[key]
+        removed = purge_cached_results(keep)
+        if removed:
+            logger.info("Result cache: purged %d entries from old model versions", removed)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "memory_entries": len(self._lru),
+                "max_memory_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_ratio": (hits / lookups) if lookups else 0.0,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_result_cache() -> ResultCache:
+    return ResultCache(RESULT_CACHE_SIZE)
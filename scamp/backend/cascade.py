@@ -0,0 +1,285 @@
+# backend/cascade.py
+
+from __future__ import annotations
+
+import io
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Image scoring stages, cheapest first. "cache" is the result cache checked in
+# main.py before detection; the last stage always decides.
+IMAGE_CASCADE = [s.strip() for s in os.getenv("SCAMP_IMAGE_CASCADE", "cache,metadata,distilled,vit").split(",") if s.strip()]
+
+# A stage's score only decides when it is at least this far from both risk
+# thresholds; otherwise the next stage is asked
+CASCADE_MARGIN = float(os.getenv("SCAMP_CASCADE_MARGIN", "10"))
+
+# Let pristine camera metadata settle an image as low risk (off: EXIF can be copied)
+TRUST_CAMERA_EXIF = os.getenv("SCAMP_CASCADE_TRUST_CAMERA_EXIF", "0") not in {"0", "false", "no"}
+
+Verdict = Tuple[float, List[Dict]]
+
+
+class ImageInput:
+    """The image being scored, read at most once and shared by all stages."""
+
+    def __init__(self, path: Optional[str] = None, data: Optional[bytes] = None):
+        self.path = path
+        self._data = data
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = Path(self.path).read_bytes()
+        return self._data
+
+    @property
+    def loaded(self) -> Optional[bytes]:
+        """The bytes if some stage (or the caller) already has them in memory."""
+        return self._data
+
+    @property
+    def source(self):
+        """Bytes if already in memory, else the path (the preprocessor takes either)."""
+        return self._data if self._data is not None else self.path
+
+    def open(self) -> Image.Image:
+        """Lazy PIL image: only the header is parsed until pixels are touched."""
+        return Image.open(io.BytesIO(self.data))
+
+
+class Stage:
+    """
+    One scorer in the cascade. score() returns (score, highlights), or None
+    to abstain. The verdict is final when it is `margin` clear of both
+    thresholds (or when this is the last stage).
+    """
+
+    def __init__(self, name: str, fn: Callable[[ImageInput], Optional[Verdict]], margin: float = CASCADE_MARGIN):
+        self.name = name
+        self.fn = fn
+        self.margin = margin
+
+    def score(self, item: ImageInput) -> Optional[Verdict]:
+        return self.fn(item)
+
+
+class _StageStats:
+    __slots__ = ("calls", "decided", "passed", "abstained", "errors", "total_ms")
+
+    def __init__(self):
+        self.calls = 0
+        self.decided = 0
+        self.passed = 0
+        self.abstained = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def snapshot(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "decided": self.decided,
+            "passed": self.passed,
+            "abstained": self.abstained,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+        }
+
+
+class Cascade:
+    """
+    Runs stages cheapest first and stops at the first confident verdict.
+    Per-stage counters show which stage decided how often, i.e. how many
+    full-model passes the cheap stages saved.
+    """
+
+    def __init__(self, stages: Sequence[Stage], low: float, high: float, external: Sequence[str] = ()):
+        if not stages:
+            raise ValueError("cascade needs at least one stage")
+        self.stages = list(stages)
+        self.low = low
+        self.high = high
+        self._lock = threading.Lock()
+        # Stages decided outside run() (the result cache in main.py) only get counted here
+        self.external = list(external)
+        self._stats: Dict[str, _StageStats] = {name: _StageStats() for name in self.external}
+        for stage in self.stages:
+            self._stats[stage.name] = _StageStats()
+
+    @property
+    def names(self) -> List[str]:
+        return self.external + [stage.name for stage in self.stages]
+
+    def confident(self, score: float, margin: float) -> bool:
+        return abs(score - self.low) >= margin and abs(score - self.high) >= margin
+
+    def record_external(self, name: str) -> None:
+        """Count a verdict reached before the cascade ran (e.g. a cache hit)."""
+        with self._lock:
+            stats = self._stats.setdefault(name, _StageStats())
+            stats.calls += 1
+            stats.decided += 1
+
+    def run(self, item: ImageInput) -> Verdict:
+        last = len(self.stages) - 1
+        for i, stage in enumerate(self.stages):
+            started = time.perf_counter()
+            try:
+                result = stage.score(item)
+            except Exception as e:
+                if i == last:
+                    raise
+                logger.warning("Cascade stage %s failed, moving on: %s", stage.name, e)
+                result = None
+                outcome = "errors"
+            else:
+                if result is None:
+                    outcome = "abstained"
+                elif i == last or self.confident(result[0], stage.margin):
+                    outcome = "decided"
+                else:
+                    outcome = "passed"
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+            with self._lock:
+                stats = self._stats[stage.name]
+                stats.calls += 1
+                stats.total_ms += elapsed_ms
+                setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+            if outcome == "decided":
+                return result
+        raise RuntimeError("cascade finished without a verdict")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stages = {name: self._stats[name].snapshot() for name in self.names}
+        final = self.stages[-1].name
+        decided = sum(s["decided"] for s in stages.values())
+        early = decided - stages[final]["decided"]
+        return {
+            "stages": stages,
+            "decided_early": early,
+            "full_model_share": round(stages[final]["decided"] / decided, 3) if decided else None,
+        }
+
+
+# ---------- Metadata / compression stage ----------
+
+# Generator names, matched as whole words (so "imagen" doesn't hit "imagenet")
+GENERATOR_SIGNATURES = (
+    "stable diffusion", "midjourney", "dall-e", "dall·e", "firefly", "comfyui",
+    "novelai", "invokeai", "automatic1111", "imagen", "leonardo.ai", "flux",
+)
+_SIGNATURE_RE = re.compile(
+    r"(?<![\w.])(" + "|".join(re.escape(sig) for sig in GENERATOR_SIGNATURES) + r")(?![\w])"
+)
+
+# Fields where a tool names itself: PNG Software / generation-settings
+# chunks, EXIF Software, and XMP / C2PA tool fields
+SIGNATURE_PNG_KEYS = {"software", "parameters", "prompt"}
+_XMP_TOOL_RE = re.compile(
+    rb"(?:CreatorTool|softwareAgent)(?:>|=\")([^<\"]{1,200})", re.IGNORECASE
+)
+
+# PNG text keys only generation front-ends write
+GENERATOR_PNG_KEYS = {"invokeai_metadata", "sd-metadata"}
+
+# IPTC DigitalSourceType values for generated media (embedded in XMP / C2PA)
+AI_SOURCE_TYPES = (b"trainedAlgorithmicMedia", b"compositeWithTrainedAlgorithmicMedia")
+
+_EXIF_MAKE, _EXIF_MODEL, _EXIF_SOFTWARE = 0x010F, 0x0110, 0x0131
+_EXIF_IFD, _EXIF_DATETIME_ORIGINAL = 0x8769, 0x9003
+
+
+def jpeg_quality(img: Image.Image) -> Optional[int]:
+    """
+    Estimate libjpeg quality (1–100) from the luma quantization table, or
+    None for non-JPEGs. Low values mean the image was saved (or re-saved)
+    with heavy compression.
+    """
+    tables = getattr(img, "quantization", None)
+    if not tables or 0 not in tables:
+        return None
+    luma = list(tables[0])
+    # libjpeg's standard luma table scaled by quality: compare the means
+    base = 57.625  # mean of the standard table
+    scale = 100.0 * (sum(luma) / len(luma)) / base
+    quality = (200.0 - scale) / 2.0 if scale <= 100.0 else 5000.0 / scale
+    return int(max(1, min(100, round(quality))))
+
+
+def _tool_fields(img: Image.Image, xmp: bytes) -> List[str]:
+    """Lowercased values of the metadata fields a tool names itself in."""
+    fields = [
+        value[:2000].lower()
+        for key, value in (img.info or {}).items()
+        if isinstance(value, str) and str(key).lower() in SIGNATURE_PNG_KEYS
+    ]
+    software = img.getexif().get(_EXIF_SOFTWARE)
+    if software:
+        fields.append(str(software).lower())
+    fields.extend(m.group(1).decode("utf-8", "ignore").lower() for m in _XMP_TOOL_RE.finditer(xmp))
+    return fields
+
+
+def _generator_marker(img: Image.Image, xmp: bytes) -> Optional[str]:
+    """What identifies the image as generated, or None."""
+    info = {str(k).lower(): v for k, v in (img.info or {}).items()}
+    keys = sorted(info.keys() & GENERATOR_PNG_KEYS)
+    if keys:
+        return keys[0]
+    # AUTOMATIC1111 / ComfyUI write their settings under generic key names
+    params = info.get("parameters")
+    if isinstance(params, str) and "steps:" in params.lower() and "sampler:" in params.lower():
+        return "parameters"
+    prompt = info.get("prompt")
+    if isinstance(prompt, str) and '"class_type"' in prompt:
+        return "prompt"
+    for field in _tool_fields(img, xmp):
+        match = _SIGNATURE_RE.search(field)
+        if match:
+            return match.group(1)
+    return None
+
+
+def score_metadata(item: ImageInput) -> Optional[Verdict]:
+    """
+    Header-only checks (no pixel decode): provenance marks and generator
+    signatures settle an image as generated; pristine camera metadata with
+    camera-grade compression can settle it as real (if trusted). Anything
+    else abstains.
+    """
+    img = item.open()
+
+    xmp = img.info.get("xmp") or b""
+    if isinstance(xmp, str):
+        xmp = xmp.encode("utf-8", "ignore")
+    if any(marker in xmp for marker in AI_SOURCE_TYPES):
+        return 99.0, [_highlight("Image metadata declares it as AI-generated (IPTC digital source type).")]
+    found = _generator_marker(img, xmp)
+    if found:
+        return 97.0, [_highlight(f"Image metadata carries an image-generator signature ({found}).")]
+
+    if TRUST_CAMERA_EXIF and img.format == "JPEG":
+        exif = img.getexif()
+        quality = jpeg_quality(img)
+        shot_at = exif.get_ifd(_EXIF_IFD).get(_EXIF_DATETIME_ORIGINAL) if _EXIF_IFD in exif else None
+        edited = bool(exif.get(_EXIF_SOFTWARE))
+        if exif.get(_EXIF_MAKE) and exif.get(_EXIF_MODEL) and shot_at and not edited and (quality or 0) >= 85:
+            return 10.0, []
+
+    return None
+
+
+def _highlight(span: str) -> Dict:
+    return {"span": span, "type": "metadata", "start": 0, "end": 0}
@@ -2,40 +2,430 @@
 
 from __future__ import annotations
 
+import json
+import logging
+import os
+import queue
 import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Any, Callable, Optional, Dict, Iterable, Iterator, List, Tuple
+
+from .rollups import apply_event_range, create_rollup_schema, query_rollups
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).resolve().parent / "scamp.db"
 
+# Long-lived read connections (the writer is always a single connection)
+DB_READERS = int(os.getenv("SCAMP_DB_READERS", "4"))
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Max queued writes folded into one transaction by the writer thread
+DB_GROUP_MAX = int(os.getenv("SCAMP_DB_GROUP_MAX", "256"))
+
+# Seconds a caller waits for a reader or for its write to commit
+DB_TIMEOUT = float(os.getenv("SCAMP_DB_TIMEOUT", "30"))
+
+# WAL + NORMAL: commits survive an app crash, only an OS crash / power
+# loss can drop the last few. Set FULL to fsync every commit.
+DB_SYNCHRONOUS = os.getenv("SCAMP_DB_SYNCHRONOUS", "NORMAL").upper()
+
+PRAGMAS = (
+    "PRAGMA busy_timeout = 5000",
+    f"PRAGMA synchronous = {DB_SYNCHRONOUS}",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",        # 16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",      # 256 MB memory-mapped reads
+)
+
+EVENT_INSERT_SQL = """
+    INSERT INTO events (user_id, platform, media_type, score, label, file_path, signals)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Count new events' references to stored blobs (events.file_path = blobs.path)
+BLOB_REFS_SQL = """
+    UPDATE blobs
+    SET refcount = refcount + (
+        SELECT COUNT(*) FROM events WHERE id BETWEEN ? AND ? AND file_path = blobs.path
+    )
+    WHERE path IN (SELECT file_path FROM events WHERE id BETWEEN ? AND ? AND file_path != '')
+"""
+
+EVENT_INDEXES = {
+    "idx_events_created": "created_at",
+    "idx_events_user_created": "user_id, created_at",
+    "idx_events_label_created": "label, created_at",
+    "idx_events_platform_label_created": "platform, label, created_at",
+    "idx_events_platform_media_created": "platform, media_type, created_at",
+}
+
+# (user_id, platform, media_type, score, label, file_path[, signals])
+EventRow = Tuple
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    # Autocommit mode: transactions are explicit (BEGIN IMMEDIATE ... COMMIT)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
-def init_db():
-    conn = get_db_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute(
+def get_db_connection():
+    """A standalone connection with the serving pragmas (scripts, maintenance)."""
+    return _connect(DB_PATH)
+
+
+class _WriteJob:
+    __slots__ = ("rows", "fn", "future")
+
+    def __init__(self, rows: Optional[List[EventRow]], fn: Optional[Callable], future: Future):
+        self.rows = rows
+        self.fn = fn
+        self.future = future
+
+
+class Storage:
+    """
+    One writer connection owned by a background thread + a pool of reader
+    connections, all in WAL mode so reads never block on writes.
+
+    Writes are queued; the writer drains everything queued (up to
+    DB_GROUP_MAX jobs) into a single transaction, so N concurrent inserts
+    cost one commit. Event inserts in a group go through one executemany
+    and still get their ids back.
+    """
+
+    def __init__(self, path: Path, readers: int = DB_READERS, group_max: int = DB_GROUP_MAX):
+        self.path = path
+        self.group_max = max(1, group_max)
+        self.max_readers = max(1, readers)
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all_readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        self._jobs: "queue.Queue[Optional[_WriteJob]]" = queue.Queue()
+        self._closed = False
+        self.commits = 0
+        self.jobs_done = 0
+        self.rows_inserted = 0
+        self.max_group = 0
+
+        # Open the writer here so a bad path / WAL failure surfaces at startup
+        self._writer_conn = _connect(path)
+        self._writer_conn.execute("PRAGMA journal_mode = WAL")
+        self._writer = threading.Thread(target=self._write_loop, name="scamp-db-writer", daemon=True)
+        self._writer.start()
+
+    # ---------- Reads ----------
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._readers_lock:
+                if len(self._all_readers) < self.max_readers:
+                    conn = _connect(self.path)
+                    conn.execute("PRAGMA query_only = 1")
+                    self._all_readers.append(conn)
+            if conn is None:
+                conn = self._readers.get(timeout=DB_TIMEOUT)
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    # ---------- Writes ----------
+
+    def _submit(self, rows: Optional[List[EventRow]] = None, fn: Optional[Callable] = None) -> Future:
+        if self._closed:
+            raise RuntimeError("storage is closed")
+        future: Future = Future()
+        self._jobs.put(_WriteJob(rows, fn, future))
+        return future
+
+    def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn(conn) inside the next group transaction and return its result."""
+        return self._submit(fn=fn).result(timeout=DB_TIMEOUT)
+
+    def insert_events(self, rows: List[EventRow]) -> List[int]:
+        """Insert event rows; returns their ids (contiguous, in input order)."""
+        if not rows:
+            return []
+        return self._submit(rows=rows).result(timeout=DB_TIMEOUT)
+
+    def _write_loop(self) -> None:
+        conn = self._writer_conn
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            group = [job]
+            stop = False
+            while len(group) < self.group_max:
+                try:
+                    nxt = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                group.append(nxt)
+            try:
+                self._commit_group(conn, group)
+            except Exception as e:
+                # Outside the per-job retry (e.g. ROLLBACK itself failed): fail
+                # this group's callers and keep serving, or every later write
+                # would wait out DB_TIMEOUT on a dead thread
+                logger.exception("DB writer failed a group of %d writes: %s", len(group), e)
+                self._recover(conn)
+                for pending in group:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+            if stop:
+                break
+        try:
+            # Refresh planner statistics for the event indexes (sampled, so cheap on big tables)
+            conn.execute("PRAGMA analysis_limit = 1000")
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            logger.warning("PRAGMA optimize failed: %s", e)
+        conn.close()
+
+    @staticmethod
+    def _recover(conn: sqlite3.Connection) -> None:
+        """Best effort: leave no transaction open on the writer connection."""
+        try:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        except sqlite3.Error as e:
+            logger.error("DB writer could not roll back: %s", e)
+
+    def _commit_group(self, conn: sqlite3.Connection, group: List[_WriteJob]) -> None:
+        inserts = [job for job in group if job.rows is not None]
+        results: List[Any] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if inserts:
+                all_rows = [row for job in inserts for row in job.rows]
+                ids = insert_event_rows(conn, all_rows)
+                offset = 0
+                for job in inserts:
+                    results.append(ids[offset:offset + len(job.rows)])
+                    offset += len(job.rows)
+            for job in group:
+                if job.fn is not None:
+                    results.append(job.fn(conn))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if len(group) == 1:
+                if not group[0].future.done():
+                    group[0].future.set_exception(e)
+                return
+            # Isolate the failing job: retry each one in its own transaction
+            logger.warning("Group commit of %d writes failed (%s); retrying individually", len(group), e)
+            for job in group:
+                self._commit_group(conn, [job])
+            return
+
+        self.commits += 1
+        self.jobs_done += len(group)
+        self.rows_inserted += sum(len(job.rows) for job in inserts)
+        self.max_group = max(self.max_group, len(group))
+        ordered = inserts + [job for job in group if job.fn is not None]
+        for job, result in zip(ordered, results):
+            # A caller may have cancelled its future while waiting
+            if not job.future.done():
+                job.future.set_result(result)
+
+    # ---------- Lifecycle ----------
+
+    def close(self) -> None:
+        """Flush queued writes, then close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._jobs.put(None)
+        self._writer.join(timeout=DB_TIMEOUT)
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "write_queue": self._jobs.qsize(),
+            "commits": self.commits,
+            "writes": self.jobs_done,
+            "rows_inserted": self.rows_inserted,
+            "avg_group": round(self.jobs_done / self.commits, 2) if self.commits else 0.0,
+            "max_group": self.max_group,
+            "readers_open": len(self._all_readers),
+            "readers_idle": self._readers.qsize(),
+        }
+
+
+_storage_lock = threading.Lock()
+_storage: Optional[Storage] = None
+
+
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = Storage(DB_PATH)
+    return _storage
+
+
+def close_db() -> None:
+    global _storage
+    with _storage_lock:
+        if _storage is not None:
+            _storage.close()
+            _storage = None
+
+
+def db_stats() -> Dict[str, Any]:
+    return get_storage().stats()
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            media_type TEXT NOT NULL,
+            score REAL NOT NULL,
+            label TEXT NOT NULL,
+            file_path TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            signals TEXT
+        );
+        """
+    )
+    # Databases created before signals were recorded
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+    if "signals" not in columns:
+        conn.execute("ALTER TABLE events ADD COLUMN signals TEXT")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_path ON blobs (path)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_last_used ON blobs (last_used_at)")
+    create_rollup_schema(conn)
+    # Event query indexes: an equality prefix, then created_at. SQLite
+    # appends the rowid (= id) to every index, so each one also serves
+    # ORDER BY created_at DESC, id DESC and the (created_at, id) keyset.
+    for name, columns in EVENT_INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON events ({columns})")
+    # Blob eviction clears the events pointing at an evicted file (partial:
+    # text events have file_path ''; queries must repeat `file_path != ''`)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_file_path ON events (file_path) WHERE file_path != ''")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS result_cache (
+            content_hash TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            media_type TEXT NOT NULL,
+            score REAL NOT NULL,
+            highlights TEXT NOT NULL,
+            file_path TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (content_hash, model_version)
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS image_hashes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dhash TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            score REAL NOT NULL,
+            highlights TEXT NOT NULL,
+            file_path TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    # One row per (hash, model, stored file): re-uploads of a file add nothing
+    has_unique = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_image_hashes_unique'"
+    ).fetchone()
+    if not has_unique:
+        conn.execute(
             """
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                platform TEXT NOT NULL,
-                media_type TEXT NOT NULL,
-                score REAL NOT NULL,
-                label TEXT NOT NULL,
-                file_path TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            );
+            DELETE FROM image_hashes WHERE id NOT IN (
+                SELECT MAX(id) FROM image_hashes GROUP BY dhash, model_version, file_path
+            )
             """
         )
-        conn.commit()
-    finally:
-        conn.close()
+        conn.execute(
+            "CREATE UNIQUE INDEX idx_image_hashes_unique ON image_hashes (dhash, model_version, file_path)"
+        )
+    # Blob eviction clears cache rows pointing at an evicted file too
+    # (partial like idx_events_file_path: queries must repeat `file_path != ''`)
+    for table in ("result_cache", "image_hashes"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_file_path ON {table} (file_path) WHERE file_path != ''")
+    # Hashes whose file was evicted before eviction pruned them
+    conn.execute("DELETE FROM image_hashes WHERE file_path IS NULL")
+
+
+def _rollups_missing(conn: sqlite3.Connection) -> bool:
+    has_events = conn.execute("SELECT 1 FROM events LIMIT 1").fetchone() is not None
+    has_rollups = conn.execute("SELECT 1 FROM event_rollups_hourly LIMIT 1").fetchone() is not None
+    return has_events and not has_rollups
+
+
+def init_db():
+    storage = get_storage()
+    storage.write(_create_schema)
+    with storage.reader() as conn:
+        if _rollups_missing(conn):
+            logger.warning("Event rollups are empty; run `python -m backend.rollups rebuild` to backfill /stats")
+
+
+def _event_params(row: EventRow) -> Tuple:
+    user_id, platform, media_type, score, label, file_path = row[:6]
+    signals = row[6] if len(row) > 6 else None
+    # Stored as a JSON array of distinct highlight types, e.g. ["kyc", "otp"]
+    signals_json = json.dumps(sorted(set(signals))) if signals else None
+    return (user_id, platform, media_type, float(score), label, file_path, signals_json)
+
+
+def insert_event_rows(conn: sqlite3.Connection, rows: List[EventRow]) -> List[int]:
+    """
+    executemany the rows inside the caller's (write-locked) transaction.
+    With the lock held, AUTOINCREMENT ids are contiguous. The event
+    rollups are updated in the same transaction.
+    """
+    conn.executemany(EVENT_INSERT_SQL, [_event_params(row) for row in rows])
+    last_id = int(conn.execute("SELECT last_insert_rowid()").fetchone()[0])
+    first_id = last_id - len(rows) + 1
+    apply_event_range(conn, first_id, last_id)
+    conn.execute(BLOB_REFS_SQL, (first_id, last_id, first_id, last_id))
+    return list(range(first_id, last_id + 1))
 
 
 def save_event(
@@ -45,33 +435,335 @@ def save_event(
     score: float,
     label: str,
     file_path: str,
+    signals: Optional[Iterable[str]] = None,
 ) -> int:
-    conn = get_db_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO events (user_id, platform, media_type, score, label, file_path)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (user_id, platform, media_type, float(score), label, file_path),
-        )
-        conn.commit()
-        return int(cur.lastrowid)
-    finally:
-        conn.close()
+    row = (user_id, platform, media_type, score, label, file_path, list(signals or ()))
+    return get_storage().insert_events([row])[0]
+
+
+def save_events(rows: List[EventRow]) -> List[int]:
+    """
+    Bulk insert of (user_id, platform, media_type, score, label, file_path)
+    rows, optionally with a 7th signals item, in one transaction. Returns
+    the new event ids in input order.
+    """
+    return get_storage().insert_events(list(rows))
 
 
 def get_event(event_id: int) -> Optional[Dict]:
-    conn = get_db_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM events WHERE id = ?", (event_id,))
-        row = cur.fetchone()
-    finally:
-        conn.close()
+    with get_storage().reader() as conn:
+        row = conn.execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
+
+    if row is None:
+        return None
+
+    return dict(row)
+
+
+def copy_event(event_id: int, user_id: str, platform: str) -> Optional[Dict]:
+    """
+    Record event_id's verdict again as a new event for another sender (a
+    forwarded copy of an already-judged file). Returns the new event's
+    id, media_type, score and label, or None if event_id doesn't exist.
+    """
+
+    def copy(conn: sqlite3.Connection) -> Optional[Dict]:
+        row = conn.execute(
+            "SELECT media_type, score, label, file_path, signals FROM events WHERE id = ?",
+            (event_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        signals = json.loads(row["signals"]) if row["signals"] else None
+        new_row = (user_id, platform, row["media_type"], row["score"], row["label"], row["file_path"], signals)
+        new_id = insert_event_rows(conn, [new_row])[0]
+        return {"event_id": new_id, "media_type": row["media_type"], "score": row["score"], "label": row["label"]}
+
+    return get_storage().write(copy)
+
+
+def _event_filters(
+    user_id: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    label: Optional[str] = None,
+    media_type: Optional[str] = None,
+) -> Tuple[str, List]:
+    """WHERE clause + params for the common event filters (since inclusive, until exclusive)."""
+    clauses: List[str] = []
+    params: List = []
+    for column, op, value in (
+        ("user_id", "=", user_id),
+        ("platform", "=", platform),
+        ("created_at", ">=", since),
+        ("created_at", "<", until),
+        ("label", "=", label),
+        ("media_type", "=", media_type),
+    ):
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    return (" AND ".join(clauses) or "1"), params
+
+
+def count_events(**filters) -> int:
+    where, params = _event_filters(**filters)
+    with get_storage().reader() as conn:
+        row = conn.execute(f"SELECT COUNT(*) FROM events WHERE {where}", params).fetchone()
+    return int(row[0])
+
+
+def find_events(after_id: int = 0, limit: int = 500, **filters) -> List[Dict]:
+    """One page of matching events in id order, starting after `after_id`."""
+    where, params = _event_filters(**filters)
+    with get_storage().reader() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM events WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+            params + [int(after_id), int(limit)],
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def query_events(before: Optional[Tuple[str, int]] = None, limit: int = 50, **filters) -> List[Dict]:
+    """
+    Newest-first page of matching events. `before` is the (created_at, id)
+    of the last event of the previous page (keyset pagination: every page
+    is an index range scan, however deep it is).
+    """
+    where, params = _event_filters(**filters)
+    if before is not None:
+        where += " AND (created_at, id) < (?, ?)"
+        params += [before[0], int(before[1])]
+    with get_storage().reader() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM events WHERE {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+            params + [int(limit)],
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def event_stats(
+    since: str,
+    until: str,
+    platform: Optional[str] = None,
+    media_type: Optional[str] = None,
+    resolution: str = "hour",
+    max_points: Optional[int] = None,
+) -> Dict:
+    """Rollup aggregates for [since, until); see rollups.query_rollups."""
+    with get_storage().reader() as conn:
+        return query_rollups(
+            conn,
+            since,
+            until,
+            platform=platform,
+            media_type=media_type,
+            resolution=resolution,
+            max_points=max_points,
+        )
+
+
+# ---------- Result cache (content hash -> verdict) ----------
+
+
+def get_cached_result(content_hash: str, model_version: str) -> Optional[Dict]:
+    with get_storage().reader() as conn:
+        row = conn.execute(
+            "SELECT * FROM result_cache WHERE content_hash = ? AND model_version = ?",
+            (content_hash, model_version),
+        ).fetchone()
 
     if row is None:
         return None
 
     return dict(row)
+
+
+def save_cached_result(
+    content_hash: str,
+    model_version: str,
+    media_type: str,
+    score: float,
+    highlights: str,
+    file_path: str,
+) -> None:
+    get_storage().write(
+        lambda conn: conn.execute(
+            """
+            INSERT OR REPLACE INTO result_cache
+                (content_hash, model_version, media_type, score, highlights, file_path)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (content_hash, model_version, media_type, float(score), highlights, file_path),
+        )
+    )
+
+
+def _purge_versions(table: str, keep_versions: Iterable[str]) -> int:
+    keep = list(keep_versions)
+    placeholders = ", ".join("?" for _ in keep) or "NULL"
+    return get_storage().write(
+        lambda conn: int(
+            conn.execute(f"DELETE FROM {table} WHERE model_version NOT IN ({placeholders})", keep).rowcount
+        )
+    )
+
+
+def purge_cached_results(keep_versions: Iterable[str]) -> int:
+    """Delete cached verdicts produced by any model version not in keep_versions."""
+    return _purge_versions("result_cache", keep_versions)
+
+
+# ---------- Perceptual hashes (near-duplicate images) ----------
+
+
+def load_image_hashes() -> List[Dict]:
+    with get_storage().reader() as conn:
+        rows = conn.execute(
+            "SELECT dhash, model_version, score, highlights, file_path FROM image_hashes ORDER BY id"
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def save_image_hash(
+    dhash: str,
+    model_version: str,
+    score: float,
+    highlights: str,
+    file_path: str,
+) -> None:
+    get_storage().write(
+        lambda conn: conn.execute(
+            """
+            INSERT OR IGNORE INTO image_hashes (dhash, model_version, score, highlights, file_path)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (dhash, model_version, float(score), highlights, file_path),
+        )
+    )
+
+
+def purge_image_hashes(keep_versions: Iterable[str]) -> int:
+    return _purge_versions("image_hashes", keep_versions)
+
+
+# ---------- Content-addressed upload blobs ----------
+
+
+def get_blob(sha256: str) -> Optional[Dict]:
+    with get_storage().reader() as conn:
+        row = conn.execute("SELECT * FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def save_blob(sha256: str, path: str, size: int) -> None:
+    """Record a stored blob, or mark an existing one as just used."""
+    get_storage().write(
+        lambda conn: conn.execute(
+            """
+            INSERT INTO blobs (sha256, path, size) VALUES (?, ?, ?)
+            ON CONFLICT (sha256) DO UPDATE SET
+                path = excluded.path, size = excluded.size, last_used_at = CURRENT_TIMESTAMP
+            """,
+            (sha256, path, int(size)),
+        )
+    )
+
+
+def blob_usage() -> Dict:
+    with get_storage().reader() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refcount = 0), 0) FROM blobs"
+        ).fetchone()
+    return {"blobs": int(row[0]), "bytes": int(row[1]), "unreferenced": int(row[2])}
+
+
+def find_blobs(
+    used_before: str,
+    max_age_before: Optional[str] = None,
+    orphaned_before: Optional[str] = None,
+    limit: int = 500,
+) -> List[Dict]:
+    """
+    Eviction candidates not used since used_before, least valuable first:
+    unreferenced blobs, then least recently used. Without max_age_before /
+    orphaned_before this lists everything eligible (for the disk budget);
+    with them, only blobs past the age limit or orphaned past the grace period.
+    """
+    where = "last_used_at < ?"
+    params: List = [used_before]
+    limits = []
+    if max_age_before is not None:
+        limits.append("last_used_at < ?")
+        params.append(max_age_before)
+    if orphaned_before is not None:
+        limits.append("(refcount = 0 AND last_used_at < ?)")
+        params.append(orphaned_before)
+    if limits:
+        where += f" AND ({' OR '.join(limits)})"
+    with get_storage().reader() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM blobs WHERE {where} ORDER BY refcount > 0, last_used_at LIMIT ?",
+            params + [int(limit)],
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+# `file_path != ''` lets these use the partial file_path indexes
+RELEASE_EVENT_SQL = "UPDATE events SET file_path = NULL WHERE file_path = ? AND file_path != ''"
+
+
+def release_cache_sql(table: str, count: int) -> str:
+    marks = ",".join("?" * count)
+    return f"UPDATE {table} SET file_path = NULL WHERE file_path IN ({marks}) AND file_path != ''"
+
+
+def prune_image_hashes_sql(count: int) -> str:
+    marks = ",".join("?" * count)
+    return f"DELETE FROM image_hashes WHERE file_path IN ({marks}) AND file_path != ''"
+
+
+def release_blob_refs(conn: sqlite3.Connection, paths: List[str]) -> int:
+    """
+    Inside the caller's transaction: clear file_path wherever it points at
+    one of `paths` (events, result cache), drop the near-duplicate hashes
+    of those files (so image_hashes shares the blobs' retention) and take
+    the released event references off the blobs' refcounts. Returns the
+    number of events released.
+    """
+    if not paths:
+        return 0
+    released = 0
+    for path in paths:
+        count = conn.execute(RELEASE_EVENT_SQL, (path,)).rowcount
+        if count:
+            conn.execute("UPDATE blobs SET refcount = MAX(refcount - ?, 0) WHERE path = ?", (count, path))
+            released += count
+    conn.execute(release_cache_sql("result_cache", len(paths)), paths)
+    conn.execute(prune_image_hashes_sql(len(paths)), paths)
+    return released
+
+
+def delete_blobs(sha256s: List[str], used_before: str) -> List[str]:
+    """
+    Drop blob rows, skipping any used again since used_before (a request
+    re-uploaded it while the sweeper was deciding). References to a dropped
+    blob are released in the same transaction, so no event or cache row
+    is left pointing at a deleted file. Returns the deleted ones.
+    """
+
+    def delete(conn: sqlite3.Connection) -> List[str]:
+        deleted, paths = [], []
+        for sha256 in sha256s:
+            row = conn.execute(
+                "SELECT path FROM blobs WHERE sha256 = ? AND last_used_at < ?", (sha256, used_before)
+            ).fetchone()
+            if row is not None:
+                deleted.append(sha256)
+                paths.append(row["path"])
+        release_blob_refs(conn, paths)
+        conn.executemany("DELETE FROM blobs WHERE sha256 = ?", [(sha256,) for sha256 in deleted])
+        return deleted
+
+    return get_storage().write(delete) if sha256s else []
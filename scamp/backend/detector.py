@@ -3,13 +3,30 @@
 from __future__ import annotations
 
 import logging
+import os
+import time
 from functools import lru_cache
 from pathlib import Path
 from typing import Literal, Tuple, List, Dict, Optional
 
-from PIL import Image
-import torch
-from transformers import AutoImageProcessor, AutoModelForImageClassification
+import numpy as np
+from transformers import AutoConfig, AutoImageProcessor, AutoModelForImageClassification
+
+from .audio import AUDIO_MODEL_NAME, AUDIO_WINDOW_SECONDS, NoSpeech, analyze_audio_file
+from .batcher import InferenceBatcher, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+from .cascade import (
+    CASCADE_MARGIN,
+    IMAGE_CASCADE,
+    TRUST_CAMERA_EXIF,
+    Cascade,
+    ImageInput,
+    Stage,
+    score_metadata,
+)
+from .engines import build_image_engine, IMAGE_ENGINE
+from .metrics import observe_stage, timed_stage
+from .preprocess import ImagePreprocessor, ImageTooLarge
+from .rules import get_ruleset
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +35,44 @@ MediaType = Literal["audio", "image", "text"]
 # Hugging Face model for deepfake image detection
 MODEL_NAME = "prithivMLmods/Deep-Fake-Detector-v2-Model"
 
+# Optional small (distilled) image model asked before the full ViT;
+# unset = the cascade skips that stage
+DISTILLED_MODEL_NAME = os.getenv("SCAMP_DISTILLED_IMAGE_MODEL", "")
+
+# Audio detector "version": model + pipeline (bump the suffix when the
+# VAD / windowing / aggregation logic changes)
+AUDIO_MODEL_VERSION = f"{AUDIO_MODEL_NAME}+stream-vad-v1"
+
 # Risk band thresholds (same as main.py & bot.py)
 RISK_LOW_THRESHOLD = 40.0
 RISK_HIGH_THRESHOLD = 75.0
 
 
+def model_version(media_type: MediaType) -> str:
+    """
+    Identifier of the model that scores this media type.
+    Cached verdicts are only reused for the same version.
+    """
+    if media_type == "image":
+        # Quantized / ONNX engines drift slightly, keep their verdicts apart
+        version = MODEL_NAME if IMAGE_ENGINE == "torch" else f"{MODEL_NAME}+{IMAGE_ENGINE}"
+        # Early cascade stages can settle a verdict without the ViT
+        early = [name for name in image_cascade_stages() if name not in ("cache", "vit")]
+        if "metadata" in early and TRUST_CAMERA_EXIF:
+            early[early.index("metadata")] = "metadata-exif"
+        if "distilled" in early:
+            early[early.index("distilled")] = f"distilled={DISTILLED_MODEL_NAME}@{CASCADE_MARGIN:g}"
+        return f"{version}+cascade[{','.join(early)}]" if early else version
+    if media_type == "audio":
+        return AUDIO_MODEL_VERSION
+    return get_ruleset().version
+
+
+@lru_cache(maxsize=1)
+def get_image_processor():
+    return AutoImageProcessor.from_pretrained(MODEL_NAME)
+
+
 @lru_cache(maxsize=1)
 def get_image_model():
     """
@@ -31,16 +81,168 @@ def get_image_model():
     HUGGINGFACE_API_TOKEN is picked from env automatically.
     """
     logger.info("Loading HF image model: %s", MODEL_NAME)
-    processor = AutoImageProcessor.from_pretrained(MODEL_NAME)
+    processor = get_image_processor()
     model = AutoModelForImageClassification.from_pretrained(MODEL_NAME)
     model.eval()
     return processor, model
 
 
-def analyze_image(path: str) -> Tuple[float, List[Dict]]:
+@lru_cache(maxsize=1)
+def get_image_preprocessor() -> ImagePreprocessor:
+    """Fast decode + normalize path mirroring the HF processor config."""
+    return ImagePreprocessor.from_hf(get_image_processor())
+
+
+@lru_cache(maxsize=1)
+def get_image_engine():
+    """
+    Inference engine serving the image model, picked by SCAMP_IMAGE_ENGINE
+    (torch / onnx / onnx-int8). ONNX engines only touch the PyTorch model
+    the first time, to export it.
+    """
+    config = AutoConfig.from_pretrained(MODEL_NAME)
+    return build_image_engine(
+        IMAGE_ENGINE,
+        MODEL_NAME,
+        lambda: get_image_model()[1],
+        id2label=config.id2label,
+        image_size=get_image_preprocessor().height,
+    )
+
+
+def _run_image_batch(images: List[np.ndarray]) -> List:
+    """
+    Normalize + one forward pass for a whole batch of prepared images
+    (uint8 HxWx3 at model resolution; decode/resize already happened in
+    the calling worker threads).
+    Returns per-image softmax probability vectors (same order as input).
+    """
+    pixels = get_image_preprocessor().to_batch(images)
+    probs = get_image_engine().predict(pixels)
+    return list(probs)
+
+
+@lru_cache(maxsize=1)
+def get_image_batcher() -> InferenceBatcher:
+    """
+    Shared micro-batcher in front of the image model.
+    Concurrent analyze_image calls are grouped into one forward pass.
+    """
+    return InferenceBatcher(
+        _run_image_batch,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        name="image-batcher",
+    )
+
+
+def _deepfake_index(id2label: Dict[int, str]) -> Optional[int]:
+    for i, label in id2label.items():
+        if "deepfake" in label.lower() or "fake" in label.lower():
+            return int(i)
+    return None
+
+
+# Dummy forward passes run at startup so the first real image is fast
+WARMUP_PASSES = int(os.getenv("SCAMP_WARMUP_PASSES", "3"))
+
+
+def load_image_model() -> float:
+    """
+    Load processor + inference engine now instead of on the first request.
+    Returns seconds spent.
+    """
+    started = time.perf_counter()
+    get_image_preprocessor()
+    get_image_engine()
+    get_image_batcher()
+    if "distilled" in image_cascade_stages():
+        get_distilled_model()
+    return time.perf_counter() - started
+
+
+def warmup_image_model(passes: int = WARMUP_PASSES) -> float:
+    """
+    Push a few blank images at the served resolution through the batcher
+    (single and full-batch shapes) to pay first-call allocation costs.
+    Returns seconds spent.
+    """
+    started = time.perf_counter()
+    pre = get_image_preprocessor()
+    dummy = np.full((pre.height, pre.width, 3), 127, dtype=np.uint8)
+    batcher = get_image_batcher()
+
+    for _ in range(max(1, passes)):
+        batcher.infer(dummy)
+
+    futures = [batcher.submit(dummy) for _ in range(batcher.max_batch_size)]
+    for fut in futures:
+        fut.result()
+
+    return time.perf_counter() - started
+
+
+# Model readiness inside an image worker process (process executor only)
+_WORKER_STATE: Dict[str, float] = {}
+
+
+def _prepare_image_worker() -> None:
+    if "warmup_seconds" not in _WORKER_STATE:
+        _WORKER_STATE["load_seconds"] = load_image_model()
+        _WORKER_STATE["warmup_seconds"] = warmup_image_model()
+
+
+def init_image_worker() -> None:
+    """
+    ProcessPoolExecutor initializer: load and warm the model once in each
+    image worker process, before it takes any job. Failures are only
+    logged (a raising initializer breaks the whole pool); the process then
+    retries in image_worker_ready or loads lazily on its first request.
+    """
+    try:
+        _prepare_image_worker()
+    except Exception as e:
+        logger.exception("Image worker %d failed to load the model: %s", os.getpid(), e)
+
+
+def image_worker_ready() -> Tuple[int, float, float]:
+    """
+    Run in an image worker process: (pid, load_seconds, warmup_seconds)
+    once its model is loaded and warm, retrying the load if needed.
+    """
+    _prepare_image_worker()
+    return os.getpid(), _WORKER_STATE["load_seconds"], _WORKER_STATE["warmup_seconds"]
+
+
+def vision_highlights(score: float) -> List[Dict]:
+    """Simple explainability based on score band."""
+    if score >= RISK_HIGH_THRESHOLD:
+        return [
+            {
+                "span": "Model detected strong deepfake artefacts in this image.",
+                "type": "vision_model",
+                "start": 0,
+                "end": 0,
+            }
+        ]
+    if score >= RISK_LOW_THRESHOLD:
+        return [
+            {
+                "span": "Model found some inconsistencies in lighting / texture patterns.",
+                "type": "vision_model",
+                "start": 0,
+                "end": 0,
+            }
+        ]
+    return []
+
+
+def analyze_image(path: Optional[str] = None, data: Optional[bytes] = None) -> Tuple[float, List[Dict]]:
     """
     Use a real ViT-based deepfake detector to get a risk score (0-100).
     Score ≈ probability that the image is deepfake.
+    Decodes from `data` when the caller already has the bytes in memory,
+    otherwise reads `path`.
 
     Returns:
         score (float), highlights (list[dict])
@@ -48,23 +250,18 @@ def analyze_image(path: str) -> Tuple[float, List[Dict]]:
     highlights: List[Dict] = []
 
     try:
-        processor, model = get_image_model()
-
-        img = Image.open(path).convert("RGB")
-        inputs = processor(images=img, return_tensors="pt")
+        engine = get_image_engine()
 
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            probs = torch.softmax(logits, dim=-1)[0]
+        preprocessor = get_image_preprocessor()
+        with timed_stage("decode"):
+            img = preprocessor.decode(data if data is not None else path)
+        with timed_stage("preprocess"):
+            pixels = preprocessor.prepare(img)
+        # Includes the micro-batch wait (see /stats/runtime image_batcher)
+        with timed_stage("forward"):
+            probs = get_image_batcher().infer(pixels)
 
-        id2label = model.config.id2label
-        deepfake_idx: Optional[int] = None
-
-        for i, label in id2label.items():
-            if "deepfake" in label.lower() or "fake" in label.lower():
-                deepfake_idx = int(i)
-                break
+        deepfake_idx = _deepfake_index(engine.id2label)
 
         if deepfake_idx is not None:
             deepfake_prob = float(probs[deepfake_idx])
@@ -72,28 +269,19 @@ def analyze_image(path: str) -> Tuple[float, List[Dict]]:
             deepfake_prob = float(probs.max())
 
         score = deepfake_prob * 100.0
+        return score, vision_highlights(score)
 
-        # Simple explainability based on score band
-        if score >= RISK_HIGH_THRESHOLD:
-            highlights.append(
-                {
-                    "span": "Model detected strong deepfake artefacts in this image.",
-                    "type": "vision_model",
-                    "start": 0,
-                    "end": 0,
-                }
-            )
-        elif score >= RISK_LOW_THRESHOLD:
-            highlights.append(
-                {
-                    "span": "Model found some inconsistencies in lighting / texture patterns.",
-                    "type": "vision_model",
-                    "start": 0,
-                    "end": 0,
-                }
-            )
-
-        return score, highlights
+    except ImageTooLarge as e:
+        logger.warning("Rejected oversized image: %s", e)
+        highlights.append(
+            {
+                "span": "Image dimensions are too large to analyze safely.",
+                "type": "model_error",
+                "start": 0,
+                "end": 0,
+            }
+        )
+        return 50.0, highlights
 
     except Exception as e:
         logger.exception("Image analysis failed: %s", e)
@@ -110,101 +298,171 @@ def analyze_image(path: str) -> Tuple[float, List[Dict]]:
         return score, highlights
 
 
+# ---------- Image cascade ----------
+
+@lru_cache(maxsize=1)
+def get_distilled_model():
+    """(preprocessor, engine) for SCAMP_DISTILLED_IMAGE_MODEL, served like the ViT."""
+    logger.info("Loading distilled image model: %s", DISTILLED_MODEL_NAME)
+    processor = AutoImageProcessor.from_pretrained(DISTILLED_MODEL_NAME)
+    preprocessor = ImagePreprocessor.from_hf(processor)
+
+    def load_model():
+        model = AutoModelForImageClassification.from_pretrained(DISTILLED_MODEL_NAME)
+        model.eval()
+        return model
+
+    config = AutoConfig.from_pretrained(DISTILLED_MODEL_NAME)
+    engine = build_image_engine(
+        IMAGE_ENGINE,
+        DISTILLED_MODEL_NAME,
+        load_model,
+        id2label=config.id2label,
+        image_size=preprocessor.height,
+    )
+    return preprocessor, engine
+
+
+def score_distilled(item: ImageInput) -> Tuple[float, List[Dict]]:
+    """One unbatched forward pass of the small model (cheap enough alone)."""
+    preprocessor, engine = get_distilled_model()
+    pixels = preprocessor.to_batch([preprocessor.load(item.source)])
+    probs = engine.predict(pixels)[0]
+    deepfake_idx = _deepfake_index(engine.id2label)
+    score = float(probs[deepfake_idx] if deepfake_idx is not None else probs.max()) * 100.0
+    return score, vision_highlights(score)
+
+
+def score_vit(item: ImageInput) -> Tuple[float, List[Dict]]:
+    return analyze_image(item.path, data=item.loaded)
+
+
+def image_cascade_stages() -> List[str]:
+    """
+    SCAMP_IMAGE_CASCADE minus what can't run here ("distilled" without a
+    model configured, unknown names); always ends with the full ViT.
+    "cache" is handled by the API before detection.
+    """
+    names = []
+    for name in IMAGE_CASCADE:
+        if name in ("cache", "vit") or name in names:
+            continue
+        if name == "distilled" and not DISTILLED_MODEL_NAME:
+            continue
+        if name not in ("metadata", "distilled"):
+            continue
+        names.append(name)
+    external = ["cache"] if "cache" in IMAGE_CASCADE else []
+    return external + names + ["vit"]
+
+
+@lru_cache(maxsize=1)
+def get_image_cascade() -> Cascade:
+    """
+    Image scorers, cheapest first: cached verdicts (in main.py), metadata /
+    compression statistics, the optional distilled model, then the ViT
+    for whatever the earlier stages couldn't settle.
+    """
+    scorers = {"metadata": score_metadata, "distilled": score_distilled, "vit": score_vit}
+    names = image_cascade_stages()
+    unknown = set(IMAGE_CASCADE) - set(scorers) - {"cache"}
+    if unknown:
+        logger.warning("Ignoring unknown image cascade stages: %s", ", ".join(sorted(unknown)))
+    if "distilled" in IMAGE_CASCADE and not DISTILLED_MODEL_NAME:
+        logger.info("No SCAMP_DISTILLED_IMAGE_MODEL set, image cascade skips the distilled stage")
+    external = [name for name in names if name == "cache"]
+    stages = [Stage(name, scorers[name]) for name in names if name != "cache"]
+    return Cascade(stages, RISK_LOW_THRESHOLD, RISK_HIGH_THRESHOLD, external=external)
+
+
 def analyze_audio(path: str) -> Tuple[float, List[Dict]]:
     """
-    Placeholder audio deepfake detector.
-    You can plug in a real HF audio model later.
+    Streamed audio deepfake detection (see backend/audio.py): decode,
+    resample, drop silence, score fixed windows in batches and stop once
+    the verdict is clear. Score ≈ mean probability the speech is synthetic.
 
     Returns:
         score (float), highlights (list[dict])
     """
-    score = 65.0
-    highlights = [
-        {
-            "span": "Audio deepfake detection is currently a placeholder model.",
-            "type": "audio_stub",
-            "start": 0,
-            "end": 0,
-        }
-    ]
+    highlights: List[Dict] = []
+
+    try:
+        verdict = analyze_audio_file(path, RISK_LOW_THRESHOLD, RISK_HIGH_THRESHOLD)
+    except NoSpeech:
+        # 0.0 is a placeholder: the API reports this as "insufficient_speech"
+        highlights.append(
+            {
+                "span": "Not enough speech in this recording to assess it.",
+                "type": "audio_silence",
+                "start": 0,
+                "end": 0,
+            }
+        )
+        return 0.0, highlights
+    except Exception as e:
+        logger.exception("Audio analysis failed: %s", e)
+        highlights.append(
+            {
+                "span": "Audio model failed to analyze this recording (decode or model error).",
+                "type": "model_error",
+                "start": 0,
+                "end": 0,
+            }
+        )
+        return 50.0, highlights
+
+    # Decode + VAD are interleaved with scoring; split the wall time
+    observe_stage("forward", verdict.scoring_ms / 1000.0)
+    observe_stage("decode", max(0.0, verdict.elapsed_ms - verdict.scoring_ms) / 1000.0)
+
+    score = verdict.score
+    logger.info(
+        "[AUDIO] score=%.2f windows=%d voiced=%.1fs decoded=%.1fs early_stop=%s truncated=%s ms=%.0f",
+        score,
+        len(verdict.window_scores),
+        verdict.voiced_seconds,
+        verdict.decoded_seconds,
+        verdict.stopped_early,
+        verdict.truncated,
+        verdict.elapsed_ms,
+    )
+
+    # start/end: seconds into the voiced audio of the most suspicious window
+    top = verdict.top_window()
+    span_start = round(top * AUDIO_WINDOW_SECONDS, 1)
+    span_end = round(span_start + AUDIO_WINDOW_SECONDS, 1)
+    if score >= RISK_HIGH_THRESHOLD:
+        highlights.append(
+            {
+                "span": "Voice shows strong signs of synthetic or cloned speech.",
+                "type": "audio_model",
+                "start": span_start,
+                "end": span_end,
+            }
+        )
+    elif score >= RISK_LOW_THRESHOLD or verdict.window_scores[top] >= RISK_HIGH_THRESHOLD:
+        highlights.append(
+            {
+                "span": "Parts of this voice note sound artificially generated.",
+                "type": "audio_model",
+                "start": span_start,
+                "end": span_end,
+            }
+        )
+
     return score, highlights
 
 
 def analyze_text(text: str) -> Tuple[float, List[Dict]]:
     """
     Simple heuristic text scam detector.
-    Looks for KYC / OTP / links / urgency phrases, etc.
+    Looks for KYC / OTP / links / urgency phrases, etc. using the active
+    ruleset (see backend/rules.py), compiled once and scanned in one pass.
 
     Returns:
         score (float 0–100), highlights (list[dict])
     """
-    text_lower = text.lower()
-    highlights: List[Dict] = []
-    score = 0.0
-
-    def add(span: str, htype: str):
-        nonlocal score
-        start = text.find(span)
-        if start < 0:
-            start = 0
-        end = start + len(span)
-        highlights.append(
-            {"span": span, "type": htype, "start": start, "end": end}
-        )
-        # Each signal bumps score a bit
-        score_add_map = {
-            "kyc": 10,
-            "otp": 20,
-            "bank": 10,
-            "link": 15,
-            "urgency": 15,
-            "threat": 20,
-            "upi": 10,
-            "refund": 10,
-        }
-        score += score_add_map.get(htype, 5)
-
-    # KYC keywords
-    if "kyc" in text_lower:
-        add("KYC", "kyc")
-    if "video kyc" in text_lower:
-        add("video KYC", "kyc")
-
-    # OTP
-    if "otp" in text_lower:
-        add("OTP", "otp")
-    if "one time password" in text_lower:
-        add("one time password", "otp")
-
-    # Bank / payment words
-    for word in ["net banking", "upi", "imps", "rtgs", "neft", "account freeze", "account block"]:
-        if word in text_lower:
-            add(word, "bank")
-
-    # Links
-    import re
-
-    url_regex = r"https?://\S+"
-    for m in re.finditer(url_regex, text):
-        add(m.group(0), "link")
-
-    # Urgency / threats
-    for phrase in [
-        "within 15 minutes",
-        "within 30 minutes",
-        "immediately",
-        "right now",
-        "or your account will be blocked",
-        "or it will be blocked",
-        "to avoid fir",
-    ]:
-        if phrase in text_lower:
-            add(phrase, "urgency")
-
-    # Refund / lottery style
-    for word in ["refund", "prize", "lottery", "cashback"]:
-        if word in text_lower:
-            add(word, "refund")
+    score, highlights = get_ruleset().scan(text)
 
     # Clamp score to [0, 100]
     score = max(0.0, min(100.0, score))
@@ -216,19 +474,21 @@ def detect_deepfake(
     media_type: MediaType,
     path: Optional[str] = None,
     text: Optional[str] = None,
+    data: Optional[bytes] = None,
 ) -> Tuple[float, List[Dict]]:
     """
     Unified entry point used by the API.
 
-    For image/audio: pass media_type + path.
+    For image/audio: pass media_type + path (images may also pass the
+    already-buffered bytes as `data` to skip re-reading the file).
     For text: pass media_type="text" + text.
     Returns:
         score, highlights
     """
     if media_type == "image":
-        if not path:
-            raise ValueError("path is required for image analysis")
-        return analyze_image(path)
+        if not path and data is None:
+            raise ValueError("path or data is required for image analysis")
+        return get_image_cascade().run(ImageInput(path, data=data))
 
     elif media_type == "audio":
         if not path:
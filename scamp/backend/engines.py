@@ -0,0 +1,170 @@
+# backend/engines.py
+
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Which runtime serves the image model: "torch" (eager PyTorch),
+# "onnx" (ONNX Runtime, fp32) or "onnx-int8" (dynamic INT8 quantization)
+IMAGE_ENGINE = os.getenv("SCAMP_IMAGE_ENGINE", "torch").lower()
+ENGINE_NAMES = ("torch", "onnx", "onnx-int8")
+
+# Exported .onnx files are cached here (one per model + precision)
+ONNX_DIR = Path(os.getenv("SCAMP_ONNX_DIR", Path(__file__).resolve().parent.parent / "models"))
+
+# Intra-op threads for ONNX Runtime (0 = let ORT decide)
+ONNX_THREADS = int(os.getenv("SCAMP_ONNX_THREADS", "0"))
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class TorchImageEngine:
+    """Eager PyTorch forward pass (the original serving path)."""
+
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model
+        self.id2label: Dict[int, str] = {int(k): v for k, v in model.config.id2label.items()}
+
+    def predict(self, pixel_values: np.ndarray) -> np.ndarray:
+        """pixel_values: float32 (N, 3, H, W) -> probabilities (N, num_labels)."""
+        import torch
+
+        with torch.no_grad():
+            logits = self.model(pixel_values=torch.from_numpy(pixel_values)).logits
+            return torch.softmax(logits, dim=-1).numpy()
+
+
+class OnnxImageEngine:
+    """ONNX Runtime CPU session over an exported (optionally INT8) graph."""
+
+    def __init__(self, onnx_path: Path, id2label: Dict[int, str], name: str = "onnx"):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError(
+                "SCAMP_IMAGE_ENGINE=%s needs onnxruntime (pip install onnxruntime)" % name
+            ) from e
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS > 0:
+            opts.intra_op_num_threads = ONNX_THREADS
+
+        self.name = name
+        self.path = onnx_path
+        self.id2label = {int(k): v for k, v in id2label.items()}
+        self.session = ort.InferenceSession(
+            str(onnx_path), sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, pixel_values: np.ndarray) -> np.ndarray:
+        (logits,) = self.session.run(None, {self.input_name: pixel_values.astype(np.float32, copy=False)})
+        return softmax(logits)
+
+
+def onnx_path_for(model_name: str, quantized: bool) -> Path:
+    stem = model_name.replace("/", "__")
+    return ONNX_DIR / (f"{stem}.int8.onnx" if quantized else f"{stem}.onnx")
+
+
+def _tmp_path(path: Path) -> Path:
+    """Private temp name next to `path`: concurrent exports never share one."""
+    return path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+
+
+def export_onnx(model, out_path: Path, image_size: int = 224) -> Path:
+    """Export an HF image classifier to ONNX with a dynamic batch axis."""
+    import torch
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    dummy = torch.zeros(1, 3, image_size, image_size, dtype=torch.float32)
+    tmp_path = _tmp_path(out_path)
+
+    export_kwargs = dict(
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+    )
+
+    logger.info("Exporting image model to ONNX: %s", out_path)
+    try:
+        with torch.no_grad():
+            try:
+                # Newer torch defaults to the dynamo exporter; the TorchScript one
+                # gives a cleaner graph for quantize_dynamic on HF ViTs
+                torch.onnx.export(model, (dummy,), str(tmp_path), dynamo=False, **export_kwargs)
+            except TypeError:
+                torch.onnx.export(model, (dummy,), str(tmp_path), **export_kwargs)
+        os.replace(tmp_path, out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return out_path
+
+
+def quantize_onnx(src: Path, dst: Path) -> Path:
+    """Dynamic (weight-only) INT8 quantization of the MatMul-heavy ViT graph."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    logger.info("Quantizing ONNX model to INT8: %s", dst)
+    tmp_path = _tmp_path(dst)
+    try:
+        quantize_dynamic(str(src), str(tmp_path), weight_type=QuantType.QInt8)
+        os.replace(tmp_path, dst)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return dst
+
+
+def build_image_engine(
+    name: str,
+    model_name: str,
+    load_torch_model,
+    id2label: Optional[Dict[int, str]] = None,
+    image_size: int = 224,
+):
+    """
+    Create the engine selected by `name`.
+
+    `load_torch_model` is only called when we actually need the PyTorch
+    model (torch engine, or first-time ONNX export), so ONNX deployments
+    with a cached export never hold the eager model in memory.
+    """
+    if name not in ENGINE_NAMES:
+        raise ValueError(f"Unknown image engine {name!r}; expected one of {ENGINE_NAMES}")
+
+    if name == "torch":
+        return TorchImageEngine(load_torch_model())
+
+    quantized = name == "onnx-int8"
+    fp32_path = onnx_path_for(model_name, quantized=False)
+    target = onnx_path_for(model_name, quantized=quantized)
+
+    if not target.exists():
+        model = load_torch_model()
+        id2label = id2label or model.config.id2label
+        if not fp32_path.exists():
+            export_onnx(model, fp32_path, image_size=image_size)
+        if quantized:
+            quantize_onnx(fp32_path, target)
+
+    if id2label is None:
+        raise ValueError("id2label is required when loading a cached ONNX export")
+
+    logger.info("Loading %s engine from %s", name, target)
+    return OnnxImageEngine(target, id2label, name=name)
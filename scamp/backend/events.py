@@ -0,0 +1,131 @@
+# backend/events.py
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+# /events page size: default and hard cap
+EVENTS_PAGE_DEFAULT = 50
+EVENTS_PAGE_MAX = 500
+
+# /stats window: default length, longest served hourly, longest allowed
+STATS_DEFAULT_HOURS = 24
+STATS_HOURLY_MAX_HOURS = 48
+STATS_MAX_HOURS = int(os.getenv("SCAMP_STATS_MAX_DAYS", "90")) * 24
+
+RISK_BANDS = ("low", "medium", "high")
+MEDIA_TYPES = ("image", "audio", "text")
+
+# Audio with too little speech to score: a status of its own, never "low"
+INSUFFICIENT_SPEECH = "insufficient_speech"
+RISK_STATUSES = RISK_BANDS + (INSUFFICIENT_SPEECH,)
+
+
+class EventQueryError(ValueError):
+    """Bad filter or cursor."""
+
+
+def risk_label(risk: str) -> str:
+    """events.label for a risk band ("low" -> "low_risk") or status."""
+    risk = risk.lower()
+    return risk if risk == INSUFFICIENT_SPEECH else f"{risk}_risk"
+
+
+def parse_utc(name: str, value: str) -> datetime:
+    """
+    ISO-8601 -> naive UTC datetime (how created_at is stored). Times with
+    an offset are converted; times without one are taken as UTC.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise EventQueryError(f"{name} must be an ISO date/time, got {value!r}") from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_event_filters(
+    user_id: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    risk: Optional[str] = None,
+    media_type: Optional[str] = None,
+) -> Dict[str, Optional[str]]:
+    """
+    Validate query params into db filter kwargs. Times are ISO-8601 and
+    compared against events.created_at (UTC, 'YYYY-MM-DD HH:MM:SS').
+    """
+
+    def as_db_time(name: str, value: Optional[str]) -> Optional[str]:
+        if not value:
+            return None
+        return parse_utc(name, value).strftime("%Y-%m-%d %H:%M:%S")
+
+    if risk is not None and risk.lower() not in RISK_STATUSES:
+        raise EventQueryError(f"risk must be one of {RISK_STATUSES}")
+    if media_type is not None and media_type not in MEDIA_TYPES:
+        raise EventQueryError(f"media_type must be one of {MEDIA_TYPES}")
+
+    return {
+        "user_id": user_id or None,
+        "platform": platform or None,
+        "since": as_db_time("since", since),
+        "until": as_db_time("until", until),
+        "label": risk_label(risk) if risk else None,
+        "media_type": media_type or None,
+    }
+
+
+def encode_cursor(event: Dict) -> str:
+    """Opaque cursor pointing just past `event` in newest-first order."""
+    raw = json.dumps([event["created_at"], event["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, event_id = json.loads(raw)
+        return str(created_at), int(event_id)
+    except (ValueError, TypeError):
+        raise EventQueryError("invalid cursor") from None
+
+
+def parse_stats_window(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    hours: int = STATS_DEFAULT_HOURS,
+) -> Tuple[str, str, str]:
+    """
+    [since, until) for /stats as rollup bucket keys, plus the resolution.
+    until defaults to the end of the current hour, since to `hours` before
+    it. Windows over STATS_HOURLY_MAX_HOURS widen to whole days.
+    """
+
+    def parse(name: str, value: str) -> datetime:
+        return parse_utc(name, value).replace(minute=0, second=0, microsecond=0)
+
+    if until:
+        end = parse("until", until)
+    else:
+        end = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    start = parse("since", since) if since else end - timedelta(hours=hours)
+
+    if start >= end:
+        raise EventQueryError("since must be before until")
+    if end - start > timedelta(hours=STATS_MAX_HOURS):
+        raise EventQueryError(f"window is limited to {STATS_MAX_HOURS} hours")
+
+    if end - start <= timedelta(hours=STATS_HOURLY_MAX_HOURS):
+        return start.strftime("%Y-%m-%d %H:00:00"), end.strftime("%Y-%m-%d %H:00:00"), "hour"
+
+    start = start.replace(hour=0)
+    if end.hour:
+        end = end.replace(hour=0) + timedelta(days=1)
+    return start.strftime("%Y-%m-%d 00:00:00"), end.strftime("%Y-%m-%d 00:00:00"), "day"
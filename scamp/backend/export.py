@@ -0,0 +1,239 @@
+# backend/export.py
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from .db import count_events, find_events
+from .events import EventQueryError, parse_event_filters
+from .reporting import build_combined_report, build_pdf_report
+
+logger = logging.getLogger(__name__)
+
+# Renderer processes shared by all exports (reportlab is pure Python, so
+# threads would serialize on the GIL)
+EXPORT_WORKERS = int(os.getenv("SCAMP_EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Refuse exports matching more events than this; narrow the filter instead
+EXPORT_MAX_EVENTS = int(os.getenv("SCAMP_EXPORT_MAX_EVENTS", "20000"))
+
+# Events fetched per DB page, and renders in flight per export
+EXPORT_PAGE_SIZE = 500
+EXPORT_WINDOW = max(1, EXPORT_WORKERS) * 4
+
+# Chunk size when streaming finished files to the client
+EXPORT_CHUNK_BYTES = 256 * 1024
+
+
+class ExportError(ValueError):
+    """Bad filter, or too many matching events."""
+
+
+def parse_export_filters(
+    user_id: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    risk: Optional[str] = None,
+) -> Dict[str, Optional[str]]:
+    """Validate query params into db filter kwargs (see events.parse_event_filters)."""
+    try:
+        return parse_event_filters(user_id, platform, since, until, risk)
+    except EventQueryError as e:
+        raise ExportError(str(e)) from None
+
+
+# ---------- Process-pool renderers (top level, so they pickle) ----------
+
+def render_event_report(event: Dict, out_path: str) -> str:
+    """Render one report into the report cache (no-op if already there)."""
+    path = Path(out_path)
+    if not path.exists():
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            build_pdf_report(event, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    return out_path
+
+
+def render_combined(events: List[Dict], out_path: str) -> int:
+    return build_combined_report(events, Path(out_path))
+
+
+@lru_cache(maxsize=1)
+def get_export_executor() -> ProcessPoolExecutor:
+    logger.info("Starting report export pool with %d processes", EXPORT_WORKERS)
+    return ProcessPoolExecutor(max_workers=max(1, EXPORT_WORKERS), mp_context=multiprocessing.get_context("spawn"))
+
+
+def shutdown_export_executor() -> None:
+    if get_export_executor.cache_info().currsize:
+        get_export_executor().shutdown(wait=False, cancel_futures=True)
+        get_export_executor.cache_clear()
+
+
+# ---------- Streaming ----------
+
+class _ChunkSink:
+    """Write-only, unseekable file for ZipFile: collects bytes until drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _read_file(path: Path) -> bytes:
+    return path.read_bytes()
+
+
+async def check_export(pool, filters: Dict) -> int:
+    """Count matching events; raises ExportError when there are too many."""
+    total = await pool.run("io", count_events, **filters)
+    if total > EXPORT_MAX_EVENTS:
+        raise ExportError(f"{total} events match; narrow the filter (max {EXPORT_MAX_EVENTS})")
+    return total
+
+
+async def _iter_events(pool, filters: Dict) -> AsyncIterator[Dict]:
+    after_id = 0
+    while True:
+        page = await pool.run("io", find_events, after_id=after_id, limit=EXPORT_PAGE_SIZE, **filters)
+        if not page:
+            return
+        for event in page:
+            yield event
+        after_id = page[-1]["id"]
+
+
+async def iter_report_zip(pool, store, filters: Dict) -> AsyncIterator[bytes]:
+    """
+    Stream a ZIP of per-event PDFs (plus manifest.csv). Reports already in
+    the report cache are reused; the rest render in the export process
+    pool, at most EXPORT_WINDOW at a time, and are added as they finish.
+    Only finished files pass through memory, one at a time.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_export_executor()
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(["event_id", "user_id", "platform", "media_type", "score", "label", "created_at", "file"])
+
+    pending: Dict[asyncio.Future, Dict] = {}
+
+    async def add_finished(done) -> bytes:
+        for fut in done:
+            event = pending.pop(fut)
+            name = f"scamp_report_{event['id']}.pdf"
+            try:
+                data = await pool.run("io", _read_file, Path(fut.result()))
+                with archive.open(name, mode="w") as member:
+                    member.write(data)
+            except Exception as e:
+                logger.warning("Export: report for event %s failed: %s", event["id"], e)
+                name = ""
+            writer.writerow([
+                event["id"], event["user_id"], event["platform"], event["media_type"],
+                event["score"], event["label"], event["created_at"], name,
+            ])
+        return sink.drain()
+
+    try:
+        async for event in _iter_events(pool, filters):
+            while len(pending) >= EXPORT_WINDOW:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                chunk = await add_finished(done)
+                if chunk:
+                    yield chunk
+
+            path = store.path_for(event["id"])
+            if path.exists():
+                fut = loop.create_future()
+                fut.set_result(str(path))
+            else:
+                fut = loop.run_in_executor(executor, render_event_report, event, str(path))
+            pending[fut] = event
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            chunk = await add_finished(done)
+            if chunk:
+                yield chunk
+
+        archive.writestr("manifest.csv", manifest.getvalue())
+        archive.close()
+        yield sink.drain()
+    finally:
+        # Client went away mid-export: don't keep rendering for nobody
+        for fut in pending:
+            fut.cancel()
+
+
+def combined_pdf_path(report_dir: Path) -> Path:
+    """A fresh temp file for iter_combined_pdf to render into."""
+    return report_dir / f".export-{uuid.uuid4().hex}.pdf"
+
+
+def discard_combined_pdf(tmp_path: Path) -> None:
+    tmp_path.unlink(missing_ok=True)
+
+
+async def iter_combined_pdf(pool, tmp_path: Path, filters: Dict) -> AsyncIterator[bytes]:
+    """
+    Stream one multi-page PDF (a page per event). A PDF can't be emitted
+    before its cross-reference table is written, so the document renders
+    to tmp_path in one export process, then streams from disk.
+
+    The generator removes tmp_path when it finishes or is closed; callers
+    also run discard_combined_pdf after the response (a BackgroundTask),
+    since a disconnected client's generator may never be closed.
+    """
+    events = [event async for event in _iter_events(pool, filters)]
+    job = get_export_executor().submit(render_combined, events, str(tmp_path))
+    del events
+    try:
+        await asyncio.wrap_future(job)
+    except BaseException:
+        # Client went away mid-render: the export process still writes the
+        # file, so remove it once it lands
+        job.add_done_callback(lambda _: discard_combined_pdf(tmp_path))
+        raise
+
+    try:
+        src = await pool.run("io", open, tmp_path, "rb")
+        try:
+            while True:
+                chunk = await pool.run("io", src.read, EXPORT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            src.close()
+    finally:
+        discard_combined_pdf(tmp_path)
@@ -1,15 +1,75 @@
 # scamp/backend/main.py
 
+from datetime import datetime
 from pathlib import Path
+import asyncio
+import hmac
+import json
 import logging
-from typing import Any, Tuple
+import os
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Form, Body, Request, BackgroundTasks
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 
-from .db import init_db, save_event
-from .detector import detect_deepfake
+from .db import close_db, copy_event, db_stats, event_stats, init_db, query_events, save_event, save_events
+from .detector import (
+    detect_deepfake,
+    get_image_batcher,
+    get_image_cascade,
+    image_cascade_stages,
+    model_version,
+    image_worker_ready,
+    load_image_model,
+    warmup_image_model,
+)
+from .cache import get_result_cache, is_cacheable, CachedResult
+from .phash import get_near_duplicate_index, dhash, PHASH_ENABLED
+from .uploads import (
+    receive_upload,
+    UploadFormError,
+    UploadSizeLimitMiddleware,
+    UploadTooLarge,
+    MAX_UPLOAD_BYTES,
+)
+from .workers import get_inference_pool, PoolSaturated
+from .profiler import PROFILE_KEEP, PROFILE_TOKEN, ProfilerMiddleware, get_profiler
+from .metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    REGISTRY as METRICS,
+    MetricsMiddleware,
+    record_cache_hit,
+    record_fallback,
+    set_request_labels,
+    timed_stage,
+)
+from .blobstore import get_blob_store, BLOB_SWEEP_SECONDS
+from .rules import get_ruleset, set_ruleset, reload_ruleset
+from .report_store import get_report_store, EventNotFound, PRERENDER_HIGH_RISK
+from .events import (
+    EVENTS_PAGE_DEFAULT,
+    EVENTS_PAGE_MAX,
+    INSUFFICIENT_SPEECH,
+    STATS_DEFAULT_HOURS,
+    EventQueryError,
+    decode_cursor,
+    encode_cursor,
+    parse_event_filters,
+    parse_stats_window,
+    risk_label,
+)
+from .export import (
+    ExportError,
+    check_export,
+    combined_pdf_path,
+    discard_combined_pdf,
+    iter_combined_pdf,
+    iter_report_zip,
+    parse_export_filters,
+    shutdown_export_executor,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +79,29 @@ RISK_HIGH_THRESHOLD = 75.0   # 40–75 => "medium", 75+ => "high"
 
 # Resolve project root (one level above backend/)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-UPLOAD_DIR = PROJECT_ROOT / "uploads"
-UPLOAD_DIR.mkdir(exist_ok=True)
+
+# Load + warm the image model in the background at startup (0 = stay lazy)
+PRELOAD_MODEL = os.getenv("SCAMP_PRELOAD_MODEL", "1") not in {"0", "false", "no"}
+PRELOAD_RETRY_SECONDS = float(os.getenv("SCAMP_PRELOAD_RETRY_SECONDS", "30"))
+# Pause between readiness probes while image worker processes start up
+PRELOAD_PROBE_SECONDS = 0.5
+
+# NDJSON streaming: records scored + inserted per chunk, max bytes per line
+STREAM_BATCH_SIZE = int(os.getenv("SCAMP_STREAM_BATCH_SIZE", "256"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("SCAMP_STREAM_MAX_LINE_KB", "64")) * 1024
+
+# Admin endpoints (ruleset changes, profiles) need `X-Scamp-Admin-Token: <token>`; unset = disabled
+ADMIN_TOKEN = os.getenv("SCAMP_ADMIN_TOKEN", "")
+
+# Readiness of the image model, reported by /ready
+MODEL_STATE: Dict[str, Any] = {
+    "preload": PRELOAD_MODEL,
+    "loaded": False,
+    "warmed": False,
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "error": None,
+}
 
 app = FastAPI(title="Scamp Backend", version="0.3.0")
 
@@ -31,8 +112,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Reject oversized uploads before the multipart body is parsed
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
+# Opt-in request profiling (SCAMP_PROFILE_SAMPLE_RATE / SCAMP_PROFILE_TOKEN)
+app.add_middleware(ProfilerMiddleware)
+# Added last, so outermost: request counts / latency per route for GET /metrics
+app.add_middleware(MetricsMiddleware)
 # ---------- Helpers ----------
 
+def admin_denied(request: Request, extra_tokens: Tuple[str, ...] = ()) -> Optional[JSONResponse]:
+    """
+    403 response unless X-Scamp-Admin-Token carries the admin token (or one
+    of `extra_tokens`), else None. CORS is open, so admin endpoints must
+    not rely on the caller's origin.
+    """
+    tokens = [t for t in (ADMIN_TOKEN, *extra_tokens) if t]
+    if not tokens:
+        return JSONResponse(status_code=403, content={"error": "admin endpoints are disabled (SCAMP_ADMIN_TOKEN is not set)"})
+    supplied = request.headers.get("x-scamp-admin-token", "").encode()
+    if not any(hmac.compare_digest(supplied, t.encode()) for t in tokens):
+        return JSONResponse(status_code=403, content={"error": "missing or invalid X-Scamp-Admin-Token"})
+    return None
+
+
 def bucketize_risk(score: float) -> str:
     """
     Map raw score 0–100 into 'low' / 'medium' / 'high'.
@@ -52,6 +154,11 @@ def bucketize_risk(score: float) -> str:
         return "low"
 
 
+def highlight_signals(highlights: list) -> List[str]:
+    """Distinct highlight types ("kyc", "otp", "vision_model", ...) for the signal rollups."""
+    return sorted({h["type"] for h in highlights if isinstance(h, dict) and h.get("type")})
+
+
 def normalize_detector_output(detector_result: Any) -> Tuple[float, str, list]:
     """
     Accepts whatever detect_deepfake returns and normalizes it to:
@@ -82,16 +189,118 @@ def normalize_detector_output(detector_result: Any) -> Tuple[float, str, list]:
     else:
         score = float(detector_result)
 
-    risk = bucketize_risk(score)
+    if "audio_silence" in highlight_signals(highlights):
+        # Nothing was scored: say so instead of a confident "low" 0.0
+        risk = INSUFFICIENT_SPEECH
+    else:
+        risk = bucketize_risk(score)
     return score, risk, highlights
 
 
+def busy_response(e: PoolSaturated) -> JSONResponse:
+    logger.warning("Rejecting request, worker pool saturated: %s", e)
+    return JSONResponse(
+        status_code=503,
+        content={"error": "server busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+def schedule_report_prerender(background_tasks: BackgroundTasks, event_id: int, risk: str) -> None:
+    """High-risk events almost always get a report: render it once the response is sent."""
+    if PRERENDER_HIGH_RISK and risk == "high" and event_id > 0:
+        background_tasks.add_task(get_report_store().prerender, event_id)
+
+
 # ---------- FastAPI lifecycle ----------
 
 @app.on_event("startup")
 def on_startup():
     """Called when the server starts. Ensures database is ready."""
     init_db()
+    get_inference_pool()
+    # Verdicts from a previous MODEL_NAME must not be served any more
+    current_versions = {model_version("image"), model_version("audio")}
+    get_result_cache().invalidate_except(current_versions)
+    get_near_duplicate_index().invalidate_except(current_versions)
+    get_report_store().purge_stale()
+
+
+async def preload_image_model():
+    """
+    Load then warm the image model on every image worker, retrying until it
+    works (e.g. Hugging Face unreachable during a deploy).
+    """
+    lane = get_inference_pool().lane("image")
+
+    while True:
+        try:
+            if lane.kind == "process":
+                await _preload_image_processes(lane)
+                return
+
+            MODEL_STATE.update(loaded=True, load_seconds=await lane.run(load_image_model), error=None)
+            logger.info("Image model loaded in %.1fs", MODEL_STATE["load_seconds"])
+
+            MODEL_STATE.update(warmed=True, warmup_seconds=await lane.run(warmup_image_model))
+            logger.info("Image model warmed up in %.1fs", MODEL_STATE["warmup_seconds"])
+            return
+        except Exception as e:
+            logger.exception("Image model preload failed, retrying in %.0fs: %s", PRELOAD_RETRY_SECONDS, e)
+            MODEL_STATE["error"] = str(e)
+            await asyncio.sleep(PRELOAD_RETRY_SECONDS)
+
+
+async def _preload_image_processes(lane) -> None:
+    """
+    Each worker process loads + warms its own model copy in the pool's
+    initializer. A job only tells us about the process that ran it, so
+    probe until every worker process has answered.
+    """
+    seen: Dict[int, Tuple[float, float]] = {}
+    while len(seen) < lane.workers:
+        # Submitting a full round also makes the pool start every process
+        for pid, load_seconds, warmup_seconds in await asyncio.gather(
+            *(lane.run(image_worker_ready) for _ in range(lane.workers))
+        ):
+            seen[pid] = (load_seconds, warmup_seconds)
+        if len(seen) < lane.workers:
+            await asyncio.sleep(PRELOAD_PROBE_SECONDS)
+
+    MODEL_STATE.update(
+        loaded=True,
+        warmed=True,
+        load_seconds=max(load for load, _ in seen.values()),
+        warmup_seconds=max(warmup for _, warmup in seen.values()),
+        error=None,
+    )
+    logger.info(
+        "Image model loaded and warmed in %d worker processes (%.1fs + %.1fs)",
+        len(seen), MODEL_STATE["load_seconds"], MODEL_STATE["warmup_seconds"],
+    )
+
+
+@app.on_event("startup")
+async def start_model_preload():
+    if PRELOAD_MODEL:
+        app.state.preload_task = asyncio.get_running_loop().create_task(preload_image_model())
+
+
+@app.on_event("startup")
+async def start_blob_sweeper():
+    if BLOB_SWEEP_SECONDS > 0:
+        app.state.blob_sweeper = asyncio.get_running_loop().create_task(get_blob_store().run_sweeper())
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    sweeper = getattr(app.state, "blob_sweeper", None)
+    if sweeper is not None:
+        sweeper.cancel()
+    get_inference_pool().shutdown()
+    shutdown_export_executor()
+    # Flush queued writes before the process exits
+    close_db()
 
 
 @app.get("/ping")
@@ -100,84 +309,334 @@ async def ping():
     return {"status": "Scamp API online"}
 
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness for the load balancer (separate from /ping liveness):
+    the image model is loaded and warmed, and no worker lane is full.
+    """
+    lanes = get_inference_pool().stats()
+    saturated = [name for name, lane in lanes.items() if lane["pending"] >= lane["max_pending"]]
+    model_ready = MODEL_STATE["warmed"] or not PRELOAD_MODEL
+    is_ready = model_ready and not saturated
+
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={
+            "ready": is_ready,
+            "model": dict(MODEL_STATE),
+            "queues": {
+                "image_batcher_depth": get_image_batcher().queue_depth(),
+                "saturated_lanes": saturated,
+                "lanes": {
+                    name: {"pending": lane["pending"], "max_pending": lane["max_pending"]}
+                    for name, lane in lanes.items()
+                },
+            },
+        },
+    )
+
+
+@app.get("/stats/runtime")
+async def runtime_stats():
+    """
+    Internal runtime counters for tuning (batch sizes, queue waits, ...).
+    """
+    return {
+        "image_batcher": get_image_batcher().stats(),
+        "worker_pool": get_inference_pool().stats(),
+        "result_cache": get_result_cache().stats(),
+        "near_duplicates": get_near_duplicate_index().stats(),
+        "image_cascade": get_image_cascade().stats(),
+        "reports": get_report_store().stats(),
+        "storage": db_stats(),
+        "uploads": get_blob_store().stats(),
+        "profiler": get_profiler().stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (per-stage latency histograms, request/error/fallback/cache counters)."""
+    return Response(content=METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+# ---------- Profiles ----------
+
+# Admin only: X-Scamp-Admin-Token must be SCAMP_ADMIN_TOKEN or SCAMP_PROFILE_TOKEN
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    """Most recent request profiles (newest first) plus profiler settings."""
+    denied = admin_denied(request, (PROFILE_TOKEN,))
+    if denied is not None:
+        return denied
+    profiler = get_profiler()
+    return {
+        "profiler": profiler.stats(),
+        "profiles": [p.summary() for p in profiler.recent()],
+    }
+
+
+@app.get("/admin/profiles/collapsed")
+async def merged_profile(request: Request, path: Optional[str] = None):
+    """All kept profiles (optionally one request path) as one set of collapsed stacks."""
+    denied = admin_denied(request, (PROFILE_TOKEN,))
+    if denied is not None:
+        return denied
+    return Response(content=get_profiler().merged(path), media_type="text/plain")
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: int, request: Request):
+    """
+    One profile as collapsed stacks (`frame;frame;... count` per line),
+    e.g. for `flamegraph.pl` or speedscope.
+    """
+    denied = admin_denied(request, (PROFILE_TOKEN,))
+    if denied is not None:
+        return denied
+    profile = get_profiler().get(profile_id)
+    if profile is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"profile {profile_id} not found (only the last {PROFILE_KEEP} are kept)"},
+        )
+    return Response(content=profile.collapsed(), media_type="text/plain")
+
+
 # ---------- Media analysis (image/audio) ----------
 
-@app.post("/analyze")
-async def analyze(
-    file: UploadFile = File(...),
-    media_type: str = Form(...),      # "audio" or "image"
-    user_id: str = Form(...),
-    platform: str = Form("telegram"),  # default platform
-):
+# Documents the form for OpenAPI; the body itself is parsed by receive_upload
+ANALYZE_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file", "media_type", "user_id"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "media_type": {"type": "string", "enum": ["audio", "image"]},
+                        "user_id": {"type": "string"},
+                        "platform": {"type": "string", "default": "telegram"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+@app.post("/analyze", openapi_extra=ANALYZE_FORM_SCHEMA)
+async def analyze(request: Request, background_tasks: BackgroundTasks):
     """
     Analyze uploaded media (image/audio) and return scam/deepfake risk score.
 
+    Form fields: file, media_type ("audio" or "image"), user_id,
+    platform (default "telegram").
+
     Response JSON:
     {
         "event_id": int,
         "score": float,
-        "risk": "low" | "medium" | "high",
+        "risk": "low" | "medium" | "high" | "insufficient_speech" (audio only),
         "thresholds": {"low": 40.0, "high": 75.0},
         "highlights": [ ... ]   # optional, for explainability
     }
     """
-    media_type = media_type.lower()
+    pool = get_inference_pool()
+    cache = get_result_cache()
+    blobs = get_blob_store()
+
+    # Parse the multipart body straight off the request stream: the file
+    # part is written to a temp file in chunks, hashed as we go, and never
+    # held in memory or spooled twice.
+    try:
+        form = await receive_upload(request, blobs.root, pool)
+    except UploadTooLarge:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"upload too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)} MB)"},
+        )
+    except UploadFormError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except PoolSaturated as e:
+        return busy_response(e)
+    except Exception as e:
+        logger.exception("Failed to receive uploaded file: %s", e)
+        return JSONResponse(
+            status_code=500,
+            content={"error": "failed to save uploaded file"},
+        )
+
+    upload = form.upload
+    missing = [name for name in ("media_type", "user_id") if name not in form.fields]
+    if upload is None:
+        missing.insert(0, "file")
+    if missing:
+        if upload is not None:
+            upload.discard()
+        return JSONResponse(
+            status_code=422,
+            content={"error": f"missing form field(s): {', '.join(missing)}"},
+        )
+
+    media_type = form.fields["media_type"].lower()
+    user_id = form.fields["user_id"]
+    platform = form.fields.get("platform", "telegram")
     if media_type not in {"audio", "image"}:
+        upload.discard()
         return JSONResponse(
             status_code=400,
             content={"error": "media_type must be 'audio' or 'image' for /analyze"},
         )
+    set_request_labels(media_type=media_type, platform=platform)
+    version = model_version(media_type)
 
-    safe_name = file.filename.replace(" ", "_") if file.filename else "upload.bin"
-    save_path = UPLOAD_DIR / f"{platform}_{user_id}_{safe_name}"
-
-    # Save file to disk
+    # File it under its content hash (identical bytes are stored once).
+    # Images are then read back once, for in-memory decode and hashing.
+    data = None
     try:
-        with open(save_path, "wb") as f:
-            f.write(await file.read())
+        save_path = await pool.run("io", blobs.put, upload, form.filename)
+        if media_type == "image":
+            data = await pool.run("io", save_path.read_bytes)
+    except PoolSaturated as e:
+        upload.discard()
+        return busy_response(e)
     except Exception as e:
         logger.exception("Failed to save uploaded file: %s", e)
+        upload.discard()
         return JSONResponse(
             status_code=500,
             content={"error": "failed to save uploaded file"},
         )
 
-    # Run detection
-    try:
-        detector_result = detect_deepfake(media_type=media_type, path=str(save_path))
-        score, risk, highlights = normalize_detector_output(detector_result)
+    digest = upload.sha256
+    stored_path = str(save_path)
+
+    # Cached verdicts are the image cascade's first (cheapest) stage
+    use_cache = media_type != "image" or "cache" in image_cascade_stages()
+    cached = None
+    cache_kind = "exact"
+    if use_cache:
+        try:
+            cached = await pool.run("io", cache.get, digest, version)
+        except PoolSaturated as e:
+            return busy_response(e)
+        except Exception as e:
+            logger.warning("Result cache lookup failed, analyzing anyway: %s", e)
+
+    # Not byte-identical: look for a recompressed / resized copy we already scored
+    near_index = get_near_duplicate_index()
+    image_hash = None
+    if use_cache and cached is None and media_type == "image" and PHASH_ENABLED:
+        try:
+            image_hash = await pool.run("image", dhash, data)
+            near = await pool.run("io", near_index.lookup, image_hash, version)
+        except PoolSaturated as e:
+            return busy_response(e)
+        except Exception as e:
+            logger.warning("Near-duplicate lookup failed: %s", e)
+            near = None
+
+        if near is not None:
+            logger.info(
+                "[NEAR_DUPLICATE] user=%s distance=%d matched_file=%s",
+                user_id,
+                near["distance"],
+                near["file_path"],
+            )
+            cached = CachedResult(near["score"], near["highlights"], near["file_path"])
+            cache_kind = "near"
+            try:
+                await pool.run(
+                    "io", cache.put, digest, version, media_type,
+                    cached.score, cached.highlights, cached.file_path,
+                )
+            except Exception as e:
+                logger.warning("Failed to store verdict in result cache: %s", e)
+
+    if cached is not None:
+        # Same bytes already scored by this model version: reuse the verdict
+        score, risk, highlights = normalize_detector_output((cached.score, cached.highlights))
+        record_cache_hit(cache_kind)
+        if media_type == "image":
+            get_image_cascade().record_external("cache")
         logger.info(
-            "[DETECT_MEDIA] user=%s media=%s score=%.2f risk=%s file=%s",
+            "[CACHE_HIT] user=%s media=%s score=%.2f risk=%s hash=%s",
             user_id,
             media_type,
             score,
             risk,
-            save_path,
-        )
-    except Exception as e:
-        logger.exception("Detection failed: %s", e)
-        return JSONResponse(
-            status_code=500,
-            content={"error": "detection failed"},
+            digest,
         )
+    else:
+        # Run detection
+        try:
+            detector_result = await pool.run(
+                media_type, detect_deepfake, media_type=media_type, path=str(save_path), data=data
+            )
+            score, risk, highlights = normalize_detector_output(detector_result)
+            if not is_cacheable(highlights):
+                # The neutral 50.0 a detector returns when its model failed
+                record_fallback()
+            logger.info(
+                "[DETECT_MEDIA] user=%s media=%s score=%.2f risk=%s file=%s",
+                user_id,
+                media_type,
+                score,
+                risk,
+                save_path,
+            )
+        except PoolSaturated as e:
+            return busy_response(e)
+        except Exception as e:
+            logger.exception("Detection failed: %s", e)
+            return JSONResponse(
+                status_code=500,
+                content={"error": "detection failed"},
+            )
+
+        try:
+            await pool.run(
+                "io", cache.put, digest, version, media_type, score, highlights, stored_path
+            )
+        except Exception as e:
+            logger.warning("Failed to store verdict in result cache: %s", e)
+
+        if image_hash is not None and is_cacheable(highlights):
+            try:
+                await pool.run(
+                    "io", near_index.add, image_hash, version, score, highlights, stored_path
+                )
+            except Exception as e:
+                logger.warning("Failed to index image hash: %s", e)
 
-    # Label used for DB – keep string-y for now, 3‑way
-    label = f"{risk}_risk"  # "low_risk" / "medium_risk" / "high_risk"
+    # Label used for DB – keep string-y for now, 3‑way (+ insufficient_speech)
+    label = risk_label(risk)  # "low_risk" / "medium_risk" / "high_risk"
 
     # Save to DB
     try:
-        event_id = save_event(
-            user_id=user_id,
-            platform=platform,
-            media_type=media_type,
-            score=score,
-            label=label,
-            file_path=str(save_path),
-        )
+        with timed_stage("save_event"):
+            event_id = await pool.run(
+                "io",
+                save_event,
+                user_id=user_id,
+                platform=platform,
+                media_type=media_type,
+                score=score,
+                label=label,
+                file_path=stored_path,
+                signals=highlight_signals(highlights),
+            )
     except Exception as e:
         logger.exception("Failed to save event to DB: %s", e)
         event_id = -1
 
+    schedule_report_prerender(background_tasks, event_id, risk)
+
     return {
         "event_id": event_id,
         "score": score,
@@ -194,6 +653,7 @@ async def analyze(
 
 @app.post("/analyze_text")
 async def analyze_text(
+    background_tasks: BackgroundTasks,
     text: str = Form(...),
     user_id: str = Form(...),
     platform: str = Form("telegram"),
@@ -217,8 +677,11 @@ async def analyze_text(
             content={"error": "text must not be empty"},
         )
 
+    set_request_labels(media_type="text", platform=platform)
+    pool = get_inference_pool()
+
     try:
-        detector_result = detect_deepfake(media_type="text", text=text)
+        detector_result = await pool.run("text", detect_deepfake, media_type="text", text=text)
         score, risk, highlights = normalize_detector_output(detector_result)
         logger.info(
             "[DETECT_TEXT] user=%s score=%.2f risk=%s len=%d",
@@ -227,6 +690,8 @@ async def analyze_text(
             risk,
             len(text),
         )
+    except PoolSaturated as e:
+        return busy_response(e)
     except Exception as e:
         logger.exception("Text detection failed: %s", e)
         return JSONResponse(
@@ -237,18 +702,24 @@ async def analyze_text(
     label = f"{risk}_risk"
 
     try:
-        event_id = save_event(
-            user_id=user_id,
-            platform=platform,
-            media_type="text",
-            score=score,
-            label=label,
-            file_path="",  # no file path for text-only
-        )
+        with timed_stage("save_event"):
+            event_id = await pool.run(
+                "io",
+                save_event,
+                user_id=user_id,
+                platform=platform,
+                media_type="text",
+                score=score,
+                label=label,
+                file_path="",  # no file path for text-only
+                signals=highlight_signals(highlights),
+            )
     except Exception as e:
         logger.exception("Failed to save text event to DB: %s", e)
         event_id = -1
 
+    schedule_report_prerender(background_tasks, event_id, risk)
+
     return {
         "event_id": event_id,
         "score": score,
@@ -259,29 +730,327 @@ async def analyze_text(
         },
         "highlights": highlights,
     }
-from fastapi.responses import FileResponse
-from .db import init_db, save_event, get_event
-from .reporting import build_pdf_report
 
-REPORT_DIR = PROJECT_ROOT / "reports"
-REPORT_DIR.mkdir(exist_ok=True)
+
+# ---------- Streaming batch text analysis ----------
+
+def score_texts(texts: List[str]) -> List[Tuple[float, str, list]]:
+    """Score a chunk of texts in one worker hop."""
+    return [
+        normalize_detector_output(detect_deepfake(media_type="text", text=t))
+        for t in texts
+    ]
+
+
+async def iter_ndjson_records(stream, max_line_bytes: int = STREAM_MAX_LINE_BYTES):
+    """
+    Yield (line_no, record | None, error | None) from an NDJSON byte stream.
+    Only one partial line is ever buffered.
+    """
+    buf = b""
+    line_no = 0
+
+    def parse(raw: bytes):
+        try:
+            rec = json.loads(raw)
+        except ValueError as e:
+            return None, f"invalid JSON: {e}"
+        if not isinstance(rec, dict):
+            return None, "record must be a JSON object"
+        text = rec.get("text")
+        if not isinstance(text, str) or not text.strip():
+            return None, "text must be a non-empty string"
+        if not rec.get("user_id"):
+            return None, "user_id is required"
+        return rec, None
+
+    async for chunk in stream:
+        buf += chunk
+        while True:
+            nl = buf.find(b"\n")
+            if nl < 0:
+                break
+            raw, buf = buf[:nl].strip(), buf[nl + 1:]
+            if not raw:
+                continue
+            line_no += 1
+            yield (line_no, *parse(raw))
+        if len(buf) > max_line_bytes:
+            line_no += 1
+            yield line_no, None, f"line longer than {max_line_bytes} bytes"
+            return
+
+    if buf.strip():
+        line_no += 1
+        yield (line_no, *parse(buf.strip()))
+
+
+async def run_with_backoff(pool, lane: str, fn, *args):
+    """
+    Like pool.run, but waits for room instead of failing: once a stream has
+    started we can't answer 503, so a full lane slows the stream down.
+    """
+    delay = 0.01
+    while True:
+        try:
+            return await pool.run(lane, fn, *args)
+        except PoolSaturated:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator may keep reading the request.
+    The stock class (on ASGI < 2.4 servers) runs a disconnect listener that
+    calls receive() concurrently and would swallow request body chunks;
+    here a disconnect surfaces through request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/analyze_text/stream")
+async def analyze_text_stream(request: Request):
+    """
+    Bulk text scoring over NDJSON.
+
+    Request body: one JSON object per line, {"text", "user_id", "platform"?}.
+    Response body (application/x-ndjson), same order as the input:
+        {"line": 1, "event_id": 42, "score": 60.0, "risk": "medium", "highlights": [...]}
+        {"line": 2, "error": "text must be a non-empty string"}
+
+    Records are scored and written in chunks of STREAM_BATCH_SIZE with one
+    bulk insert each. The request body is only read as fast as results are
+    sent back, so memory stays bounded for arbitrarily large inputs.
+    """
+    pool = get_inference_pool()
+
+    async def process(batch: List[Tuple[int, Optional[Dict], Optional[str]]]):
+        valid = [(n, rec) for n, rec, err in batch if rec is not None]
+        scored = await run_with_backoff(pool, "text", score_texts, [rec["text"] for _, rec in valid])
+
+        rows = []
+        for (_, rec), (score, risk, highlights) in zip(valid, scored):
+            rows.append(
+                (
+                    str(rec["user_id"]),
+                    str(rec.get("platform") or "telegram"),
+                    "text",
+                    score,
+                    f"{risk}_risk",
+                    "",
+                    highlight_signals(highlights),
+                )
+            )
+        try:
+            event_ids = await run_with_backoff(pool, "io", save_events, rows)
+        except Exception as e:
+            logger.exception("Bulk save of %d text events failed: %s", len(rows), e)
+            event_ids = [-1] * len(rows)
+
+        results = {n: (eid, res) for (n, _), eid, res in zip(valid, event_ids, scored)}
+        out = []
+        for n, rec, err in batch:
+            if rec is None:
+                out.append({"line": n, "error": err})
+            else:
+                eid, (score, risk, highlights) = results[n]
+                out.append({"line": n, "event_id": eid, "score": score, "risk": risk, "highlights": highlights})
+        return "".join(json.dumps(item) + "\n" for item in out)
+
+    async def results():
+        batch = []
+        async for item in iter_ndjson_records(request.stream()):
+            batch.append(item)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield await process(batch)
+                batch = []
+        if batch:
+            yield await process(batch)
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+
+# ---------- Text rules (hot-swappable) ----------
+
+@app.get("/rules")
+async def get_text_rules():
+    """Active text ruleset: version, counts and the full declarative source."""
+    compiled = get_ruleset()
+    return {**compiled.describe(), "ruleset": compiled.source}
+
+
+@app.put("/rules")
+async def put_text_rules(request: Request, ruleset: Any = Body(...)):
+    """
+    Replace the text ruleset at runtime (no restart). The new rules are
+    compiled first; the swap only happens if they are valid. Admin only.
+    """
+    denied = admin_denied(request)
+    if denied is not None:
+        return denied
+    try:
+        compiled = set_ruleset(ruleset)
+    except (ValueError, TypeError) as e:
+        return JSONResponse(status_code=400, content={"error": f"invalid ruleset: {e}"})
+    return compiled.describe()
+
+
+@app.post("/rules/reload")
+async def reload_text_rules(request: Request):
+    """Re-read SCAMP_TEXT_RULES_PATH (or fall back to the built-in rules). Admin only."""
+    denied = admin_denied(request)
+    if denied is not None:
+        return denied
+    try:
+        compiled = reload_ruleset()
+    except (OSError, ValueError, TypeError) as e:
+        logger.exception("Failed to reload text ruleset: %s", e)
+        return JSONResponse(status_code=400, content={"error": f"could not load ruleset: {e}"})
+    return compiled.describe()
+
+
+# ---------- Event queries ----------
+
+@app.get("/events")
+async def list_events(
+    user_id: Optional[str] = None,
+    platform: Optional[str] = None,
+    media_type: Optional[str] = None,
+    risk: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = EVENTS_PAGE_DEFAULT,
+):
+    """
+    Matching events, newest first (since inclusive, until exclusive,
+    risk = low/medium/high). Pass back `next_cursor` as `cursor` for the
+    next page; it is null on the last page.
+    """
+    if not 1 <= limit <= EVENTS_PAGE_MAX:
+        return JSONResponse(status_code=400, content={"error": f"limit must be between 1 and {EVENTS_PAGE_MAX}"})
+
+    try:
+        filters = parse_event_filters(user_id, platform, since, until, risk, media_type)
+        before = decode_cursor(cursor) if cursor else None
+        # One extra row tells us whether another page exists
+        rows = await get_inference_pool().run("io", query_events, before=before, limit=limit + 1, **filters)
+    except EventQueryError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except PoolSaturated as e:
+        return busy_response(e)
+
+    events = rows[:limit]
+    next_cursor = encode_cursor(events[-1]) if len(rows) > limit else None
+    return {"events": events, "count": len(events), "next_cursor": next_cursor}
+
+
+@app.post("/events/{event_id}/copy")
+async def copy_event_for_sender(
+    event_id: int,
+    user_id: str = Form(...),
+    platform: str = Form("telegram"),
+):
+    """
+    Record an already-issued verdict for another sender, e.g. when the bot
+    recognises a forwarded file it has judged before. The new event
+    (with its own id, for reports) counts in /events and /stats like a
+    fresh analysis; nothing of the original sender is copied.
+    """
+    try:
+        copied = await get_inference_pool().run("io", copy_event, event_id, user_id, platform)
+    except PoolSaturated as e:
+        return busy_response(e)
+    except Exception as e:
+        logger.exception("Failed to copy event %s: %s", event_id, e)
+        return JSONResponse(status_code=500, content={"error": "failed to save event"})
+
+    if copied is None:
+        return JSONResponse(status_code=404, content={"error": f"event {event_id} not found"})
+
+    set_request_labels(media_type=copied["media_type"], platform=platform)
+    logger.info("[EVENT_COPY] user=%s from_event=%s event=%s", user_id, event_id, copied["event_id"])
+    return {
+        "event_id": copied["event_id"],
+        "score": copied["score"],
+        "risk": INSUFFICIENT_SPEECH if copied["label"] == INSUFFICIENT_SPEECH else bucketize_risk(copied["score"]),
+        "thresholds": {
+            "low": RISK_LOW_THRESHOLD,
+            "high": RISK_HIGH_THRESHOLD,
+        },
+    }
+
+
+@app.get("/stats")
+async def stats(
+    platform: Optional[str] = None,
+    media_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    hours: int = STATS_DEFAULT_HOURS,
+    max_points: Optional[int] = None,
+):
+    """
+    Event counts and score distributions from the rollups: totals, a
+    10-bin score histogram, splits by risk band / platform / media type,
+    the top signals (highlight types), and a time series (hourly up to
+    48h windows, daily beyond; max_points merges it into wider buckets).
+    Defaults to the last `hours` hours (UTC).
+    """
+    if max_points is not None and max_points < 1:
+        return JSONResponse(status_code=400, content={"error": "max_points must be positive"})
+
+    try:
+        start, end, resolution = parse_stats_window(since, until, hours)
+        result = await get_inference_pool().run(
+            "io",
+            event_stats,
+            start,
+            end,
+            platform=platform or None,
+            media_type=media_type or None,
+            resolution=resolution,
+            max_points=max_points,
+        )
+    except EventQueryError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except PoolSaturated as e:
+        return busy_response(e)
+
+    return {"since": start, "until": end, **result}
+
+
+# ---------- Reports ----------
 
 @app.get("/report/{event_id}")
-async def get_report(event_id: int):
+async def get_report(event_id: int, request: Request):
     """
-    Build + return a PDF report for the given event_id.
+    Return the PDF report for the given event_id, rendered once per
+    template version and then served from disk (ETag / If-None-Match).
     """
-    event = get_event(event_id)
-    if not event:
+    store = get_report_store()
+    etag = store.etag_for(event_id)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+
+    # Events are immutable: a matching validator needs no DB or disk hit
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    try:
+        pdf_path = await store.ensure(event_id)
+    except EventNotFound:
         return JSONResponse(
             status_code=404,
             content={"error": f"event {event_id} not found"},
         )
-
-    pdf_path = REPORT_DIR / f"scamp_report_{event_id}.pdf"
-
-    try:
-        build_pdf_report(event, pdf_path)
+    except PoolSaturated as e:
+        return busy_response(e)
     except Exception as e:
         logger.exception("Failed to build PDF report for event %s: %s", event_id, e)
         return JSONResponse(
@@ -293,4 +1062,51 @@ async def get_report(event_id: int):
         path=pdf_path,
         filename=f"scamp_report_{event_id}.pdf",
         media_type="application/pdf",
+        headers=headers,
     )
+
+
+@app.get("/reports/export")
+async def export_reports(
+    user_id: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    risk: Optional[str] = None,
+    format: str = "zip",
+):
+    """
+    Bulk case pack for the events matching the filter (since inclusive,
+    until exclusive, risk = low/medium/high): a streamed ZIP of per-event
+    PDFs + manifest.csv, or format=pdf for one combined multi-page PDF.
+    """
+    if format not in {"zip", "pdf"}:
+        return JSONResponse(status_code=400, content={"error": "format must be 'zip' or 'pdf'"})
+
+    pool = get_inference_pool()
+    try:
+        filters = parse_export_filters(user_id, platform, since, until, risk)
+        total = await check_export(pool, filters)
+    except ExportError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except PoolSaturated as e:
+        return busy_response(e)
+
+    if not total:
+        return JSONResponse(status_code=404, content={"error": "no events match the filter"})
+
+    logger.info("[EXPORT] format=%s events=%d filters=%s", format, total, filters)
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    headers = {"X-Event-Count": str(total)}
+
+    if format == "pdf":
+        tmp_path = combined_pdf_path(get_report_store().report_dir)
+        body = iter_combined_pdf(pool, tmp_path, filters)
+        headers["Content-Disposition"] = f'attachment; filename="scamp_reports_{stamp}.pdf"'
+        # Runs after the response ends, finished or not (client disconnect)
+        cleanup = BackgroundTask(discard_combined_pdf, tmp_path)
+        return StreamingResponse(body, media_type="application/pdf", headers=headers, background=cleanup)
+
+    body = iter_report_zip(pool, get_report_store(), filters)
+    headers["Content-Disposition"] = f'attachment; filename="scamp_reports_{stamp}.zip"'
+    return StreamingResponse(body, media_type="application/zip", headers=headers)
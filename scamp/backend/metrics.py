@@ -0,0 +1,255 @@
+# backend/metrics.py
+#
+# Minimal Prometheus metrics (text exposition format 0.0.4), served from
+# GET /metrics. Recording is a dict lookup, a bisect and a short lock, so
+# it can stay on the hot path of every request.
+
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Histogram buckets (seconds): sub-millisecond DB writes up to slow reports
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# `platform` is client-supplied: past this many distinct values it becomes "other"
+MAX_PLATFORMS = int(os.getenv("SCAMP_METRICS_MAX_PLATFORMS", "20"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+UNKNOWN = "unknown"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last = +Inf), sum, count]
+        self._children: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(labels)
+            if child is None:
+                child = self._children[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            child[0][i] += 1
+            child[1] += value
+            child[2] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            children = sorted((labels, (list(c[0]), c[1], c[2])) for labels, c in self._children.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in children:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "scamp_requests_total", "HTTP requests handled.",
+    ("endpoint", "media_type", "platform", "status"),
+))
+ERRORS = REGISTRY.register(Counter(
+    "scamp_request_errors_total", "HTTP requests that ended in a 5xx response.",
+    ("endpoint", "media_type", "platform"),
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "scamp_request_duration_seconds", "End-to-end request latency.",
+    ("endpoint", "media_type", "platform"),
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "scamp_stage_duration_seconds",
+    "Time spent per pipeline stage (upload_read, disk_write, decode, preprocess, forward, save_event, build_report).",
+    ("stage", "media_type", "platform"),
+))
+FALLBACKS = REGISTRY.register(Counter(
+    "scamp_fallback_scores_total", "Verdicts that fell back to the neutral score after a model error.",
+    ("media_type", "platform"),
+))
+CACHE_HITS = REGISTRY.register(Counter(
+    "scamp_cache_hits_total", "Verdicts served from the result cache (exact) or near-duplicate index (near).",
+    ("media_type", "platform", "kind"),
+))
+
+
+# ---------- Request labels ----------
+
+# Per-request label holder, set by MetricsMiddleware. Handlers fill it in
+# once they know the media type / platform; worker threads see the same
+# dict because pool.run() copies the context.
+_REQUEST_LABELS: contextvars.ContextVar[Optional[Dict[str, str]]] = contextvars.ContextVar(
+    "scamp_request_labels", default=None
+)
+
+_platforms: set = set()
+_platforms_lock = threading.Lock()
+
+
+def _platform_label(platform: Optional[str]) -> str:
+    if not platform:
+        return UNKNOWN
+    platform = platform[:32]
+    if platform in _platforms:
+        return platform
+    with _platforms_lock:
+        if len(_platforms) < MAX_PLATFORMS:
+            _platforms.add(platform)
+            return platform
+    return "other"
+
+
+def set_request_labels(media_type: Optional[str] = None, platform: Optional[str] = None) -> None:
+    labels = _REQUEST_LABELS.get()
+    if labels is None:
+        return
+    if media_type is not None:
+        labels["media_type"] = media_type
+    if platform is not None:
+        labels["platform"] = _platform_label(platform)
+
+
+def request_labels() -> Tuple[str, str]:
+    labels = _REQUEST_LABELS.get() or {}
+    return labels.get("media_type", UNKNOWN), labels.get("platform", UNKNOWN)
+
+
+# ---------- Recording helpers ----------
+
+def observe_stage(stage: str, seconds: float, media_type: Optional[str] = None, platform: Optional[str] = None) -> None:
+    """Record one stage duration; labels default to the current request's."""
+    current_media, current_platform = request_labels()
+    STAGE_SECONDS.observe(
+        seconds,
+        stage,
+        media_type or current_media,
+        _platform_label(platform) if platform is not None else current_platform,
+    )
+
+
+@contextmanager
+def timed_stage(stage: str, **labels) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started, **labels)
+
+
+def record_fallback() -> None:
+    FALLBACKS.inc(*request_labels())
+
+
+def record_cache_hit(kind: str) -> None:
+    CACHE_HITS.inc(*request_labels(), kind)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests / 5xx errors and timing them, per
+    route template (so /report/1 and /report/2 share a series). Requests
+    that match no route are not recorded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels: Dict[str, str] = {}
+        token = _REQUEST_LABELS.set(labels)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            _REQUEST_LABELS.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            if path is not None and path != "/metrics":
+                media_type = labels.get("media_type", UNKNOWN)
+                platform = labels.get("platform", UNKNOWN)
+                REQUESTS.inc(path, media_type, platform, str(status))
+                if status >= 500:
+                    ERRORS.inc(path, media_type, platform)
+                REQUEST_SECONDS.observe(time.perf_counter() - started, path, media_type, platform)
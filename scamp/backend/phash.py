@@ -0,0 +1,280 @@
+# backend/phash.py
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from .db import load_image_hashes, save_image_hash, purge_image_hashes
+from .batcher import percentile
+from .preprocess import open_image
+
+logger = logging.getLogger(__name__)
+
+PHASH_ENABLED = os.getenv("SCAMP_PHASH_ENABLED", "1") not in {"0", "false", "no"}
+
+# Max Hamming distance (out of 64 bits) for two images to count as the same
+PHASH_MAX_DISTANCE = int(os.getenv("SCAMP_PHASH_MAX_DISTANCE", "6"))
+
+# dHash grid: (HASH_SIZE + 1) x HASH_SIZE gradients -> 64-bit hash
+HASH_SIZE = 8
+
+
+def dhash(data: bytes) -> int:
+    """
+    64-bit difference hash of an image. Robust to recompression and
+    resizing, which is exactly what Telegram does to forwarded photos.
+    Raises ImageTooLarge (from the header, before decoding) for
+    decompression bombs, like the detector does.
+    """
+    img = open_image(data)
+    # JPEGs can be decoded at 1/8 scale for free; we only need a 9x8 grid
+    img.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    img = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+    px = img.tobytes()
+
+    value = 0
+    width = HASH_SIZE + 1
+    for row in range(HASH_SIZE):
+        base = row * width
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (px[base + col] > px[base + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over Hamming distance. Range queries only visit
+    children whose edge distance is within [d - r, d + r].
+
+    Removed entries stay behind as tombstones (their node still routes
+    lookups) until they outnumber the live ones; then compact() rebuilds.
+    """
+
+    __slots__ = ("root", "size", "dead")
+
+    def __init__(self):
+        # node = [hash, payload, {distance: child_node}]; payload None = removed
+        self.root: Optional[list] = None
+        self.size = 0
+        self.dead = 0
+
+    def add(self, value: int, payload: Any) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = [value, payload, {}]
+            return
+
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                # Same hash: newest verdict wins
+                if node[1] is None:
+                    self.dead -= 1
+                else:
+                    self.size -= 1
+                node[1] = payload
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, payload, {}]
+                return
+            node = child
+
+    def remove(self, value: int, match: Callable[[Any], bool]) -> bool:
+        """Remove the entry stored under exactly `value` if match(payload)."""
+        node = self.root
+        while node is not None:
+            d = hamming(value, node[0])
+            if d == 0:
+                if node[1] is None or not match(node[1]):
+                    return False
+                node[1] = None
+                self.size -= 1
+                self.dead += 1
+                return True
+            node = node[2].get(d)
+        return False
+
+    def compact(self) -> bool:
+        """Rebuild without tombstones once they outnumber live entries."""
+        if self.dead <= self.size:
+            return False
+        live = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if node[1] is not None:
+                live.append((node[0], node[1]))
+            stack.extend(node[2].values())
+        self.root, self.size, self.dead = None, 0, 0
+        for value, payload in live:
+            self.add(value, payload)
+        return True
+
+    def nearest(self, value: int, max_distance: int) -> Optional[Tuple[int, Any]]:
+        """Closest stored entry within max_distance, or None."""
+        if self.root is None:
+            return None
+
+        best: Optional[Tuple[int, Any]] = None
+        radius = max_distance
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= radius and node[1] is not None:
+                best = (d, node[1])
+                radius = d
+                if d == 0:
+                    break
+            for edge, child in node[2].items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return best
+
+
+class NearDuplicateIndex:
+    """
+    Per-model-version BK-trees of image dHashes -> stored verdicts,
+    persisted in the `image_hashes` table and loaded lazily. Entries go
+    when their stored file is evicted (see forget), so the index is
+    bounded by the blob store's retention.
+    """
+
+    def __init__(self, max_distance: int = PHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._trees: Dict[str, BKTree] = {}
+        # file_path -> (model_version, hash) of entries for that file
+        self._by_path: Dict[str, List[Tuple[str, int]]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        self.lookups = 0
+        self.hits = 0
+        self._lookup_ms: Deque[float] = deque(maxlen=1024)
+        self._hit_distances: Dict[int, int] = {}
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            count = 0
+            for row in load_image_hashes():
+                self._insert(int(row["dhash"], 16), row["model_version"], row["score"], row["highlights"], row["file_path"])
+                count += 1
+            self._loaded = True
+            logger.info("Near-duplicate index loaded %d image hashes", count)
+
+    def _insert(self, value: int, model_version: str, score: float, highlights: Any, file_path: Optional[str]) -> None:
+        tree = self._trees.setdefault(model_version, BKTree())
+        tree.add(value, self._payload(score, highlights, file_path))
+        if file_path:
+            entries = self._by_path.setdefault(file_path, [])
+            if (model_version, value) not in entries:
+                entries.append((model_version, value))
+
+    @staticmethod
+    def _payload(score: float, highlights: Any, file_path: Optional[str]) -> Dict:
+        if isinstance(highlights, str):
+            try:
+                highlights = json.loads(highlights or "[]")
+            except ValueError:
+                highlights = []
+        return {"score": float(score), "highlights": highlights, "file_path": file_path or ""}
+
+    def lookup(self, value: int, model_version: str) -> Optional[Dict]:
+        """
+        Verdict of the closest previously scored image within max_distance.
+        The returned dict also carries the matched `distance`.
+        """
+        self._ensure_loaded()
+        started = time.perf_counter()
+        with self._lock:
+            tree = self._trees.get(model_version)
+            found = tree.nearest(value, self.max_distance) if tree else None
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self.lookups += 1
+            self._lookup_ms.append(elapsed)
+            if found is None:
+                return None
+            distance, payload = found
+            self.hits += 1
+            self._hit_distances[distance] = self._hit_distances.get(distance, 0) + 1
+        return dict(payload, distance=distance)
+
+    def add(self, value: int, model_version: str, score: float, highlights: List[Dict], file_path: str) -> None:
+        self._ensure_loaded()
+        save_image_hash(f"{value:016x}", model_version, score, json.dumps(highlights), file_path)
+        with self._lock:
+            self._insert(value, model_version, score, highlights, file_path)
+
+    def forget(self, file_paths: Iterable[str]) -> int:
+        """
+        Drop the entries of evicted files (their image_hashes rows go in
+        the same transaction as the eviction). Returns entries removed.
+        """
+        removed = 0
+        with self._lock:
+            touched = set()
+            for path in file_paths:
+                for version, value in self._by_path.pop(path, ()):
+                    tree = self._trees.get(version)
+                    if tree is not None and tree.remove(value, lambda p: p["file_path"] == path):
+                        removed += 1
+                        touched.add(version)
+            for version in touched:
+                self._trees[version].compact()
+        return removed
+
+    def invalidate_except(self, keep_versions: Iterable[str]) -> int:
+        keep = set(keep_versions)
+        with self._lock:
+            for version in [v for v in self._trees if v not in keep]:
+                del self._trees[version]
+            for path in list(self._by_path):
+                entries = [e for e in self._by_path[path] if e[0] in keep]
+                if entries:
+                    self._by_path[path] = entries
+                else:
+                    del self._by_path[path]
+        return purge_image_hashes(keep)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            timings = list(self._lookup_ms)
+            return {
+                "enabled": PHASH_ENABLED,
+                "max_distance": self.max_distance,
+                "entries": {v: t.size for v, t in self._trees.items()},
+                "tombstones": {v: t.dead for v, t in self._trees.items()},
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_ratio": (self.hits / self.lookups) if self.lookups else 0.0,
+                "hit_distance_histogram": dict(sorted(self._hit_distances.items())),
+                "lookup_ms": {
+                    "p50": percentile(timings, 50),
+                    "p95": percentile(timings, 95),
+                    "max": max(timings) if timings else 0.0,
+                },
+            }
+
+
+@lru_cache(maxsize=1)
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    return NearDuplicateIndex(PHASH_MAX_DISTANCE)
@@ -0,0 +1,145 @@
+# backend/preprocess.py
+
+from __future__ import annotations
+
+import io
+import logging
+import os
+from pathlib import Path
+from typing import List, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Refuse images whose header claims more pixels than this (decompression
+# bombs). Checked by open_image; PIL's process-wide Image.MAX_IMAGE_PIXELS
+# is left alone (report rendering and other Pillow users share it).
+MAX_IMAGE_PIXELS = int(float(os.getenv("SCAMP_MAX_IMAGE_MEGAPIXELS", "50")) * 1_000_000)
+
+# Decode at >= this multiple of the model resolution before the final
+# resize, so the antialiased downscale still has enough source pixels
+DECODE_HEADROOM = 2
+
+ImageSource = Union[bytes, bytearray, str, Path]
+
+
+class ImageTooLarge(ValueError):
+    """Image dimensions exceed MAX_IMAGE_PIXELS."""
+
+
+def open_image(source: ImageSource) -> Image.Image:
+    """
+    Image.open plus the MAX_IMAGE_PIXELS check, from the header alone
+    (no pixel data is decoded). Raises ImageTooLarge.
+    """
+    fp = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    try:
+        img = Image.open(fp)
+    except Image.DecompressionBombError as e:
+        # PIL's own (default) limit is higher, but a configured one may not be
+        raise ImageTooLarge(str(e)) from None
+    w, h = img.size
+    if w * h > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(f"image is {w}x{h}, above {MAX_IMAGE_PIXELS} pixels")
+    return img
+
+
+class ImagePreprocessor:
+    """
+    Replacement for `AutoImageProcessor(images=...)` on the serving path:
+
+    - JPEGs are decoded at reduced scale (draft mode), other formats are
+      shrunk with `Image.reduce` before the final resize;
+    - rescale + normalize is one fused NumPy op per image, written
+      straight into a preallocated (N, 3, H, W) float32 batch.
+    """
+
+    def __init__(
+        self,
+        height: int = 224,
+        width: int = 224,
+        mean: Sequence[float] = (0.5, 0.5, 0.5),
+        std: Sequence[float] = (0.5, 0.5, 0.5),
+        rescale_factor: float = 1 / 255.0,
+        resample: int = Image.BILINEAR,
+    ):
+        self.height = int(height)
+        self.width = int(width)
+        self.resample = resample
+
+        mean_arr = np.asarray(mean, dtype=np.float32)
+        std_arr = np.asarray(std, dtype=np.float32)
+        # (x * rescale - mean) / std  ==  x * scale + offset
+        self.scale = (rescale_factor / std_arr).reshape(3, 1, 1).astype(np.float32)
+        self.offset = (-mean_arr / std_arr).reshape(3, 1, 1).astype(np.float32)
+
+    @classmethod
+    def from_hf(cls, processor) -> "ImagePreprocessor":
+        """Mirror the resize / rescale / normalize config of an HF image processor."""
+        size = getattr(processor, "size", None)
+        height = width = 224
+        if isinstance(size, (int, float)):
+            height = width = int(size)
+        elif size is not None:
+            get = size.get if isinstance(size, dict) else (lambda k: getattr(size, k, None))
+            height = int(get("height") or get("shortest_edge") or 224)
+            width = int(get("width") or get("shortest_edge") or 224)
+
+        do_normalize = getattr(processor, "do_normalize", True)
+        do_rescale = getattr(processor, "do_rescale", True)
+        mean = processor.image_mean if do_normalize else (0.0, 0.0, 0.0)
+        std = processor.image_std if do_normalize else (1.0, 1.0, 1.0)
+        rescale = getattr(processor, "rescale_factor", 1 / 255.0) if do_rescale else 1.0
+        resample = int(getattr(processor, "resample", None) or Image.BILINEAR)
+
+        return cls(height, width, mean, std, rescale, resample)
+
+    # ---------- Decode ----------
+
+    def decode(self, source: ImageSource) -> Image.Image:
+        """
+        Open an image and decode it close to the target size, not full size.
+        Raises ImageTooLarge for decompression bombs (checked from the header,
+        before any pixel data is decoded).
+        """
+        img = open_image(source)
+        w, h = img.size
+
+        min_w = self.width * DECODE_HEADROOM
+        min_h = self.height * DECODE_HEADROOM
+
+        if img.format == "JPEG":
+            # libjpeg scales by 1/2, 1/4, 1/8 during IDCT, nearly free
+            img.draft("RGB", (min_w, min_h))
+        else:
+            factor = min(w // min_w, h // min_h)
+            if factor >= 2:
+                img = img.reduce(factor)
+
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        return img
+
+    def prepare(self, img: Image.Image) -> np.ndarray:
+        """Final resize to model resolution; returns uint8 (H, W, 3)."""
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if img.size != (self.width, self.height):
+            img = img.resize((self.width, self.height), self.resample)
+        return np.asarray(img, dtype=np.uint8)
+
+    def load(self, source: ImageSource) -> np.ndarray:
+        return self.prepare(self.decode(source))
+
+    # ---------- Normalize ----------
+
+    def to_batch(self, arrays: List[np.ndarray]) -> np.ndarray:
+        """Stack prepared uint8 images into a normalized float32 (N, 3, H, W) batch."""
+        batch = np.empty((len(arrays), 3, self.height, self.width), dtype=np.float32)
+        for i, arr in enumerate(arrays):
+            out = batch[i]
+            np.multiply(arr.transpose(2, 0, 1), self.scale, out=out)
+            out += self.offset
+        return batch
@@ -0,0 +1,344 @@
+# backend/profiler.py
+#
+# Opt-in stack-sampling profiler for live requests. A fraction of
+# /analyze, /analyze_text and /report requests (or any of them carrying
+# the profiling header) get a profile: while they run, a sampler thread
+# reads sys._current_frames() for the threads working on them and counts
+# collapsed stacks, ready for flamegraph.pl / speedscope.
+#
+# Threads are tagged through a contextvar: pool workers (pool.run copies
+# the request context), the image batcher (for the requests in the batch
+# it is running) and the event loop thread while the request's own task
+# is the one running on it.
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+# Fraction of eligible requests to profile (0 = only on request header)
+PROFILE_SAMPLE_RATE = float(os.getenv("SCAMP_PROFILE_SAMPLE_RATE", "0"))
+
+# Requests sending `X-Scamp-Profile: <token>` are always profiled (unset = header ignored)
+PROFILE_TOKEN = os.getenv("SCAMP_PROFILE_TOKEN", "")
+PROFILE_HEADER = b"x-scamp-profile"
+
+# Sampling interval, profiles kept, and safety caps
+PROFILE_INTERVAL_MS = float(os.getenv("SCAMP_PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("SCAMP_PROFILE_KEEP", "50"))
+PROFILE_MAX_ACTIVE = int(os.getenv("SCAMP_PROFILE_MAX_ACTIVE", "4"))
+PROFILE_MAX_SECONDS = float(os.getenv("SCAMP_PROFILE_MAX_SECONDS", "30"))
+
+# Which requests can be profiled
+PROFILE_PATHS = {"/analyze", "/analyze_text"}
+PROFILE_PREFIXES = ("/report/",)
+
+MAX_STACK_DEPTH = 128
+
+
+class Profile:
+    __slots__ = (
+        "id", "method", "path", "trigger", "started_at", "started", "duration_ms", "status",
+        "samples", "truncated", "stacks", "loop", "task", "loop_thread",
+    )
+
+    def __init__(self, profile_id: int, method: str, path: str, trigger: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.utcnow().isoformat(timespec="seconds")
+        self.started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.samples = 0
+        self.truncated = False
+        self.stacks: Dict[str, int] = {}
+        self.loop = None
+        self.task = None
+        self.loop_thread: Optional[int] = None
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "samples": self.samples,
+            "truncated": self.truncated,
+            "distinct_stacks": len(self.stacks),
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: `frame;frame;frame count` per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+_ACTIVE_PROFILE: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar(
+    "scamp_active_profile", default=None
+)
+
+
+def current_profile() -> Optional[Profile]:
+    return _ACTIVE_PROFILE.get()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse_stack(frame, thread_name: str) -> str:
+    labels: List[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    # Root first; worker threads share a role name ("scamp-image_3" -> "scamp-image")
+    labels.append(thread_name.rsplit("_", 1)[0] if thread_name[-1:].isdigit() else thread_name)
+    return ";".join(reversed(labels))
+
+
+class Profiler:
+    """
+    Keeps the active profiles and the most recent finished ones. The
+    sampler thread only runs while at least one profile is active.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        token: str = PROFILE_TOKEN,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        keep: int = PROFILE_KEEP,
+        max_active: int = PROFILE_MAX_ACTIVE,
+        max_seconds: float = PROFILE_MAX_SECONDS,
+    ):
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.token = token
+        self.interval = max(0.001, interval_ms / 1000.0)
+        self.max_active = max(1, max_active)
+        self.max_samples = max(1, int(max_seconds / self.interval))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._active: Dict[int, Profile] = {}
+        # thread ident -> profiles that thread is currently working for
+        self._threads: Dict[int, List[Profile]] = {}
+        self._recent: Deque[Profile] = deque(maxlen=max(1, keep))
+        self._sampler: Optional[threading.Thread] = None
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or bool(self.token)
+
+    def wants(self, path: str, header: Optional[str]) -> Optional[str]:
+        """Trigger name if this request should be profiled, else None."""
+        if path not in PROFILE_PATHS and not path.startswith(PROFILE_PREFIXES):
+            return None
+        # Constant-time: the token is a secret, like the admin token
+        if self.token and header is not None and hmac.compare_digest(header.encode(), self.token.encode()):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    # ---------- Lifecycle ----------
+
+    def begin(self, method: str, path: str, trigger: str) -> Optional[Profile]:
+        with self._lock:
+            if len(self._active) >= self.max_active:
+                self.skipped += 1
+                return None
+            profile = Profile(next(self._ids), method, path, trigger)
+            try:
+                profile.loop = asyncio.get_running_loop()
+                profile.task = asyncio.current_task()
+            except RuntimeError:
+                pass
+            profile.loop_thread = threading.get_ident()
+            self._active[profile.id] = profile
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="scamp-profiler", daemon=True)
+                self._sampler.start()
+        return profile
+
+    def finish(self, profile: Profile, status: Optional[int]) -> None:
+        profile.duration_ms = round((time.perf_counter() - profile.started) * 1000.0, 2)
+        profile.status = status
+        with self._lock:
+            self._active.pop(profile.id, None)
+            profile.loop = profile.task = None
+            self._recent.append(profile)
+
+    @contextmanager
+    def attached(self, profiles: Iterable[Profile]) -> Iterator[None]:
+        """Attribute this thread's samples to `profiles` for the duration of the block."""
+        tid = threading.get_ident()
+        profiles = list(profiles)
+        with self._lock:
+            self._threads.setdefault(tid, []).extend(profiles)
+        try:
+            yield
+        finally:
+            with self._lock:
+                tagged = self._threads.get(tid, [])
+                for profile in profiles:
+                    tagged.remove(profile)
+                if not tagged:
+                    self._threads.pop(tid, None)
+
+    # ---------- Sampling ----------
+
+    def _sample_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                active = list(self._active.values())
+                threads = {tid: list(profiles) for tid, profiles in self._threads.items()}
+            self._sample(active, threads)
+
+    def _sample(self, active: List[Profile], threads: Dict[int, List[Profile]]) -> None:
+        frames = sys._current_frames()
+        names = {t.ident: t.name for t in threading.enumerate()}
+
+        # Event loop thread: only while the profiled request's task is running on it
+        for profile in active:
+            loop, task = profile.loop, profile.task
+            if loop is None or task is None or profile.loop_thread not in frames:
+                continue
+            try:
+                running = asyncio.current_task(loop)
+            except RuntimeError:
+                continue
+            if running is task:
+                threads.setdefault(profile.loop_thread, []).append(profile)
+
+        collected = []
+        for tid, profiles in threads.items():
+            frame = frames.get(tid)
+            if frame is not None:
+                collected.append((collapse_stack(frame, names.get(tid, f"thread-{tid}")), profiles))
+        del frames
+
+        with self._lock:
+            for stack, profiles in collected:
+                for profile in profiles:
+                    # Finished since the snapshot: its stacks are read-only now
+                    if profile.id not in self._active:
+                        continue
+                    if profile.samples >= self.max_samples:
+                        profile.truncated = True
+                        continue
+                    profile.stacks[stack] = profile.stacks.get(stack, 0) + 1
+                    profile.samples += 1
+
+    # ---------- Queries ----------
+
+    def recent(self) -> List[Profile]:
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        return next((p for p in self.recent() if p.id == profile_id), None)
+
+    def merged(self, path: Optional[str] = None) -> str:
+        """All kept profiles (optionally for one path) folded into one collapsed profile."""
+        stacks: Dict[str, int] = {}
+        for profile in self.recent():
+            if path is not None and profile.path != path:
+                continue
+            for stack, count in profile.stacks.items():
+                stacks[stack] = stacks.get(stack, 0) + count
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "header_trigger": bool(self.token),
+                "interval_ms": self.interval * 1000.0,
+                "active": len(self._active),
+                "kept": len(self._recent),
+                "skipped_at_capacity": self.skipped,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_profiler() -> Profiler:
+    return Profiler()
+
+
+@contextmanager
+def profiled_thread(profiles: Iterable[Optional[Profile]]) -> Iterator[None]:
+    """Tag the calling thread for whichever of `profiles` are set (no-op if none)."""
+    profiles = [p for p in profiles if p is not None]
+    if not profiles:
+        yield
+        return
+    with get_profiler().attached(profiles):
+        yield
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware that starts a profile for sampled / header-triggered
+    requests and tells the client its id (X-Scamp-Profile-Id).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profiler = get_profiler()
+        if scope["type"] != "http" or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        header = None
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER:
+                header = value.decode("latin-1")
+                break
+        trigger = profiler.wants(scope.get("path", ""), header)
+        profile = profiler.begin(scope["method"], scope["path"], trigger) if trigger else None
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = None
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-scamp-profile-id", str(profile.id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _ACTIVE_PROFILE.set(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _ACTIVE_PROFILE.reset(token)
+            profiler.finish(profile, status)
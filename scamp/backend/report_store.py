@@ -0,0 +1,149 @@
+# backend/report_store.py
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from .db import get_event
+from .metrics import timed_stage
+from .reporting import REPORT_TEMPLATE_VERSION, build_pdf_report
+from .workers import get_inference_pool
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Rendered PDFs live here, one file per (event id, template version)
+REPORT_DIR = Path(os.getenv("SCAMP_REPORT_DIR", PROJECT_ROOT / "reports"))
+
+# Render reports for high-risk events in the background after analysis
+PRERENDER_HIGH_RISK = os.getenv("SCAMP_PRERENDER_REPORTS", "1") not in {"0", "false", "no"}
+
+
+# Names written by path_for(): scamp_report_<event id>.<template version>.pdf
+_CACHED_NAME = re.compile(r"scamp_report_\d+\.(.+)\.pdf")
+
+
+class EventNotFound(LookupError):
+    """No event with that id."""
+
+
+class ReportStore:
+    """
+    On-disk cache of rendered PDF reports. Events never change after they
+    are saved, so a report only needs rendering once per template version;
+    concurrent requests for the same report share one render.
+    """
+
+    def __init__(self, report_dir: Path, pool):
+        self.report_dir = report_dir
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        self.pool = pool
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self.hits = 0
+        self.renders = 0
+        self.failures = 0
+
+    def path_for(self, event_id: int) -> Path:
+        return self.report_dir / f"scamp_report_{event_id}.{REPORT_TEMPLATE_VERSION}.pdf"
+
+    @staticmethod
+    def etag_for(event_id: int) -> str:
+        # Weak: a re-render has the same content but a new "Generated" stamp
+        return f'W/"{event_id}-{REPORT_TEMPLATE_VERSION}"'
+
+    def cached_path(self, event_id: int) -> Optional[Path]:
+        path = self.path_for(event_id)
+        return path if path.exists() else None
+
+    def _render(self, event: Dict, path: Path) -> Path:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with timed_stage("build_report", media_type=event.get("media_type"), platform=event.get("platform")):
+                build_pdf_report(event, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return path
+
+    async def ensure(self, event_id: int) -> Path:
+        """
+        Return the rendered report for event_id, rendering it on the report
+        lane if needed. Raises EventNotFound if the event doesn't exist.
+        """
+        path = self.cached_path(event_id)
+        if path is not None:
+            self.hits += 1
+            return path
+
+        # The render runs in its own task: a caller that goes away (client
+        # disconnect, cancelled pre-render) doesn't cancel it for the others
+        task = self._inflight.get(event_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._produce(event_id))
+            self._inflight[event_id] = task
+            task.add_done_callback(lambda done: self._finished(event_id, done))
+        return await asyncio.shield(task)
+
+    async def _produce(self, event_id: int) -> Path:
+        event = await self.pool.run("io", get_event, event_id)
+        if not event:
+            raise EventNotFound(f"event {event_id} not found")
+        try:
+            path = await self.pool.run("report", self._render, event, self.path_for(event_id))
+        except Exception:
+            self.failures += 1
+            raise
+        self.renders += 1
+        return path
+
+    def _finished(self, event_id: int, task: asyncio.Task) -> None:
+        if self._inflight.get(event_id) is task:
+            del self._inflight[event_id]
+        # Retrieve the error even if every waiter was cancelled (no "never retrieved" noise)
+        if not task.cancelled():
+            task.exception()
+
+    async def prerender(self, event_id: int) -> None:
+        """Background task: warm the cache, never raise."""
+        try:
+            await self.ensure(event_id)
+            logger.info("Pre-rendered report for event %s", event_id)
+        except Exception as e:
+            logger.warning("Report pre-render for event %s failed: %s", event_id, e)
+
+    def purge_stale(self) -> int:
+        """
+        Delete cached reports rendered with an older template version. Only
+        names this store writes (scamp_report_<id>.<version>.pdf) are
+        considered; other PDFs in the directory are left alone.
+        """
+        removed = 0
+        for path in self.report_dir.glob("scamp_report_*.*.pdf"):
+            match = _CACHED_NAME.fullmatch(path.name)
+            if match and match.group(1) != REPORT_TEMPLATE_VERSION:
+                path.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info("Removed %d reports from older templates", removed)
+        return removed
+
+    def stats(self) -> Dict:
+        return {
+            "template_version": REPORT_TEMPLATE_VERSION,
+            "hits": self.hits,
+            "renders": self.renders,
+            "failures": self.failures,
+            "inflight": len(self._inflight),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_report_store() -> ReportStore:
+    return ReportStore(REPORT_DIR, get_inference_pool())
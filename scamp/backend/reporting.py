@@ -4,12 +4,22 @@ from __future__ import annotations
 
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List
 
+from reportlab import rl_config
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
 
+from .events import INSUFFICIENT_SPEECH
+
+# Binary (Flate-only) page streams: skips the ASCII85 pass, which is the
+# single most expensive step of saving a report and inflates it by 25%
+rl_config.useA85 = 0
+
 
 ACCENT = colors.HexColor("#0B7ED0")      # primary blue
 ACCENT_DARK = colors.HexColor("#09416A")
@@ -18,6 +28,34 @@ TEXT_DARK = colors.HexColor("#222222")
 TEXT_MUTED = colors.HexColor("#555555")
 BORDER = colors.HexColor("#D0D4DC")
 
+# Bump whenever the report layout/content changes: cached PDFs are keyed on it
+REPORT_TEMPLATE_VERSION = "report-v2"
+
+# Page geometry (A4)
+PAGE_WIDTH, PAGE_HEIGHT = A4
+LEFT_MARGIN = 20 * mm
+RIGHT_MARGIN = 20 * mm
+TOP_MARGIN = 40 * mm
+BOTTOM_MARGIN = 25 * mm
+CONTENT_WIDTH = PAGE_WIDTH - LEFT_MARGIN - RIGHT_MARGIN
+
+SUMMARY_BOX_HEIGHT = 60
+BADGE_W, BADGE_H = 150, 28
+
+ACTION_BULLETS = [
+    "Do NOT share OTPs, banking credentials, or identity documents with unverified parties.",
+    "Cross-check all payment links and URLs via official bank / government websites or apps.",
+    "Contact your bank and national cybercrime helpline immediately if money has already been sent.",
+    "Preserve all evidence (screenshots, chat logs, transaction IDs) before deleting anything.",
+]
+
+# Static page parts of multi-page PDFs: drawn once per document as form
+# XObjects and referenced from every page. (For a one-page report the
+# extra objects cost more to write than they save, so it draws inline.)
+PAGE_FORM = "scampPage"
+SECTION2_FORM = "scampSection2"
+ACTIONS_FORM = "scampActions"
+
 
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
@@ -56,7 +94,7 @@ def draw_header(c: canvas.Canvas, width: float, height: float):
 
 def draw_footer(c: canvas.Canvas, width: float):
     """
-    Professional footer with timestamp + disclaimer.
+    Professional footer: rule + disclaimer (the static part).
     """
     c.setStrokeColor(BORDER)
     c.setLineWidth(0.3)
@@ -64,41 +102,63 @@ def draw_footer(c: canvas.Canvas, width: float):
 
     c.setFillColor(TEXT_MUTED)
     c.setFont("Helvetica", 8)
-    ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
-
     c.drawString(20 * mm, 18 * mm, "Generated automatically by SCAMP risk engine.")
     c.drawString(20 * mm, 14 * mm, "This report is advisory and may not be 100% accurate. Verify with official sources.")
-    c.drawRightString(width - 20 * mm, 18 * mm, f"Generated: {ts}")
-    c.drawRightString(width - 20 * mm, 14 * mm, "Page 1")
+
+
+def draw_footer_stamp(c: canvas.Canvas, width: float, generated: str, page_number: int = 1):
+    """
+    Per-page footer text: generation timestamp + page number.
+    """
+    c.setFillColor(TEXT_MUTED)
+    c.setFont("Helvetica", 8)
+    c.drawRightString(width - 20 * mm, 18 * mm, f"Generated: {generated}")
+    c.drawRightString(width - 20 * mm, 14 * mm, f"Page {page_number}")
+
+
+@lru_cache(maxsize=16384)
+def word_width(word: str, font_name: str, font_size: float) -> float:
+    return stringWidth(word, font_name, font_size)
 
 
 def wrap_text(c: canvas.Canvas, text: str, max_width: float, font_name="Helvetica", font_size=9):
     """
-    Simple word-wrapping helper for long lines.
+    Simple word-wrapping helper for long lines. Widths are summed from
+    cached per-word widths (the standard fonts have no kerning, so this
+    equals measuring the joined line).
     """
-    c.setFont(font_name, font_size)
     words = (text or "").split()
     lines = []
-    current = ""
+    current: List[str] = []
+    current_w = 0.0
+    space_w = word_width(" ", font_name, font_size)
 
     for w in words:
-        test = f"{current} {w}".strip()
-        if c.stringWidth(test, font_name, font_size) <= max_width:
-            current = test
+        ww = word_width(w, font_name, font_size)
+        test_w = current_w + space_w + ww if current else ww
+        if test_w <= max_width:
+            current.append(w)
+            current_w = test_w
         else:
             if current:
-                lines.append(current)
-            current = w
+                lines.append(" ".join(current))
+            current = [w]
+            current_w = ww
     if current:
-        lines.append(current)
+        lines.append(" ".join(current))
     return lines
 
 
-def risk_bucket(score: float):
+def risk_bucket(score: float, event_label: str = ""):
     """
-    Return (color, label, description) for a given risk score.
+    Return (color, label, description) for a given risk score (or for
+    audio the detector could not score, see events.INSUFFICIENT_SPEECH).
     """
-    if score >= 75:
+    if event_label == INSUFFICIENT_SPEECH:
+        color = colors.HexColor("#757575")   # grey
+        label = "INSUFFICIENT SPEECH"
+        desc = "Too little speech in this recording to assess it."
+    elif score >= 75:
         color = colors.HexColor("#D32F2F")   # red
         label = "HIGH RISK"
         desc = "Likely scam or deepfake activity detected."
@@ -113,68 +173,178 @@ def risk_bucket(score: float):
     return color, label, desc
 
 
+# ---------- Static page forms ----------
+
+def _draw_page_chrome(c: canvas.Canvas) -> None:
+    """Header, summary panel, section 1 heading and footer text: identical on every page."""
+    y = PAGE_HEIGHT - TOP_MARGIN
+
+    draw_header(c, PAGE_WIDTH, PAGE_HEIGHT)
+
+    c.setFillColor(BG_LIGHT)
+    c.roundRect(
+        LEFT_MARGIN, y - SUMMARY_BOX_HEIGHT + 10, CONTENT_WIDTH, SUMMARY_BOX_HEIGHT,
+        radius=6, fill=True, stroke=0,
+    )
+    c.setFillColor(TEXT_DARK)
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(LEFT_MARGIN + 8, y + 24, "Executive Summary")
+
+    y -= SUMMARY_BOX_HEIGHT + 20
+    c.setFillColor(TEXT_DARK)
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(LEFT_MARGIN, y, "1. Case Metadata")
+    c.setStrokeColor(BORDER)
+    c.setLineWidth(0.5)
+    c.line(LEFT_MARGIN, y - 14, LEFT_MARGIN + CONTENT_WIDTH, y - 14)
+
+    draw_footer(c, PAGE_WIDTH)
+
+
+def _draw_section2_heading(c: canvas.Canvas, y: float) -> None:
+    c.setFillColor(TEXT_DARK)
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(LEFT_MARGIN, y, "2. Risk Classification & Recommendations")
+    c.setStrokeColor(BORDER)
+    c.setLineWidth(0.5)
+    c.line(LEFT_MARGIN, y - 14, LEFT_MARGIN + CONTENT_WIDTH, y - 14)
+
+
+@lru_cache(maxsize=1)
+def _actions_lines() -> List[List[str]]:
+    return [
+        wrap_text(None, b, max_width=CONTENT_WIDTH - 12, font_name="Helvetica", font_size=9)
+        for b in ACTION_BULLETS
+    ]
+
+
+@lru_cache(maxsize=1)
+def actions_height() -> float:
+    return 14 + sum(max(14, 11 * len(lines) + 2) for lines in _actions_lines())
+
+
+def _draw_actions(c: canvas.Canvas, y: float, min_y: float = float("-inf")) -> float:
+    """'Recommended Actions' block with its top at y; stops below min_y. Returns the new y."""
+    c.setFillColor(TEXT_DARK)
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(LEFT_MARGIN, y, "Recommended Actions:")
+    y -= 14
+
+    c.setFont("Helvetica", 9)
+    for bullet_lines in _actions_lines():
+        c.drawString(LEFT_MARGIN, y, "•")
+        for idx, line in enumerate(bullet_lines):
+            c.drawString(LEFT_MARGIN + 10, y - idx * 11, line)
+        y -= max(14, 11 * len(bullet_lines) + 2)
+
+        if y < min_y:
+            break
+    return y
+
+
+def _ensure_forms(c: canvas.Canvas) -> None:
+    if c.hasForm(PAGE_FORM):
+        return
+    c.beginForm(PAGE_FORM)
+    _draw_page_chrome(c)
+    c.endForm()
+
+    # Placed with translate; forms clip to their bbox, so it must reach below y=0
+    c.beginForm(SECTION2_FORM, lowery=-20, uppery=20)
+    _draw_section2_heading(c, 0)
+    c.endForm()
+
+    c.beginForm(ACTIONS_FORM, lowery=-actions_height() - 10, uppery=20)
+    _draw_actions(c, 0)
+    c.endForm()
+
+
+def _place_form(c: canvas.Canvas, name: str, y: float) -> None:
+    c.saveState()
+    c.translate(0, y)
+    c.doForm(name)
+    c.restoreState()
+
+
+# ---------- Documents ----------
+
 def build_pdf_report(event: dict, out_path: Path) -> None:
     ensure_dir(out_path.parent)
 
     c = canvas.Canvas(str(out_path), pagesize=A4)
-    width, height = A4
+    draw_report_page(c, event)
+    c.save()
 
-    # Layout constants
-    left_margin = 20 * mm
-    right_margin = 20 * mm
-    top_margin = 40 * mm
-    bottom_margin = 25 * mm
-    content_width = width - left_margin - right_margin
 
-    # === HEADER ===
-    draw_header(c, width, height)
+def build_combined_report(events: Iterable[dict], out_path: Path) -> int:
+    """One multi-page PDF with a report page per event. Returns the page count."""
+    ensure_dir(out_path.parent)
 
-    y = height - top_margin
+    c = canvas.Canvas(str(out_path), pagesize=A4)
+    generated = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    pages = 0
+    for event in events:
+        pages += 1
+        draw_report_page(c, event, page_number=pages, generated=generated, use_forms=True)
+    if not pages:
+        c.showPage()
+    c.save()
+    return pages
 
-    def write_line(text: str, size=9, bold=False, color=TEXT_DARK, leading=12):
-        nonlocal y
-        c.setFont("Helvetica-Bold" if bold else "Helvetica", size)
-        c.setFillColor(color)
-        c.drawString(left_margin, y, text)
-        y -= leading
 
-    # === EXECUTIVE SUMMARY ===
-    c.setFillColor(BG_LIGHT)
-    box_height = 60
-    c.roundRect(left_margin, y - box_height + 10, content_width, box_height, radius=6, fill=True, stroke=0)
+def draw_report_page(
+    c: canvas.Canvas,
+    event: dict,
+    page_number: int = 1,
+    generated: str = "",
+    use_forms: bool = False,
+) -> None:
+    """
+    Draw one report page. With use_forms, the static chrome comes from form
+    XObjects defined once per document.
+    """
+    if use_forms:
+        _ensure_forms(c)
+        c.doForm(PAGE_FORM)
+    else:
+        _draw_page_chrome(c)
 
-    c.setFillColor(TEXT_DARK)
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(left_margin + 8, y + 24, "Executive Summary")
+    left_margin = LEFT_MARGIN
+    content_width = CONTENT_WIDTH
+    y = PAGE_HEIGHT - TOP_MARGIN
 
+    # === EXECUTIVE SUMMARY ===
     score = float(event.get("score", 0.0))
     label = (event.get("label", "") or "").replace("_", " ").title()
-    risk_color, risk_label, risk_desc = risk_bucket(score)
+    unscored = event.get("label") == INSUFFICIENT_SPEECH
+    risk_color, risk_label, risk_desc = risk_bucket(score, event.get("label", ""))
 
     # Score badge (right side)
-    badge_w, badge_h = 150, 28
-    x_badge = left_margin + content_width - badge_w - 8
+    x_badge = left_margin + content_width - BADGE_W - 8
     y_badge = y + 10
     c.setFillColor(risk_color)
-    c.roundRect(x_badge, y_badge, badge_w, badge_h, radius=6, fill=True, stroke=False)
+    c.roundRect(x_badge, y_badge, BADGE_W, BADGE_H, radius=6, fill=True, stroke=False)
 
     c.setFillColor(colors.white)
     c.setFont("Helvetica-Bold", 11)
     c.drawCentredString(
-        x_badge + badge_w / 2,
+        x_badge + BADGE_W / 2,
         y_badge + 8,
-        f"{risk_label}  ({score:.1f}%)",
+        risk_label if unscored else f"{risk_label}  ({score:.1f}%)",
     )
 
     # Summary text
-    summary_text = (
-        f"SCAMP analysed the submitted media and classified it as {risk_label.lower()} "
-        f"with a confidence score of {score:.1f}%. {risk_desc}"
-    )
+    if unscored:
+        summary_text = f"SCAMP could not score the submitted media. {risk_desc}"
+    else:
+        summary_text = (
+            f"SCAMP analysed the submitted media and classified it as {risk_label.lower()} "
+            f"with a confidence score of {score:.1f}%. {risk_desc}"
+        )
     summary_lines = wrap_text(
         c,
         summary_text,
-        max_width=content_width - 16 - badge_w,
+        max_width=content_width - 16 - BADGE_W,
         font_name="Helvetica",
         font_size=9,
     )
@@ -186,18 +356,10 @@ def build_pdf_report(event: dict, out_path: Path) -> None:
         c.drawString(left_margin + 8, y_text, line)
         y_text -= 11
 
-    y -= box_height + 20
+    y -= SUMMARY_BOX_HEIGHT + 20
 
-    # === SECTION: CASE METADATA ===
-    c.setFillColor(TEXT_DARK)
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(left_margin, y, "1. Case Metadata")
-    y -= 14
-
-    c.setStrokeColor(BORDER)
-    c.setLineWidth(0.5)
-    c.line(left_margin, y, left_margin + content_width, y)
-    y -= 10
+    # === SECTION: CASE METADATA === (heading + rule are in the page form)
+    y -= 24
 
     meta_rows = [
         ("Event ID", event.get("id", "N/A")),
@@ -227,61 +389,38 @@ def build_pdf_report(event: dict, out_path: Path) -> None:
             c.drawString(left_margin + label_width, first_line_y - (idx * (row_height - 3)), line)
         y -= max(row_height, row_height + (len(lines) - 1) * (row_height - 3))
 
-        if y < bottom_margin + 60:
+        if y < BOTTOM_MARGIN + 60:
             # (If you later add multi-page, handle page break here)
             break
 
     y -= 10
 
     # === SECTION: RISK CLASSIFICATION & RECOMMENDATIONS ===
-    c.setFillColor(TEXT_DARK)
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(left_margin, y, "2. Risk Classification & Recommendations")
-    y -= 14
-
-    c.setStrokeColor(BORDER)
-    c.setLineWidth(0.5)
-    c.line(left_margin, y, left_margin + content_width, y)
-    y -= 14
+    if use_forms:
+        _place_form(c, SECTION2_FORM, y)
+    else:
+        _draw_section2_heading(c, y)
+    y -= 28
 
     # Risk explanation block
     c.setFillColor(risk_color)
     c.roundRect(left_margin, y - 36, content_width, 32, radius=6, fill=True, stroke=False)
     c.setFillColor(colors.white)
     c.setFont("Helvetica-Bold", 10)
-    c.drawString(left_margin + 8, y - 14, f"Score: {score:.2f}%  |  {risk_label}  |  {risk_desc}")
+    score_text = "Score: n/a" if unscored else f"Score: {score:.2f}%"
+    c.drawString(left_margin + 8, y - 14, f"{score_text}  |  {risk_label}  |  {risk_desc}")
     y -= 44
 
-    # Advisory bullets
-    c.setFillColor(TEXT_DARK)
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(left_margin, y, "Recommended Actions:")
-    y -= 14
-
-    bullets = [
-        "Do NOT share OTPs, banking credentials, or identity documents with unverified parties.",
-        "Cross-check all payment links and URLs via official bank / government websites or apps.",
-        "Contact your bank and national cybercrime helpline immediately if money has already been sent.",
-        "Preserve all evidence (screenshots, chat logs, transaction IDs) before deleting anything.",
-    ]
-
-    c.setFont("Helvetica", 9)
-    for b in bullets:
-        bullet_lines = wrap_text(c, b, max_width=content_width - 12, font_name="Helvetica", font_size=9)
-        c.drawString(left_margin, y, "•")
-        line_y = y
-        for idx, line in enumerate(bullet_lines):
-            c.drawString(left_margin + 10, line_y - idx * 11, line)
-        y -= max(14, 11 * len(bullet_lines) + 2)
-
-        if y < bottom_margin + 40:
-            break
+    # Advisory bullets: the prerendered block when it fits, else clipped like before
+    if use_forms and y - actions_height() >= BOTTOM_MARGIN + 40:
+        _place_form(c, ACTIONS_FORM, y)
+    else:
+        _draw_actions(c, y, min_y=BOTTOM_MARGIN + 40)
 
     # (Optional) section placeholder for future:
     # "3. Technical Indicators", "4. Model Version & Limitations", etc.
 
     # === FOOTER ===
-    draw_footer(c, width)
+    draw_footer_stamp(c, PAGE_WIDTH, generated or datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"), page_number)
 
     c.showPage()
-    c.save()
@@ -0,0 +1,289 @@
+# backend/rollups.py
+#
+# Hourly and daily event rollups, kept in step with `events` inside the
+# same write transaction, so /stats never has to scan the events table.
+#
+#   python -m backend.rollups rebuild     # backfill from existing events
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Score histogram: HIST_BINS equal-width bins over 0–100 (100 lands in the last)
+HIST_BINS = 10
+HIST_COLUMNS = [f"h{i}" for i in range(HIST_BINS)]
+
+# Events folded per transaction during a rebuild. Each chunk holds the
+# write lock, so it must stay far below the server's busy_timeout (5 s):
+# 5k events take ~50 ms. The pause lets live inserts in between chunks.
+REBUILD_CHUNK = 5_000
+REBUILD_PAUSE_SECONDS = 0.02
+
+# Signals (highlight types) reported per /stats query
+TOP_SIGNALS = 10
+
+# resolution -> (rollup table, signal table, bucket format, bucket length).
+# Long /stats windows read the daily tables so the rows scanned stay small
+# whatever the window.
+ROLLUP_TABLES = {
+    "hour": ("event_rollups_hourly", "event_signals_hourly", "%Y-%m-%d %H:00:00", timedelta(hours=1)),
+    "day": ("event_rollups_daily", "event_signals_daily", "%Y-%m-%d 00:00:00", timedelta(days=1)),
+}
+
+_BAND_EXPR = "CASE WHEN label LIKE '%\\_risk' ESCAPE '\\' THEN substr(label, 1, length(label) - 5) ELSE label END"
+_BIN_EXPR = f"MIN({HIST_BINS - 1}, MAX(0, CAST(score * {HIST_BINS} / 100.0 AS INTEGER)))"
+
+
+def _apply_sql(table: str, bucket_format: str) -> str:
+    """Fold a range of events into one rollup table (upsert: adds to existing buckets)."""
+    return f"""
+        INSERT INTO {table}
+            (bucket, platform, media_type, band, count, score_sum, {", ".join(HIST_COLUMNS)})
+        SELECT strftime('{bucket_format}', created_at), platform, media_type, {_BAND_EXPR},
+               COUNT(*), SUM(score), {", ".join(f"SUM({_BIN_EXPR} = {i})" for i in range(HIST_BINS))}
+        FROM events
+        WHERE id BETWEEN ? AND ?
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (bucket, platform, media_type, band) DO UPDATE SET
+            count = count + excluded.count,
+            score_sum = score_sum + excluded.score_sum,
+            {", ".join(f"{h} = {h} + excluded.{h}" for h in HIST_COLUMNS)}
+    """
+
+
+def _apply_signals_sql(table: str, bucket_format: str) -> str:
+    """Same for the per-signal counts (one row per event per distinct signal)."""
+    return f"""
+        INSERT INTO {table} (bucket, platform, media_type, band, signal, count)
+        SELECT strftime('{bucket_format}', e.created_at), e.platform, e.media_type, {_BAND_EXPR},
+               s.value, COUNT(*)
+        FROM events AS e, json_each(e.signals) AS s
+        WHERE e.id BETWEEN ? AND ? AND e.signals IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (bucket, platform, media_type, band, signal) DO UPDATE SET
+            count = count + excluded.count
+    """
+
+
+_APPLY_SQL = [
+    sql
+    for table, signal_table, fmt, _ in ROLLUP_TABLES.values()
+    for sql in (_apply_sql(table, fmt), _apply_signals_sql(signal_table, fmt))
+]
+
+
+def create_rollup_schema(conn: sqlite3.Connection) -> None:
+    hist = ", ".join(f"{h} INTEGER NOT NULL DEFAULT 0" for h in HIST_COLUMNS)
+    for table, signal_table, _, _ in ROLLUP_TABLES.values():
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                media_type TEXT NOT NULL,
+                band TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                score_sum REAL NOT NULL DEFAULT 0,
+                {hist},
+                PRIMARY KEY (bucket, platform, media_type, band)
+            ) WITHOUT ROWID;
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {signal_table} (
+                bucket TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                media_type TEXT NOT NULL,
+                band TEXT NOT NULL,
+                signal TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, platform, media_type, band, signal)
+            ) WITHOUT ROWID;
+            """
+        )
+
+
+def apply_event_range(conn: sqlite3.Connection, first_id: int, last_id: int) -> None:
+    """Add events first_id..last_id to the rollups (caller owns the transaction)."""
+    for sql in _APPLY_SQL:
+        conn.execute(sql, (first_id, last_id))
+
+
+def query_rollups(
+    conn: sqlite3.Connection,
+    since: str,
+    until: str,
+    platform: Optional[str] = None,
+    media_type: Optional[str] = None,
+    resolution: str = "hour",
+    max_points: Optional[int] = None,
+) -> Dict:
+    """
+    Aggregate the buckets in [since, until) (bucket keys of `resolution`).
+    Reads at most buckets x platforms x media types x bands rows. With
+    max_points, the series is merged into at most that many equal-width,
+    time-aligned buckets.
+    """
+    table, signal_table, fmt, step = ROLLUP_TABLES[resolution]
+    where = "bucket >= ? AND bucket < ?"
+    params: List = [since, until]
+    if platform is not None:
+        where += " AND platform = ?"
+        params.append(platform)
+    if media_type is not None:
+        where += " AND media_type = ?"
+        params.append(media_type)
+
+    series: Dict[str, Dict] = {}
+    for bucket, band, count, score_sum in conn.execute(
+        f"""
+        SELECT bucket, band, SUM(count), SUM(score_sum) FROM {table}
+        WHERE {where} GROUP BY bucket, band ORDER BY bucket
+        """,
+        params,
+    ):
+        point = series.setdefault(bucket, {"bucket": bucket, "count": 0, "score_sum": 0.0, "bands": {}})
+        point["count"] += count
+        point["score_sum"] += score_sum
+        point["bands"][band] = count
+
+    total = {"count": 0, "score_sum": 0.0, "histogram": [0] * HIST_BINS}
+    by_band: Dict[str, int] = {}
+    by_platform: Dict[str, int] = {}
+    by_media_type: Dict[str, int] = {}
+    sums = ", ".join(f"SUM({h})" for h in HIST_COLUMNS)
+    for row in conn.execute(
+        f"""
+        SELECT platform, media_type, band, SUM(count), SUM(score_sum), {sums}
+        FROM {table} WHERE {where} GROUP BY platform, media_type, band
+        """,
+        params,
+    ):
+        row_platform, row_media, band, count, score_sum = row[:5]
+        total["count"] += count
+        total["score_sum"] += score_sum
+        for i, n in enumerate(row[5:]):
+            total["histogram"][i] += n
+        by_band[band] = by_band.get(band, 0) + count
+        by_platform[row_platform] = by_platform.get(row_platform, 0) + count
+        by_media_type[row_media] = by_media_type.get(row_media, 0) + count
+
+    top_signals = [
+        {"signal": signal, "count": count, "high": high}
+        for signal, count, high in conn.execute(
+            f"""
+            SELECT signal, SUM(count), SUM(CASE WHEN band = 'high' THEN count ELSE 0 END)
+            FROM {signal_table} WHERE {where}
+            GROUP BY signal ORDER BY 2 DESC LIMIT ?
+            """,
+            params + [TOP_SIGNALS],
+        )
+    ]
+
+    points = list(series.values())
+    if max_points:
+        points, step = downsample(points, since, until, fmt, step, max_points)
+
+    def finish(agg: Dict) -> Dict:
+        score_sum = agg.pop("score_sum")
+        agg["avg_score"] = round(score_sum / agg["count"], 2) if agg["count"] else None
+        return agg
+
+    return {
+        "total": finish(total),
+        "by_band": by_band,
+        "by_platform": by_platform,
+        "by_media_type": by_media_type,
+        "top_signals": top_signals,
+        "resolution": resolution,
+        "bucket_seconds": int(step.total_seconds()),
+        "series": [finish(point) for point in points],
+        "histogram_bins": [round(i * 100.0 / HIST_BINS, 1) for i in range(HIST_BINS + 1)],
+    }
+
+
+def downsample(
+    points: List[Dict],
+    since: str,
+    until: str,
+    fmt: str,
+    step: timedelta,
+    max_points: int,
+) -> Tuple[List[Dict], timedelta]:
+    """
+    Merge series points into buckets `factor` times wider, aligned to
+    `since`, so [since, until) spans at most max_points buckets. Returns
+    the merged points (still carrying score_sum) and the new bucket width.
+    """
+    start = datetime.strptime(since, fmt)
+    span = int((datetime.strptime(until, fmt) - start) / step)
+    factor = -(-span // max(1, max_points))
+    if factor <= 1:
+        return points, step
+
+    wide = step * factor
+    merged: Dict[str, Dict] = {}
+    for point in points:
+        offset = (datetime.strptime(point["bucket"], fmt) - start) // wide
+        key = (start + wide * offset).strftime(fmt)
+        into = merged.setdefault(key, {"bucket": key, "count": 0, "score_sum": 0.0, "bands": {}})
+        into["count"] += point["count"]
+        into["score_sum"] += point["score_sum"]
+        for band, n in point["bands"].items():
+            into["bands"][band] = into["bands"].get(band, 0) + n
+    return list(merged.values()), wide
+
+
+def rebuild(storage, chunk: int = REBUILD_CHUNK, pause: float = REBUILD_PAUSE_SECONDS) -> int:
+    """
+    Recompute the rollups from `events`. Safe while the server is writing:
+    the reset and the high-water mark are taken in one transaction, and
+    events inserted after it are rolled up by the live write path.
+    """
+
+    def reset(conn: sqlite3.Connection) -> int:
+        for table, signal_table, _, _ in ROLLUP_TABLES.values():
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"DELETE FROM {signal_table}")
+        return int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0])
+
+    chunk = max(1, int(chunk))
+    max_id = storage.write(reset)
+    for first_id in range(1, max_id + 1, chunk):
+        last_id = min(max_id, first_id + chunk - 1)
+        storage.write(lambda conn, a=first_id, b=last_id: apply_event_range(conn, a, b))
+        if pause and last_id < max_id:
+            time.sleep(pause)
+    return max_id
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--chunk", type=int, default=REBUILD_CHUNK, help="events per write transaction")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from .db import close_db, get_storage, init_db
+
+    init_db()
+    started = time.perf_counter()
+    try:
+        max_id = rebuild(get_storage(), chunk=args.chunk)
+    finally:
+        close_db()
+    logger.info("Rebuilt rollups for events up to id %d in %.1fs", max_id, time.perf_counter() - started)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+# backend/rules.py
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Optional JSON ruleset to load instead of DEFAULT_RULESET
+RULESET_PATH = os.getenv("SCAMP_TEXT_RULES_PATH")
+
+# Declarative text scam rules. Keywords are matched case-insensitively as
+# substrings (each rule scores once); patterns are regexes (each match scores).
+DEFAULT_RULESET: Dict[str, Any] = {
+    "version": "text-rules-v1",
+    "weights": {
+        "kyc": 10,
+        "otp": 20,
+        "bank": 10,
+        "link": 15,
+        "urgency": 15,
+        "threat": 20,
+        "upi": 10,
+        "refund": 10,
+    },
+    "default_weight": 5,
+    "keywords": [
+        # KYC
+        {"phrase": "kyc", "type": "kyc"},
+        {"phrase": "video kyc", "type": "kyc"},
+        # OTP
+        {"phrase": "otp", "type": "otp"},
+        {"phrase": "one time password", "type": "otp"},
+        # Bank / payment words
+        {"phrase": "net banking", "type": "bank"},
+        {"phrase": "upi", "type": "bank"},
+        {"phrase": "imps", "type": "bank"},
+        {"phrase": "rtgs", "type": "bank"},
+        {"phrase": "neft", "type": "bank"},
+        {"phrase": "account freeze", "type": "bank"},
+        {"phrase": "account block", "type": "bank"},
+        # Urgency / threats
+        {"phrase": "within 15 minutes", "type": "urgency"},
+        {"phrase": "within 30 minutes", "type": "urgency"},
+        {"phrase": "immediately", "type": "urgency"},
+        {"phrase": "right now", "type": "urgency"},
+        {"phrase": "or your account will be blocked", "type": "urgency"},
+        {"phrase": "or it will be blocked", "type": "urgency"},
+        {"phrase": "to avoid fir", "type": "urgency"},
+        # Refund / lottery style
+        {"phrase": "refund", "type": "refund"},
+        {"phrase": "prize", "type": "refund"},
+        {"phrase": "lottery", "type": "refund"},
+        {"phrase": "cashback", "type": "refund"},
+    ],
+    "patterns": [
+        {"regex": r"https?://\S+", "type": "link"},
+    ],
+}
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring automaton: finds every occurrence of every
+    keyword (overlaps included) in a single left-to-right pass.
+    """
+
+    def __init__(self, keywords: List[str]):
+        # Node i: goto[i] = {char: node}, fail[i] = node, out[i] = [keyword ids]
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        self.lengths = [len(k) for k in keywords]
+
+        for kid, word in enumerate(keywords):
+            node = 0
+            for ch in word:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append(kid)
+
+        # BFS to fill failure links and merge outputs along them
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def finditer(self, text: str):
+        """Yield (keyword_id, start, end) for every match in text."""
+        goto, fail, out, lengths = self.goto, self.fail, self.out, self.lengths
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                end = i + 1
+                for kid in out[node]:
+                    yield kid, end - lengths[kid], end
+
+
+def _lower_with_offsets(text: str) -> Tuple[str, Optional[List[int]]]:
+    """
+    Lowercase text, plus a map from lowered index -> original index when
+    lowercasing changed the length (e.g. 'İ'), so offsets stay correct.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered, None
+
+    chars: List[str] = []
+    offsets: List[int] = []
+    for idx, ch in enumerate(text):
+        low = ch.lower()
+        chars.append(low)
+        offsets.extend([idx] * len(low))
+    offsets.append(len(text))
+    return "".join(chars), offsets
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_shape(ruleset: Any) -> None:
+    """Reject structurally wrong rulesets with a ValueError (not a crash mid-compile)."""
+    if not isinstance(ruleset, dict):
+        raise ValueError("ruleset must be a JSON object")
+
+    weights = ruleset.get("weights")
+    if weights is not None:
+        if not isinstance(weights, dict):
+            raise ValueError("weights must be an object of type -> number")
+        bad = [k for k, v in weights.items() if not _is_number(v)]
+        if bad:
+            raise ValueError(f"weights must be numbers (bad: {', '.join(map(str, bad))})")
+    if "default_weight" in ruleset and not _is_number(ruleset["default_weight"]):
+        raise ValueError("default_weight must be a number")
+
+    for key in ("keywords", "patterns"):
+        rules = ruleset.get(key)
+        if rules is None:
+            continue
+        if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+            raise ValueError(f"{key} must be a list of objects")
+    for rule in ruleset.get("keywords") or []:
+        if not isinstance(rule.get("phrase"), str):
+            raise ValueError(f"keyword rule phrase must be a string: {rule!r}")
+    for rule in ruleset.get("patterns") or []:
+        if not isinstance(rule.get("regex"), str):
+            raise ValueError(f"pattern rule regex must be a string: {rule!r}")
+
+
+class CompiledRuleset:
+    """A ruleset compiled once into an automaton + precompiled regexes."""
+
+    def __init__(self, ruleset: Dict[str, Any]):
+        _check_shape(ruleset)
+        self.source = ruleset
+        self.version = str(ruleset.get("version") or "custom")
+        self.weights: Dict[str, float] = {k: float(v) for k, v in (ruleset.get("weights") or {}).items()}
+        self.default_weight = float(ruleset.get("default_weight", 5))
+
+        self.keyword_types: List[str] = []
+        phrases: List[str] = []
+        for rule in ruleset.get("keywords") or []:
+            phrase = str(rule.get("phrase") or "").lower()
+            if not phrase:
+                raise ValueError(f"keyword rule without phrase: {rule!r}")
+            phrases.append(phrase)
+            self.keyword_types.append(str(rule.get("type") or "signal"))
+        self.automaton = AhoCorasick(phrases)
+
+        self.patterns: List[Tuple[re.Pattern, str]] = []
+        for rule in ruleset.get("patterns") or []:
+            try:
+                regex = re.compile(rule["regex"])
+            except (KeyError, re.error) as e:
+                raise ValueError(f"invalid pattern rule {rule!r}: {e}") from e
+            self.patterns.append((regex, str(rule.get("type") or "signal")))
+
+    def weight(self, htype: str) -> float:
+        return self.weights.get(htype, self.default_weight)
+
+    def scan(self, text: str) -> Tuple[float, List[Dict]]:
+        """
+        Score text and return highlights with offsets into the original text.
+        Each keyword rule counts once (first occurrence); each regex match counts.
+        """
+        lowered, offsets = _lower_with_offsets(text)
+        highlights: List[Dict] = []
+        score = 0.0
+
+        seen = set()
+        for kid, start, end in self.automaton.finditer(lowered):
+            if kid in seen:
+                continue
+            seen.add(kid)
+            if offsets is not None:
+                start, end = offsets[start], offsets[end]
+            htype = self.keyword_types[kid]
+            highlights.append({"span": text[start:end], "type": htype, "start": start, "end": end})
+            score += self.weight(htype)
+
+        for regex, htype in self.patterns:
+            for m in regex.finditer(text):
+                highlights.append({"span": m.group(0), "type": htype, "start": m.start(), "end": m.end()})
+                score += self.weight(htype)
+
+        highlights.sort(key=lambda h: (h["start"], -h["end"]))
+        return score, highlights
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "keywords": len(self.keyword_types),
+            "patterns": len(self.patterns),
+            "automaton_states": len(self.automaton.goto),
+        }
+
+
+_lock = threading.Lock()
+_active: Optional[CompiledRuleset] = None
+
+
+def load_ruleset_file(path: str) -> Dict[str, Any]:
+    with open(Path(path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def set_ruleset(ruleset: Dict[str, Any]) -> CompiledRuleset:
+    """
+    Compile and atomically swap in a new ruleset. In-flight scans keep using
+    the one they started with. Raises ValueError if the ruleset is invalid.
+    """
+    global _active
+    compiled = CompiledRuleset(ruleset)
+    with _lock:
+        _active = compiled
+    logger.info("Text ruleset %s active: %s", compiled.version, compiled.describe())
+    return compiled
+
+
+def reload_ruleset() -> CompiledRuleset:
+    """(Re)load from SCAMP_TEXT_RULES_PATH, or the built-in defaults."""
+    if RULESET_PATH:
+        return set_ruleset(load_ruleset_file(RULESET_PATH))
+    return set_ruleset(DEFAULT_RULESET)
+
+
+def get_ruleset() -> CompiledRuleset:
+    compiled = _active
+    if compiled is None:
+        with _lock:
+            compiled = _active
+        if compiled is None:
+            compiled = reload_ruleset()
+    return compiled
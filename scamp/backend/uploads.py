@@ -0,0 +1,307 @@
+# backend/uploads.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from .metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+# Hard cap on uploaded media size; larger bodies are rejected early with 413
+MAX_UPLOAD_BYTES = int(float(os.getenv("SCAMP_MAX_UPLOAD_MB", "20")) * 1024 * 1024)
+
+# Read/write granularity when copying uploads to disk
+UPLOAD_CHUNK_BYTES = int(os.getenv("SCAMP_UPLOAD_CHUNK_KB", "256")) * 1024
+
+# Slack for multipart boundaries + form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Routes whose request bodies the middleware bounds
+LIMITED_PATHS = {"/analyze"}
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeded MAX_UPLOAD_BYTES."""
+
+
+class UploadFormError(ValueError):
+    """The multipart body is malformed (or not multipart at all)."""
+
+
+class StoredUpload:
+    """An upload streamed into a temp file under the upload dir."""
+
+    def __init__(self, tmp_path: Path, size: int, sha256: str):
+        self.tmp_path = tmp_path
+        self.size = size
+        self.sha256 = sha256
+
+    def commit(self, dest: Path) -> Path:
+        os.replace(self.tmp_path, dest)
+        return dest
+
+    def discard(self) -> None:
+        try:
+            self.tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class UploadForm:
+    """Text fields of a multipart upload, plus its one file part (if sent)."""
+
+    def __init__(self, fields: Dict[str, str], upload: Optional[StoredUpload], filename: Optional[str]):
+        self.fields = fields
+        self.upload = upload
+        self.filename = filename
+
+
+class _FormParser:
+    """
+    python-multipart callbacks. They run synchronously inside
+    parser.write(), so file data is only collected here and written out
+    (on the io lane) by receive_upload between body messages.
+    """
+
+    def __init__(self, file_field: str, max_bytes: int):
+        self.file_field = file_field
+        self.max_bytes = max_bytes
+        self.fields: Dict[str, str] = {}
+        self.field_bytes = 0
+        self.filename: Optional[str] = None
+        self.file_seen = False
+        self.file_size = 0
+        self.pending: List[bytes] = []
+        self.complete = False
+        self._name: Optional[str] = None
+        self._is_file = False
+        self._value = bytearray()
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self) -> None:
+        self._name, self._is_file, self._disposition = None, False, b""
+        self._value = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"name" not in options:
+            raise UploadFormError("multipart part without a name")
+        self._name = options[b"name"].decode("utf-8", "replace")
+        if b"filename" in options:
+            if self._name != self.file_field or self.file_seen:
+                raise UploadFormError(f"only one file part ({self.file_field!r}) is accepted")
+            self._is_file = self.file_seen = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._is_file:
+            self.file_size += end - start
+            if self.file_size > self.max_bytes:
+                raise UploadTooLarge(f"upload exceeds {self.max_bytes} bytes")
+            self.pending.append(data[start:end])
+            return
+        self.field_bytes += end - start
+        if self.field_bytes > MULTIPART_OVERHEAD_BYTES:
+            raise UploadFormError("form fields are too large")
+        self._value += data[start:end]
+
+    def on_part_end(self) -> None:
+        if not self._is_file and self._name is not None:
+            self.fields[self._name] = self._value.decode("utf-8", "replace")
+
+    def on_end(self) -> None:
+        self.complete = True
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_end": self.on_end,
+        }
+
+
+async def receive_upload(
+    request: Request,
+    upload_dir: Path,
+    pool,
+    file_field: str = "file",
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> UploadForm:
+    """
+    Parse a multipart/form-data body straight off the request stream: the
+    file part goes to a temp file in UPLOAD_CHUNK_BYTES writes (on the io
+    lane), hashed on the way, so neither the body nor the file is ever
+    held or spooled in full. Raises UploadTooLarge past max_bytes and
+    UploadFormError for malformed bodies; the temp file is removed on any
+    failure, including a client that disconnects mid-upload.
+    """
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UploadFormError("expected a multipart/form-data body with a boundary")
+
+    form = _FormParser(file_field, max_bytes)
+    parser = MultipartParser(boundary, form.callbacks())
+    tmp_path = upload_dir / f".incoming-{uuid.uuid4().hex}"
+    hasher = hashlib.sha256()
+    out = None
+    buffered: List[bytes] = []
+    buffered_size = 0
+
+    # Split the time between reading/parsing the body and writing it out
+    read_seconds = write_seconds = 0.0
+
+    async def flush() -> None:
+        nonlocal out, buffered_size, write_seconds
+        mark = time.perf_counter()
+        if out is None:
+            out = await pool.run("io", open, tmp_path, "wb")
+        await pool.run("io", out.writelines, buffered)
+        write_seconds += time.perf_counter() - mark
+        buffered.clear()
+        buffered_size = 0
+
+    try:
+        mark = time.perf_counter()
+        async for body in request.stream():
+            try:
+                parser.write(body)
+            except FormParserError as e:
+                raise UploadFormError(f"invalid multipart body: {e}") from None
+            read_seconds += time.perf_counter() - mark
+            for piece in form.pending:
+                hasher.update(piece)
+                buffered.append(piece)
+                buffered_size += len(piece)
+            form.pending.clear()
+            if buffered_size >= UPLOAD_CHUNK_BYTES:
+                await flush()
+            mark = time.perf_counter()
+        parser.finalize()
+        if not form.complete:
+            raise UploadFormError("multipart body ended before its closing boundary")
+        if form.file_seen:
+            if buffered or out is None:
+                await flush()
+            mark = time.perf_counter()
+            await pool.run("io", out.close)
+            write_seconds += time.perf_counter() - mark
+    except BaseException:
+        if out is not None:
+            out.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    observe_stage("upload_read", read_seconds)
+    observe_stage("disk_write", write_seconds)
+
+    upload = StoredUpload(tmp_path, form.file_size, hasher.hexdigest()) if form.file_seen else None
+    return UploadForm(form.fields, upload, form.filename)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that rejects oversized upload bodies with 413 before
+    they are parsed: up front from Content-Length, or as soon as the
+    streamed body crosses the limit (chunked / lying clients).
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES, paths=frozenset(LIMITED_PATHS)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.limit:
+                    await self._reject(send)
+                    return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    exceeded = True
+                    raise UploadTooLarge(f"request body exceeds {self.limit} bytes")
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if exceeded:
+                # The framework may turn our exception into its own 400;
+                # answer 413 instead and drop whatever it tried to send
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await self._reject(send)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            if not response_started:
+                await self._reject(send)
+
+    async def _reject(self, send) -> None:
+        body = json.dumps(
+            {"error": f"upload too large (max {self.max_bytes // (1024 * 1024)} MB)"}
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,185 @@
+# backend/workers.py
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from .batcher import BATCH_MAX_SIZE
+from .profiler import current_profile, profiled_thread
+
+logger = logging.getLogger(__name__)
+
+# "thread" (default) or "process". Process mode gives each worker its own
+# copy of the model (memory grows with the worker count) and is sized
+# separately. What happens inside a worker process stays there: no
+# cross-request micro-batching, no stage latencies or cascade / batcher
+# counters in /metrics and /stats/runtime, no profiler samples.
+IMAGE_EXECUTOR = os.getenv("SCAMP_IMAGE_EXECUTOR", "thread").lower()
+
+# Workers per lane. Image threads mostly wait on the micro-batcher, so we
+# want at least one batch worth of them to let requests coalesce; image
+# processes each load the model, so there are few of them.
+IMAGE_WORKERS_DEFAULT = 2 if IMAGE_EXECUTOR == "process" else max(4, BATCH_MAX_SIZE)
+LANE_WORKERS = {
+    "image": int(os.getenv("SCAMP_IMAGE_WORKERS", str(IMAGE_WORKERS_DEFAULT))),
+    "audio": int(os.getenv("SCAMP_AUDIO_WORKERS", "2")),
+    "text": int(os.getenv("SCAMP_TEXT_WORKERS", "4")),
+    "io": int(os.getenv("SCAMP_IO_WORKERS", "8")),
+    "report": int(os.getenv("SCAMP_REPORT_WORKERS", "2")),
+}
+
+# Max jobs waiting per lane (on top of the running ones) before we shed load
+LANE_QUEUE_SIZE = int(os.getenv("SCAMP_LANE_QUEUE_SIZE", "64"))
+
+
+class PoolSaturated(RuntimeError):
+    """Raised when a lane's bounded queue is full; callers should return 503."""
+
+
+class Lane:
+    """
+    One executor + an admission counter that bounds running + queued jobs.
+    """
+
+    def __init__(self, name: str, executor: Executor, workers: int, queue_size: int, kind: str):
+        self.name = name
+        self.executor = executor
+        self.workers = workers
+        self.max_pending = workers + queue_size
+        self.kind = kind
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PoolSaturated(f"{self.name} lane is full ({self._pending} pending)")
+            self._pending += 1
+            self._submitted += 1
+
+    def _release(self, failed: bool) -> None:
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    def _track_running(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            # Profiled requests: sample this thread while it works for them
+            with profiled_thread([current_profile()]):
+                return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        self._admit()
+        loop = asyncio.get_running_loop()
+
+        if self.kind == "process":
+            call = functools.partial(fn, *args, **kwargs)
+        else:
+            # Carry contextvars (request-scoped state) into the worker thread
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, self._track_running, fn, *args, **kwargs)
+
+        try:
+            job = self.executor.submit(call)
+        except BaseException:
+            self._release(failed=True)
+            raise
+        # Released when the job itself ends, not when the caller stops
+        # waiting: a cancelled request's job may still be running
+        job.add_done_callback(lambda done: self._release(done.cancelled() or done.exception() is not None))
+        return await asyncio.wrap_future(job, loop=loop)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "running": self._running if self.kind == "thread" else None,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+
+class InferencePool:
+    """
+    Per-media-type executor lanes so cheap text jobs never queue behind
+    image inference, and blocking file/DB work stays off the event loop.
+    """
+
+    def __init__(
+        self,
+        workers: Dict[str, int],
+        queue_size: int,
+        image_executor: str = "thread",
+        image_initializer: Optional[Callable[[], None]] = None,
+    ):
+        self.lanes: Dict[str, Lane] = {}
+        for name, count in workers.items():
+            count = max(1, int(count))
+            if name == "image" and image_executor == "process":
+                executor: Executor = ProcessPoolExecutor(
+                    max_workers=count,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=image_initializer,
+                )
+                kind = "process"
+            else:
+                executor = ThreadPoolExecutor(max_workers=count, thread_name_prefix=f"scamp-{name}")
+                kind = "thread"
+            self.lanes[name] = Lane(name, executor, count, queue_size, kind)
+
+    def lane(self, name: str) -> Lane:
+        try:
+            return self.lanes[name]
+        except KeyError:
+            raise ValueError(f"Unknown worker lane: {name}") from None
+
+    async def run(self, lane: str, fn: Callable, *args, **kwargs) -> Any:
+        return await self.lane(lane).run(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def shutdown(self, wait: bool = False) -> None:
+        for lane in self.lanes.values():
+            lane.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_inference_pool() -> InferencePool:
+    logger.info("Starting inference pool: workers=%s image_executor=%s", LANE_WORKERS, IMAGE_EXECUTOR)
+    initializer = None
+    if IMAGE_EXECUTOR == "process":
+        # Each worker process loads + warms its own model copy as it starts
+        from .detector import init_image_worker
+
+        initializer = init_image_worker
+    return InferencePool(LANE_WORKERS, LANE_QUEUE_SIZE, image_executor=IMAGE_EXECUTOR, image_initializer=initializer)
@@ -0,0 +1,183 @@
+# bench/engine_parity.py
+#
+# Score drift, latency and memory of the image engines (torch vs ONNX).
+# Each engine runs in its own subprocess so RSS numbers don't mix.
+#
+#   python -m bench.engine_parity --samples uploads/ --engines torch,onnx,onnx-int8
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (Linux), else peak RSS."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def collect_samples(paths: List[str], limit: int) -> List[Path]:
+    found: List[Path] = []
+    for p in paths:
+        path = Path(p)
+        if path.is_dir():
+            found.extend(sorted(x for x in path.rglob("*") if x.suffix.lower() in IMAGE_SUFFIXES))
+        elif path.exists():
+            found.append(path)
+    return found[:limit]
+
+
+def load_images(samples: List[Path], count: int):
+    from PIL import Image
+    import numpy as np
+
+    images = [Image.open(p).convert("RGB") for p in samples]
+    if not images:
+        # No sample set given: deterministic noise so the run still works
+        rng = np.random.default_rng(0)
+        images = [
+            Image.fromarray(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8))
+            for _ in range(count)
+        ]
+    return images
+
+
+def run_worker(engine_name: str, samples: List[Path], batch_size: int, repeats: int) -> Dict:
+    os.environ["SCAMP_IMAGE_ENGINE"] = engine_name
+    rss_start = rss_mb()
+
+    from backend.detector import get_image_engine, get_image_processor, _deepfake_index
+
+    t0 = time.perf_counter()
+    processor = get_image_processor()
+    engine = get_image_engine()
+    load_s = time.perf_counter() - t0
+    rss_loaded = rss_mb()
+
+    images = load_images(samples, count=16)
+    pixels = processor(images=images, return_tensors="np")["pixel_values"]
+    idx = _deepfake_index(engine.id2label)
+
+    # Warm up once so first-call overhead doesn't pollute latencies
+    engine.predict(pixels[:1])
+
+    scores: List[float] = []
+    single_ms: List[float] = []
+    for r in range(repeats):
+        for i in range(len(pixels)):
+            t = time.perf_counter()
+            probs = engine.predict(pixels[i:i + 1])[0]
+            single_ms.append((time.perf_counter() - t) * 1000.0)
+            if r == 0:
+                scores.append(float(probs[idx] if idx is not None else probs.max()) * 100.0)
+
+    batch_ms: List[float] = []
+    for _ in range(repeats):
+        for start in range(0, len(pixels), batch_size):
+            chunk = pixels[start:start + batch_size]
+            t = time.perf_counter()
+            engine.predict(chunk)
+            batch_ms.append((time.perf_counter() - t) * 1000.0 / len(chunk))
+
+    return {
+        "engine": engine_name,
+        "samples": len(pixels),
+        "scores": scores,
+        "load_s": load_s,
+        "single_ms_p50": statistics.median(single_ms),
+        "single_ms_p95": sorted(single_ms)[int(0.95 * (len(single_ms) - 1))],
+        "batched_ms_per_image": statistics.median(batch_ms),
+        "rss_model_mb": rss_loaded - rss_start,
+        "rss_peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }
+
+
+def band(score: float) -> str:
+    from backend.detector import RISK_LOW_THRESHOLD, RISK_HIGH_THRESHOLD
+
+    if score >= RISK_HIGH_THRESHOLD:
+        return "high"
+    if score >= RISK_LOW_THRESHOLD:
+        return "medium"
+    return "low"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", nargs="*", default=[str(PROJECT_ROOT / "uploads"), str(PROJECT_ROOT / "test.jpg")])
+    parser.add_argument("--engines", default="torch,onnx,onnx-int8")
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    samples = collect_samples(args.samples, args.limit)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, samples, args.batch_size, args.repeats)))
+        return 0
+
+    results: Dict[str, Dict] = {}
+    for name in [e.strip() for e in args.engines.split(",") if e.strip()]:
+        cmd = [
+            sys.executable, "-m", "bench.engine_parity", "--worker", name,
+            "--limit", str(args.limit), "--batch-size", str(args.batch_size),
+            "--repeats", str(args.repeats), "--samples", *args.samples,
+        ]
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"[{name}] failed:\n{proc.stderr[-2000:]}", file=sys.stderr)
+            continue
+        results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    if not results:
+        return 1
+
+    print(f"{'engine':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'batch ms/img':>13} {'model MB':>9} {'peak MB':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r['load_s']:>7.1f} {r['single_ms_p50']:>8.1f} {r['single_ms_p95']:>8.1f} "
+            f"{r['batched_ms_per_image']:>13.1f} {r['rss_model_mb']:>9.0f} {r['rss_peak_mb']:>8.0f}"
+        )
+
+    reference = results.get("torch")
+    if reference is None:
+        print("\n(no torch run, skipping drift report)")
+        return 0
+
+    print(f"\nScore drift vs torch over {reference['samples']} samples (score points, 0-100):")
+    for name, r in results.items():
+        if name == "torch":
+            continue
+        diffs = [abs(a - b) for a, b in zip(r["scores"], reference["scores"])]
+        agree = sum(band(a) == band(b) for a, b in zip(r["scores"], reference["scores"]))
+        print(
+            f"  {name:<10} mean={statistics.mean(diffs):.3f} max={max(diffs):.3f} "
+            f"risk-band agreement={agree}/{len(diffs)}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# bench/reports.py
+#
+# PDF report throughput: single reports per second (what /report and the
+# ZIP export do) and pages per second for the combined multi-page export.
+#
+#   python -m bench.reports                   # 200 reports, 500 combined pages
+#   python -m bench.reports --min-rps 150     # exit 1 below a floor (CI regression check)
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.reporting import build_combined_report, build_pdf_report  # noqa: E402
+
+
+def synthetic_events(count: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    events = []
+    for i in range(1, count + 1):
+        score = rng.uniform(0, 100)
+        risk = "high" if score >= 75 else "medium" if score >= 40 else "low"
+        media = rng.choice(["image", "audio", "text"])
+        events.append(
+            {
+                "id": i,
+                "user_id": str(rng.randint(10_000_000, 99_999_999)),
+                "platform": "telegram",
+                "media_type": media,
+                "score": score,
+                "label": f"{risk}_risk",
+                # Long paths exercise the wrapping code like real uploads do
+                "file_path": "" if media == "text" else (
+                    f"/srv/scamp/uploads/telegram_{i}_forwarded_screenshot_of_payment_request_"
+                    f"{rng.getrandbits(64):016x}.jpg"
+                ),
+                "created_at": f"2025-01-{rng.randint(1, 28):02d} 12:{rng.randint(0, 59):02d}:00",
+            }
+        )
+    return events
+
+
+def bench_single(events: List[Dict], out_dir: Path, rounds: int) -> float:
+    rates = []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        for event in events:
+            build_pdf_report(event, out_dir / f"r_{event['id']}.pdf")
+        rates.append(len(events) / (time.perf_counter() - t))
+    return statistics.median(rates)
+
+
+def bench_combined(events: List[Dict], out_dir: Path, rounds: int) -> float:
+    rates = []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        build_combined_report(events, out_dir / "combined.pdf")
+        rates.append(len(events) / (time.perf_counter() - t))
+    return statistics.median(rates)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--min-rps", type=float, default=0.0, help="fail if single reports/s drops below this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+        # Warm-up: font metrics, lazy imports, caches
+        bench_single(synthetic_events(5), out_dir, 1)
+
+        single = bench_single(synthetic_events(args.reports), out_dir, args.rounds)
+        combined = bench_combined(synthetic_events(args.pages), out_dir, args.rounds)
+        size_kb = (out_dir / "r_1.pdf").stat().st_size / 1024
+        combined_kb = (out_dir / "combined.pdf").stat().st_size / 1024
+
+    print(f"single reports: {single:8.1f} reports/s  ({1000 / single:.2f} ms each, {size_kb:.1f} KB)")
+    print(f"combined:       {combined:8.1f} pages/s    ({args.pages} pages, {combined_kb:.0f} KB)")
+
+    if args.min_rps and single < args.min_rps:
+        print(f"FAIL: {single:.1f} reports/s is below --min-rps {args.min_rps}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+# scamp/bot/backend_client.py
+
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# ================== CONFIG ==================
+
+# Max in-flight backend calls from this bot process
+BACKEND_MAX_CONCURRENCY = int(os.getenv("BACKEND_MAX_CONCURRENCY", "16"))
+
+# Keep-alive pool size (connections are reused across handlers)
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "20"))
+
+# Retries for idempotent calls (and for POSTs that never reached the server)
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", "3"))
+BACKEND_RETRY_BASE_DELAY = float(os.getenv("BACKEND_RETRY_BASE_DELAY", "0.25"))
+BACKEND_RETRY_MAX_DELAY = float(os.getenv("BACKEND_RETRY_MAX_DELAY", "4.0"))
+
+# Per-endpoint read timeouts (seconds); connect is always short
+ENDPOINT_TIMEOUTS = {
+    "analyze_text": float(os.getenv("BACKEND_TIMEOUT_TEXT", "30")),
+    "analyze": float(os.getenv("BACKEND_TIMEOUT_MEDIA", "90")),
+    "report": float(os.getenv("BACKEND_TIMEOUT_REPORT", "60")),
+}
+CONNECT_TIMEOUT = float(os.getenv("BACKEND_CONNECT_TIMEOUT", "5"))
+
+# Status codes worth retrying; 503 is the backend shedding load before work
+RETRY_STATUSES_IDEMPOTENT = {502, 503, 504}
+RETRY_STATUSES_UNSAFE = {503}
+
+# Log a latency summary every N calls
+STATS_LOG_EVERY = int(os.getenv("BACKEND_STATS_LOG_EVERY", "100"))
+
+# Chunk size when relaying Telegram downloads into backend uploads
+RELAY_CHUNK_BYTES = int(os.getenv("BACKEND_RELAY_CHUNK_KB", "64")) * 1024
+
+
+class BackendError(Exception):
+    """The backend answered with a non-200 status."""
+
+    def __init__(self, status: int, detail: str):
+        super().__init__(f"status {status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+def _safe_filename(name: str) -> str:
+    return "".join(c for c in name if c not in '"\\\r\n') or "media"
+
+
+async def multipart_stream(
+    boundary: str,
+    fields: Dict[str, str],
+    filename: str,
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[bytes]:
+    """
+    multipart/form-data body with a single file part, produced lazily:
+    file chunks are yielded as they arrive and never joined in memory.
+    """
+    for name, value in fields.items():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode()
+    yield (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{_safe_filename(filename)}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    async for chunk in chunks:
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+class EndpointStats:
+    """Call counts + recent latency window for one backend endpoint."""
+
+    def __init__(self, window: int = 512):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=window)
+
+    def snapshot(self) -> Dict:
+        ordered = sorted(self.latencies_ms)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "p50_ms": round(pct(50), 1),
+            "p95_ms": round(pct(95), 1),
+            "p99_ms": round(pct(99), 1),
+            "max_ms": round(ordered[-1], 1) if ordered else 0.0,
+        }
+
+
+class BackendClient:
+    """
+    Shared async client for the Scamp backend: one keep-alive connection
+    pool, bounded concurrency, retries with full jitter, per-endpoint
+    timeouts and latency stats.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=BACKEND_POOL_SIZE,
+                max_keepalive_connections=BACKEND_POOL_SIZE,
+                keepalive_expiry=30.0,
+            ),
+            timeout=httpx.Timeout(30.0, connect=CONNECT_TIMEOUT),
+        )
+        # Separate pool for media downloads, so relays never wait on their own uploads
+        self._downloads = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=BACKEND_POOL_SIZE, max_keepalive_connections=BACKEND_POOL_SIZE),
+            timeout=httpx.Timeout(ENDPOINT_TIMEOUTS["analyze"], connect=CONNECT_TIMEOUT),
+        )
+        self._slots = asyncio.Semaphore(BACKEND_MAX_CONCURRENCY)
+        self._stats: Dict[str, EndpointStats] = {}
+        self._total_calls = 0
+
+    async def aclose(self) -> None:
+        logger.info("Backend call stats: %s", self.stats())
+        await self._client.aclose()
+        await self._downloads.aclose()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: s.snapshot() for name, s in self._stats.items()}
+
+    # ---------- Core request loop ----------
+
+    def _timeout(self, endpoint: str) -> httpx.Timeout:
+        read = ENDPOINT_TIMEOUTS.get(endpoint, 30.0)
+        return httpx.Timeout(read, connect=CONNECT_TIMEOUT)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # "Full jitter": uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(BACKEND_RETRY_MAX_DELAY, BACKEND_RETRY_BASE_DELAY * (2 ** attempt)))
+
+    async def _request(
+        self,
+        endpoint: str,
+        method: str,
+        url: str,
+        idempotent: bool,
+        body: Optional[Callable[[], AsyncIterator[bytes]]] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        `body`, if given, makes a fresh streaming request body per attempt
+        (a consumed stream can't be replayed on retry).
+        """
+        stats = self._stats.setdefault(endpoint, EndpointStats())
+        retry_statuses = RETRY_STATUSES_IDEMPOTENT if idempotent else RETRY_STATUSES_UNSAFE
+        attempt = 0
+
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                while True:
+                    try:
+                        if body is not None:
+                            kwargs["content"] = body()
+                        resp = await self._client.request(method, url, timeout=self._timeout(endpoint), **kwargs)
+                        if resp.status_code in retry_statuses and attempt < BACKEND_RETRIES:
+                            await resp.aclose()
+                            raise _RetryableStatus(resp.status_code)
+                        return resp
+                    except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, _RetryableStatus) as e:
+                        # Request never reached the backend (or was shed): always safe to retry
+                        err: Exception = e
+                    except httpx.TransportError as e:
+                        # Read timeouts etc.: the backend may have acted on it
+                        if not idempotent:
+                            raise
+                        err = e
+
+                    if attempt >= BACKEND_RETRIES:
+                        raise err
+                    attempt += 1
+                    stats.retries += 1
+                    delay = self._backoff(attempt)
+                    logger.warning("Backend %s attempt %d failed (%s); retrying in %.2fs", endpoint, attempt, err, delay)
+                    await asyncio.sleep(delay)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                stats.calls += 1
+                stats.latencies_ms.append(elapsed_ms)
+                logger.info("[BACKEND] endpoint=%s ms=%.1f attempts=%d", endpoint, elapsed_ms, attempt + 1)
+                self._total_calls += 1
+                if STATS_LOG_EVERY and self._total_calls % STATS_LOG_EVERY == 0:
+                    logger.info("Backend call stats: %s", self.stats())
+
+    # ---------- Endpoints ----------
+
+    async def analyze_text(self, text: str, user_id: str, platform: str) -> httpx.Response:
+        return await self._request(
+            "analyze_text",
+            "POST",
+            "/analyze_text",
+            idempotent=False,
+            data={"text": text, "user_id": user_id, "platform": platform},
+        )
+
+    async def analyze_media(
+        self,
+        file_bytes: bytes,
+        media_type: str,
+        user_id: str,
+        platform: str,
+        filename: str = "media",
+    ) -> httpx.Response:
+        return await self._request(
+            "analyze",
+            "POST",
+            "/analyze",
+            idempotent=False,
+            files={"file": (filename, file_bytes)},
+            data={"media_type": media_type, "user_id": user_id, "platform": platform},
+        )
+
+    async def analyze_media_from_url(
+        self,
+        source_url: str,
+        media_type: str,
+        user_id: str,
+        platform: str,
+        filename: str = "media",
+    ) -> httpx.Response:
+        """
+        Relay a remote file (a Telegram file URL) into /analyze: the download
+        is streamed chunk by chunk straight into a chunked multipart upload.
+        """
+        boundary = uuid.uuid4().hex
+        fields = {"media_type": media_type, "user_id": user_id, "platform": platform}
+
+        async def download() -> AsyncIterator[bytes]:
+            async with self._downloads.stream("GET", source_url) as src:
+                if src.status_code != 200:
+                    # Don't let the URL (it embeds the bot token) reach the logs
+                    raise BackendError(src.status_code, "media download failed")
+                async for chunk in src.aiter_bytes(RELAY_CHUNK_BYTES):
+                    yield chunk
+
+        return await self._request(
+            "analyze",
+            "POST",
+            "/analyze",
+            idempotent=False,
+            body=lambda: multipart_stream(boundary, fields, filename, download()),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        )
+
+    async def copy_event(self, event_id: int, user_id: str, platform: str) -> httpx.Response:
+        """Record an earlier verdict (event_id) as a new event for this sender."""
+        return await self._request(
+            "copy_event",
+            "POST",
+            f"/events/{event_id}/copy",
+            idempotent=False,
+            data={"user_id": user_id, "platform": platform},
+        )
+
+    async def get_report(self, event_id: int) -> httpx.Response:
+        return await self._request("report", "GET", f"/report/{event_id}", idempotent=True)
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def get_backend(context) -> BackendClient:
+    """The shared client created in post_init (see bot.main)."""
+    return context.application.bot_data["backend"]
+
+
+def make_backend_client(base_url: Optional[str] = None) -> BackendClient:
+    return BackendClient(base_url or os.getenv("BACKEND_URL", "http://127.0.0.1:8000"))
@@ -1,11 +1,11 @@
 # scamp/bot/bot.py
 
 import os
+import asyncio
 import logging
 from io import BytesIO
-from typing import Tuple
+from typing import Any, Awaitable, Dict, Tuple
 
-import requests
 from telegram import (
     Update,
     InlineKeyboardButton,
@@ -14,7 +14,9 @@ from telegram import (
 )
 from telegram.error import TimedOut
 from telegram.ext import (
+    AIORateLimiter,
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
@@ -23,11 +25,27 @@ from telegram.ext import (
 )
 from telegram.request import HTTPXRequest
 
+try:
+    from .backend_client import BackendError, get_backend, make_backend_client
+    from .verdict_cache import VerdictCache
+except ImportError:  # run as a script: python bot/bot.py
+    from backend_client import BackendError, get_backend, make_backend_client
+    from verdict_cache import VerdictCache
+
 # ================== CONFIG ==================
 
 BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+# Updates handled in parallel (across chats; each chat stays sequential)
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "16"))
+
+# Updates admitted at once, including ones waiting behind their chat
+BOT_MAX_QUEUED_UPDATES = int(os.getenv("BOT_MAX_QUEUED_UPDATES", "256"))
+
+# Retries after a Telegram 429 (RetryAfter) before giving up on a send
+BOT_RATE_LIMIT_RETRIES = int(os.getenv("BOT_RATE_LIMIT_RETRIES", "3"))
+
 # Risk buckets (mirror backend)
 RISK_LOW_THRESHOLD = 40.0
 RISK_HIGH_THRESHOLD = 75.0
@@ -64,6 +82,13 @@ def build_risk_message(score: float, risk_level: str) -> str:
     """
     risk_level = (risk_level or "low").lower()
 
+    if risk_level == "insufficient_speech":
+        return (
+            "🔇 *Not Enough Speech to Analyze*\n\n"
+            "This recording has too little clear speech for a voice deepfake check, "
+            "so we can't give it a risk score.\n"
+            "If it's a voice note asking for money or codes, verify with the sender through another channel."
+        )
     if risk_level == "high":
         return (
             "🚨 *High Scam / Deepfake Risk*\n\n"
@@ -110,12 +135,14 @@ def build_action_keyboard(
             )
         )
 
-    buttons.append(
-        InlineKeyboardButton(
-            "📄 Generate Report",
-            callback_data=f"report:{event_id}:{media_type}:{score}",
+    # No event of this sender's own to report on (e.g. it couldn't be saved)
+    if event_id > 0:
+        buttons.append(
+            InlineKeyboardButton(
+                "📄 Generate Report",
+                callback_data=f"report:{event_id}:{media_type}:{score}",
+            )
         )
-    )
 
     buttons.append(
         InlineKeyboardButton(
@@ -124,50 +151,82 @@ def build_action_keyboard(
         )
     )
 
-    keyboard = [buttons[:2], buttons[2:3]]
+    keyboard = [buttons[:-1], buttons[-1:]] if len(buttons) > 1 else [buttons]
     return InlineKeyboardMarkup(keyboard)
 
 
 # ================== MEDIA EXTRACTION ==================
 
 
-async def extract_file_from_message(msg: Message) -> Tuple[bytes, str] | Tuple[None, None]:
+def extract_media_from_message(msg: Message) -> Tuple[Any, str] | Tuple[None, None]:
     """
-    Get raw file bytes and inferred media type from a Telegram message.
+    Find the analyzable attachment and its media type, without downloading it.
     Supports: photo, image-document, voice, audio.
-    Uses async get_file + download_as_bytearray for PTB v21+.
     """
-    file = None
-    media_type = None
-
     if msg.photo:
-        file = msg.photo[-1]
-        media_type = "image"
-    elif msg.document and msg.document.mime_type and msg.document.mime_type.startswith("image/"):
-        file = msg.document
-        media_type = "image"
-    elif msg.voice:
-        file = msg.voice
-        media_type = "audio"
-    elif msg.audio:
-        file = msg.audio
-        media_type = "audio"
-
-    if file is None:
-        return None, None
+        return msg.photo[-1], "image"
+    if msg.document and msg.document.mime_type and msg.document.mime_type.startswith("image/"):
+        return msg.document, "image"
+    if msg.voice:
+        return msg.voice, "audio"
+    if msg.audio:
+        return msg.audio, "audio"
+    return None, None
+
+
+async def analyze_telegram_media(
+    context: ContextTypes.DEFAULT_TYPE,
+    media: Any,
+    media_type: str,
+    user_id: str,
+    platform: str,
+) -> Dict:
+    """
+    Send a Telegram attachment to backend /analyze. With the hosted Bot API
+    the file URL is streamed straight into the upload (no full copy in the
+    bot); in local mode, where file_path is on disk, it is read instead.
+    """
+    backend = get_backend(context)
+    file_obj = await media.get_file()
+    filename = getattr(media, "file_name", None) or "media"
 
-    try:
-        file_obj = await file.get_file()
+    if file_obj.file_path and file_obj.file_path.startswith(("http://", "https://")):
+        resp = await backend.analyze_media_from_url(file_obj.file_path, media_type, user_id, platform, filename)
+    else:
         file_bytes = await file_obj.download_as_bytearray()
-        return bytes(file_bytes), media_type
-    except TimedOut:
-        logger.warning("Timed out while calling get_file/download for media.")
-        return None, None
+        resp = await backend.analyze_media(file_bytes, media_type, user_id, platform, filename)
+
+    if resp.status_code != 200:
+        raise BackendError(resp.status_code, resp.text[:200])
+    return resp.json()
 
 
 # ================== HELPERS FOR EXPLAINABILITY ==================
 
 
+async def record_replayed_verdict(
+    context: ContextTypes.DEFAULT_TYPE,
+    verdict: Dict,
+    user_id: str,
+    platform: str,
+) -> Dict:
+    """
+    A reused verdict carries the first sender's event_id. Record it as an
+    event of this sender (so it counts in /events and /stats and the report
+    is theirs); if that fails, show the verdict without an event.
+    """
+    source_id = int(verdict.get("event_id", -1))
+    if source_id > 0:
+        try:
+            resp = await get_backend(context).copy_event(source_id, user_id, platform)
+            if resp.status_code == 200:
+                return {**verdict, "event_id": int(resp.json()["event_id"])}
+            logger.warning("Backend refused to copy event %s (status %s)", source_id, resp.status_code)
+        except Exception as e:
+            logger.warning("Failed to record reused verdict for event %s: %s", source_id, e)
+    return {**verdict, "event_id": -1}
+
+
 def format_explainability(highlights: list) -> str | None:
     """
     Turn backend highlights into a nice bullet list.
@@ -243,11 +302,11 @@ async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("handle_media called. Chat=%s, User=%s", update.effective_chat.id, user.id)
 
     try:
-        # First try to extract media
-        file_bytes, media_type = await extract_file_from_message(message)
+        # First try to find media (downloaded later, only if not already judged)
+        media, media_type = extract_media_from_message(message)
 
         # ---------- TEXT-ONLY CASE ----------
-        if file_bytes is None:
+        if media is None:
             if not message.text:
                 await message.reply_text(
                     "I see a message, but no media or text I can analyze.",
@@ -259,15 +318,7 @@ async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
             platform = "telegram"
 
             try:
-                resp = requests.post(
-                    f"{BACKEND_URL}/analyze_text",
-                    data={
-                        "text": text_content,
-                        "user_id": user_id,
-                        "platform": platform,
-                    },
-                    timeout=30,
-                )
+                resp = await get_backend(context).analyze_text(text_content, user_id, platform)
             except Exception as e:
                 logger.exception("Error calling backend /analyze_text: %s", e)
                 await message.reply_text(f"⚠️ Unable to analyze text right now: {e}")
@@ -315,43 +366,48 @@ async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = str(user.id)
         platform = "telegram"
 
-        try:
-            await message.reply_text(
-                "🔍 Analyzing this media for deepfake and scam risk. Please wait...",
-                quote=True,
-            )
-        except TimedOut:
-            logger.warning("Timed out while sending 'analyzing' message. Continuing anyway.")
-        except Exception as e:
-            logger.exception("Error sending 'analyzing' message: %s", e)
+        # The same file forwarded to many chats keeps its file_unique_id
+        verdicts = context.bot_data["verdicts"]
+        media_key = media.file_unique_id
+        result = verdicts.get(media_key)
+        computed = False
 
-        # Call backend /analyze
-        try:
-            files = {"file": ("media", file_bytes)}
-            data = {
-                "media_type": media_type,
-                "user_id": user_id,
-                "platform": platform,
-            }
-            resp = requests.post(
-                f"{BACKEND_URL}/analyze",
-                files=files,
-                data=data,
-                timeout=90,
-            )
-        except Exception as e:
-            logger.exception("Error calling backend /analyze: %s", e)
-            await message.reply_text(f"⚠️ Unable to analyze media right now: {e}")
-            return
+        if result is not None:
+            logger.info("Verdict cache hit for %s", media_key)
+        else:
+            try:
+                await message.reply_text(
+                    "🔍 Analyzing this media for deepfake and scam risk. Please wait...",
+                    quote=True,
+                )
+            except TimedOut:
+                logger.warning("Timed out while sending 'analyzing' message. Continuing anyway.")
+            except Exception as e:
+                logger.exception("Error sending 'analyzing' message: %s", e)
 
-        if resp.status_code != 200:
-            await message.reply_text(
-                f"⚠️ Media analysis failed (status {resp.status_code}): {resp.text[:200]}"
-            )
-            return
+            # Call backend /analyze (concurrent requests for one file share it)
+            try:
+                result, computed = await verdicts.get_or_compute(
+                    media_key,
+                    lambda: analyze_telegram_media(context, media, media_type, user_id, platform),
+                )
+            except BackendError as e:
+                await message.reply_text(f"⚠️ Media analysis failed (status {e.status}): {e.detail}")
+                return
+            except TimedOut:
+                logger.warning("Timed out while calling get_file for media.")
+                await message.reply_text("⚠️ Unable to analyze media right now: Telegram timed out.")
+                return
+            except Exception as e:
+                logger.exception("Error calling backend /analyze: %s", e)
+                await message.reply_text(f"⚠️ Unable to analyze media right now: {e}")
+                return
+
+            logger.info("backend_media: %s", result)
 
-        result = resp.json()
-        logger.info("backend_media: %s", result)
+        if not computed:
+            # The verdict (and its event) belongs to whoever sent the file first
+            result = await record_replayed_verdict(context, result, user_id, platform)
 
         score = float(result.get("score", 0.0))
         risk = (result.get("risk") or "low").lower()
@@ -465,10 +521,7 @@ async def handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pdf_bytes = None
         try:
             if event_id > 0:
-                resp = requests.get(
-                    f"{BACKEND_URL}/report/{event_id}",
-                    timeout=60,
-                )
+                resp = await get_backend(context).get_report(event_id)
                 if resp.status_code == 200:
                     pdf_bytes = resp.content
                 else:
@@ -555,17 +608,77 @@ async def unknown(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+# ================== UPDATE PROCESSING ==================
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Process updates concurrently, but one at a time per chat, in arrival
+    order. Updates wait on their chat's lock *before* taking a worker
+    slot, so one flooded group cannot occupy every slot with waiters.
+    """
+
+    def __init__(self, max_concurrent_updates: int, max_queued_updates: int):
+        # The base semaphore bounds admitted updates; ours bounds running ones
+        super().__init__(max(max_queued_updates, max_concurrent_updates))
+        self._workers = asyncio.Semaphore(max_concurrent_updates)
+        self._chat_locks: Dict[Any, asyncio.Lock] = {}
+        self._chat_waiters: Dict[Any, int] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat = getattr(update, "effective_chat", None)
+        if chat is None:
+            async with self._workers:
+                await coroutine
+            return
+
+        key = chat.id
+        lock = self._chat_locks.setdefault(key, asyncio.Lock())
+        self._chat_waiters[key] = self._chat_waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._workers:
+                    await coroutine
+        finally:
+            self._chat_waiters[key] -= 1
+            if not self._chat_waiters[key]:
+                del self._chat_waiters[key]
+                del self._chat_locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
 # ================== MAIN ==================
 
 
+async def post_init(app: Application) -> None:
+    # One pooled backend client shared by every handler
+    app.bot_data["backend"] = make_backend_client(BACKEND_URL)
+    app.bot_data["verdicts"] = VerdictCache()
+
+
+async def post_shutdown(app: Application) -> None:
+    verdicts = app.bot_data.get("verdicts")
+    if verdicts is not None:
+        logger.info("Verdict cache stats: %s", verdicts.stats())
+    backend = app.bot_data.pop("backend", None)
+    if backend is not None:
+        await backend.aclose()
+
+
 def main():
     if not TELEGRAM_BOT_TOKEN:
         raise RuntimeError(
             "TELEGRAM_BOT_TOKEN is not set. Please set it as an environment variable."
         )
 
-    # Increase Telegram HTTP timeouts a bit
+    # Increase Telegram HTTP timeouts a bit; one connection per concurrent handler
     request = HTTPXRequest(
+        connection_pool_size=BOT_CONCURRENT_UPDATES + 2,
         connect_timeout=30.0,
         read_timeout=30.0,
         write_timeout=30.0,
@@ -576,6 +689,11 @@ def main():
         Application.builder()
         .token(TELEGRAM_BOT_TOKEN)
         .request(request)
+        .concurrent_updates(ChatOrderedUpdateProcessor(BOT_CONCURRENT_UPDATES, BOT_MAX_QUEUED_UPDATES))
+        # Queues outgoing calls under Telegram's global / per-group limits and retries 429s
+        .rate_limiter(AIORateLimiter(max_retries=BOT_RATE_LIMIT_RETRIES))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
         .build()
     )
 
@@ -0,0 +1,104 @@
+# scamp/bot/verdict_cache.py
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ================== CONFIG ==================
+
+# Verdicts remembered per Telegram file_unique_id
+BOT_VERDICT_CACHE_SIZE = int(os.getenv("BOT_VERDICT_CACHE_SIZE", "4096"))
+
+# How long a verdict is reused before the file is analyzed again
+BOT_VERDICT_TTL_SECONDS = float(os.getenv("BOT_VERDICT_TTL_SECONDS", "86400"))
+
+
+def is_cacheable(verdict: Dict) -> bool:
+    """Don't remember fallback scores produced by a model error (mirrors the backend)."""
+    return not any(h.get("type") == "model_error" for h in verdict.get("highlights") or [])
+
+
+class VerdictCache:
+    """
+    LRU + TTL cache of backend verdicts keyed by Telegram's file_unique_id,
+    checked before anything is downloaded. Concurrent misses for the same
+    file (one forward landing in many groups) share a single analysis.
+    """
+
+    def __init__(self, max_entries: int = BOT_VERDICT_CACHE_SIZE, ttl_seconds: float = BOT_VERDICT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, verdict = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return verdict
+
+    def put(self, key: str, verdict: Dict) -> None:
+        if not is_cacheable(verdict):
+            return
+        self._entries[key] = (time.monotonic(), verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, bool]:
+        """
+        (verdict, computed): computed is False when the verdict was produced
+        for another caller (cached or shared), so its event_id isn't ours.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached, False
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending), False
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            verdict = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Only the waiters should see it; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        else:
+            self.put(key, verdict)
+            future.set_result(verdict)
+            return verdict, True
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,191 @@
+# scamp/dashboard/app.py
+#
+# Analyst dashboard: event volume, risk mix and top signals. Everything
+# comes from the backend's precomputed rollups (/stats) plus one page of
+# /events, so a page load costs a few small indexed reads however many
+# events are stored.
+#
+#   streamlit run dashboard/app.py
+
+import os
+from typing import Dict, Optional
+
+import pandas as pd
+import requests
+import streamlit as st
+
+# ================== CONFIG ==================
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000").rstrip("/")
+
+# Cache lifetimes (seconds): aggregates move slowly, the event list faster
+STATS_TTL = int(os.getenv("DASHBOARD_STATS_TTL", "30"))
+EVENTS_TTL = int(os.getenv("DASHBOARD_EVENTS_TTL", "15"))
+
+# Auto-refresh interval for the live view (0 = manual only)
+REFRESH_SECONDS = int(os.getenv("DASHBOARD_REFRESH_SECONDS", "60"))
+
+# The backend merges long series down to this many buckets before sending
+MAX_POINTS = int(os.getenv("DASHBOARD_MAX_POINTS", "200"))
+
+REQUEST_TIMEOUT = 5.0
+RECENT_EVENTS = 25
+
+WINDOWS = {
+    "Last 6 hours": 6,
+    "Last 24 hours": 24,
+    "Last 48 hours": 48,
+    "Last 7 days": 7 * 24,
+    "Last 30 days": 30 * 24,
+    "Last 90 days": 90 * 24,
+}
+
+BANDS = ["low", "medium", "high"]
+BAND_COLORS = ["#4caf50", "#ff9800", "#e53935"]
+
+
+# ================== DATA ==================
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    # Keep-alive connection to the backend across reruns
+    return requests.Session()
+
+
+def api_get(path: str, params: Dict) -> Dict:
+    params = {k: v for k, v in params.items() if v is not None}
+    resp = get_session().get(f"{BACKEND_URL}{path}", params=params, timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+
+@st.cache_data(ttl=STATS_TTL, show_spinner=False)
+def fetch_stats(hours: int, platform: Optional[str], media_type: Optional[str]) -> Dict:
+    return api_get(
+        "/stats",
+        {"hours": hours, "platform": platform, "media_type": media_type, "max_points": MAX_POINTS},
+    )
+
+
+@st.cache_data(ttl=EVENTS_TTL, show_spinner=False)
+def fetch_recent_high_risk(platform: Optional[str], media_type: Optional[str]) -> Dict:
+    return api_get(
+        "/events",
+        {"risk": "high", "platform": platform, "media_type": media_type, "limit": RECENT_EVENTS},
+    )
+
+
+def volume_frame(stats: Dict) -> pd.DataFrame:
+    """Series -> one row per bucket (gaps filled with 0), one column per band."""
+    freq = pd.Timedelta(seconds=stats["bucket_seconds"])
+    index = pd.date_range(stats["since"], stats["until"], freq=freq, inclusive="left")
+    rows = {pd.Timestamp(p["bucket"]): p["bands"] for p in stats["series"]}
+    frame = pd.DataFrame.from_dict(rows, orient="index", columns=BANDS)
+    return frame.reindex(index).fillna(0).astype(int)
+
+
+def bucket_label(seconds: int) -> str:
+    if seconds % 86400 == 0:
+        return "1-day" if seconds == 86400 else f"{seconds // 86400}-day"
+    return "1-hour" if seconds == 3600 else f"{seconds // 3600}-hour"
+
+
+def histogram_frame(stats: Dict) -> pd.DataFrame:
+    edges = stats["histogram_bins"]
+    labels = [f"{edges[i]:.0f}–{edges[i + 1]:.0f}" for i in range(len(edges) - 1)]
+    return pd.DataFrame({"events": stats["total"]["histogram"]}, index=pd.Index(labels, name="score"))
+
+
+def counts_frame(counts: Dict[str, int], name: str) -> pd.DataFrame:
+    frame = pd.DataFrame({"events": counts}).rename_axis(name)
+    return frame.sort_values("events", ascending=False)
+
+
+# ================== PAGE ==================
+
+st.set_page_config(page_title="Scamp dashboard", layout="wide")
+st.title("Scamp: live risk view")
+
+with st.sidebar:
+    window = st.selectbox("Window", list(WINDOWS), index=1)
+    hours = WINDOWS[window]
+    try:
+        # Filter choices come from the unfiltered aggregates (same cache entry)
+        everything = fetch_stats(hours, None, None)
+    except requests.RequestException as e:
+        st.error(f"Backend unreachable at {BACKEND_URL}: {e}")
+        st.stop()
+    platform = st.selectbox("Platform", ["All"] + sorted(everything["by_platform"]))
+    media_type = st.selectbox("Media type", ["All"] + sorted(everything["by_media_type"]))
+    platform = None if platform == "All" else platform
+    media_type = None if media_type == "All" else media_type
+    if st.button("Refresh now"):
+        fetch_stats.clear()
+        fetch_recent_high_risk.clear()
+    st.caption(f"Aggregates cached {STATS_TTL}s, events {EVENTS_TTL}s.")
+
+
+@st.fragment(run_every=REFRESH_SECONDS or None)
+def live_view(hours: int, platform: Optional[str], media_type: Optional[str]) -> None:
+    try:
+        stats = fetch_stats(hours, platform, media_type)
+        recent = fetch_recent_high_risk(platform, media_type)
+    except requests.RequestException as e:
+        st.error(f"Backend request failed: {e}")
+        return
+
+    total = stats["total"]
+    high = stats["by_band"].get("high", 0)
+    top = stats["top_signals"][0]["signal"] if stats["top_signals"] else "–"
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Events", f"{total['count']:,}")
+    c2.metric("High risk", f"{high:,}", f"{100.0 * high / total['count']:.1f}%" if total["count"] else None,
+              delta_color="off")
+    c3.metric("Average score", f"{total['avg_score']:.1f}" if total["avg_score"] is not None else "–")
+    c4.metric("Top signal", top)
+
+    st.subheader(f"Volume by risk band ({bucket_label(stats['bucket_seconds'])} buckets)")
+    st.bar_chart(volume_frame(stats), color=BAND_COLORS)
+
+    left, right = st.columns(2)
+    with left:
+        st.subheader("Risk mix")
+        mix = pd.DataFrame({"events": [stats["by_band"].get(b, 0) for b in BANDS]}, index=pd.Index(BANDS, name="band"))
+        st.bar_chart(mix)
+    with right:
+        st.subheader("Score distribution")
+        st.bar_chart(histogram_frame(stats))
+
+    left, right = st.columns(2)
+    with left:
+        st.subheader("By platform")
+        st.bar_chart(counts_frame(stats["by_platform"], "platform"))
+    with right:
+        st.subheader("By media type")
+        st.bar_chart(counts_frame(stats["by_media_type"], "media_type"))
+
+    left, right = st.columns(2)
+    with left:
+        st.subheader("Top signals")
+        if stats["top_signals"]:
+            signals = pd.DataFrame(stats["top_signals"]).set_index("signal")
+            signals.columns = ["events", "high risk"]
+            st.dataframe(signals, width="stretch")
+        else:
+            st.caption("No signals in this window.")
+    with right:
+        st.subheader("Latest high-risk events")
+        if recent["events"]:
+            events = pd.DataFrame(recent["events"])
+            st.dataframe(
+                events[["id", "created_at", "platform", "media_type", "user_id", "score"]].set_index("id"),
+                width="stretch",
+            )
+        else:
+            st.caption("No high-risk events.")
+
+    st.caption(f"Window {stats['since']} – {stats['until']} UTC · backend {BACKEND_URL}")
+
+
+live_view(hours, platform, media_type)
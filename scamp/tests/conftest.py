@@ -0,0 +1,21 @@
+# tests/conftest.py
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Run from anywhere: the backend package lives next to this directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh SQLite database behind backend.db's storage."""
+    from backend import db as db_module
+
+    db_module.close_db()
+    monkeypatch.setattr(db_module, "DB_PATH", tmp_path / "scamp.db")
+    db_module.init_db()
+    yield db_module
+    db_module.close_db()
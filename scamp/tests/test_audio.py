@@ -0,0 +1,67 @@
+# tests/test_audio.py
+
+import numpy as np
+import pytest
+
+from backend import audio
+from backend.audio import NoSpeech, analyze_audio_stream
+
+RATE = 1000
+
+
+def speech(seconds, chunk_seconds=1.0):
+    """Loud noise (always voiced), in decoder-sized chunks."""
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(int(seconds * RATE)) * 0.3).astype(np.float32)
+    step = int(chunk_seconds * RATE)
+    for i in range(0, samples.size, step):
+        yield samples[i:i + step]
+
+
+def constant_scorer(score):
+    return lambda windows: [score] * len(windows)
+
+
+@pytest.fixture(autouse=True)
+def small_windows(monkeypatch):
+    monkeypatch.setattr(audio, "AUDIO_WINDOW_SECONDS", 4.0)
+    monkeypatch.setattr(audio, "AUDIO_BATCH_WINDOWS", 2)
+    monkeypatch.setattr(audio, "AUDIO_MAX_SECONDS", 16.0)
+
+
+def test_confident_verdict_stops_early():
+    verdict = analyze_audio_stream(speech(60), RATE, 40, 75, scorer=constant_scorer(95.0))
+    assert verdict.stopped_early and not verdict.truncated
+    assert len(verdict.window_scores) == 2 and verdict.decoded_seconds < 60
+
+
+def test_hitting_the_window_cap_is_not_an_early_stop():
+    scores = iter([50.0, 60.0] * 10)
+    verdict = analyze_audio_stream(speech(60), RATE, 40, 75, scorer=lambda w: [next(scores) for _ in w])
+    assert verdict.truncated and not verdict.stopped_early
+    assert len(verdict.window_scores) == 4
+
+
+def test_short_clip_is_scored_to_the_end():
+    verdict = analyze_audio_stream(speech(9), RATE, 40, 75, scorer=constant_scorer(55.0))
+    assert not verdict.stopped_early and not verdict.truncated
+    assert len(verdict.window_scores) == 3  # two full windows + the 1 s tail
+
+
+def test_silence_raises_no_speech():
+    with pytest.raises(NoSpeech):
+        analyze_audio_stream(iter([np.zeros(RATE * 5, dtype=np.float32)]), RATE, 40, 75, scorer=constant_scorer(0.0))
+
+
+def test_last_batch_is_cut_down_to_the_window_cap(monkeypatch):
+    monkeypatch.setattr(audio, "AUDIO_MAX_SECONDS", 12.0)  # 3 windows, batches of 2
+    batches = []
+    scores = iter([50.0, 60.0] * 10)
+
+    def scorer(windows):
+        batches.append(len(windows))
+        return [next(scores) for _ in windows]
+
+    verdict = analyze_audio_stream(speech(60), RATE, 40, 75, scorer=scorer)
+    assert verdict.truncated and batches == [2, 1]
+    assert len(verdict.window_scores) == 3
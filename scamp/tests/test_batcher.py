@@ -0,0 +1,87 @@
+# tests/test_batcher.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.batcher import InferenceBatcher
+
+
+class Recorder:
+    """run_batch that doubles numbers, fails on "bad" items, and logs batch sizes."""
+
+    def __init__(self):
+        self.sizes = []
+        self.lock = threading.Lock()
+
+    def __call__(self, items):
+        with self.lock:
+            self.sizes.append(len(items))
+        if "bad" in items:
+            raise ValueError("cannot score 'bad'")
+        return [item * 2 for item in items]
+
+
+def submit_together(batcher, items):
+    """Submit from separate threads at once so the items share a batch."""
+    barrier = threading.Barrier(len(items))
+
+    def one(item):
+        barrier.wait()
+        return batcher.submit(item)
+
+    with ThreadPoolExecutor(len(items)) as ex:
+        return list(ex.map(one, items))
+
+
+def test_results_fan_out_to_their_callers():
+    run = Recorder()
+    batcher = InferenceBatcher(run, max_batch_size=8, max_wait_ms=50, name="test")
+    items = list(range(8))
+    futures = submit_together(batcher, items)
+    assert [f.result(timeout=5) for f in futures] == [i * 2 for i in items]
+    assert sum(run.sizes) == 8 and max(run.sizes) > 1
+    stats = batcher.stats()
+    assert stats["items"] == 8 and stats["failed_batches"] == 0
+
+
+def test_one_bad_item_only_fails_its_own_caller():
+    run = Recorder()
+    batcher = InferenceBatcher(run, max_batch_size=4, max_wait_ms=200, name="test")
+    futures = dict(zip([1, "bad", 3, 4], submit_together(batcher, [1, "bad", 3, 4])))
+
+    with pytest.raises(ValueError):
+        futures["bad"].result(timeout=5)
+    assert [futures[i].result(timeout=5) for i in (1, 3, 4)] == [2, 6, 8]
+    assert batcher.stats()["failed_items"] == 1
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = InferenceBatcher(lambda items: [], max_batch_size=1, max_wait_ms=0, name="test")
+    with pytest.raises(RuntimeError):
+        batcher.infer(1, timeout=5)
+    # The worker survives and keeps serving
+    batcher.run_batch = lambda items: items
+    assert batcher.infer(7, timeout=5) == 7
+
+
+def test_cancelled_callers_are_skipped():
+    gate = threading.Event()
+    seen = []
+
+    def run(items):
+        gate.wait(5)
+        seen.extend(items)
+        return items
+
+    batcher = InferenceBatcher(run, max_batch_size=1, max_wait_ms=0, name="test")
+    first = batcher.submit("first")
+    time.sleep(0.05)
+    second = batcher.submit("second")
+    assert second.cancel()
+    gate.set()
+    assert first.result(timeout=5) == "first"
+    assert batcher.infer("third", timeout=5) == "third"
+    assert seen == ["first", "third"]
@@ -0,0 +1,126 @@
+# tests/test_blobstore.py
+
+import hashlib
+
+import pytest
+
+from backend import blobstore, phash
+from backend.blobstore import BlobStore
+from backend.uploads import StoredUpload
+
+
+@pytest.fixture
+def store(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(blobstore, "BLOB_MIN_IDLE_SECONDS", 600)
+    monkeypatch.setattr(blobstore, "BLOB_ORPHAN_GRACE_SECONDS", 3600)
+    monkeypatch.setattr(blobstore, "BLOB_MAX_AGE_DAYS", 30)
+    monkeypatch.setattr(blobstore, "BLOB_BUDGET_BYTES", 0)
+    return BlobStore(tmp_path / "uploads", pool=None)
+
+
+def put(store, data: bytes, name="photo.jpg"):
+    tmp = store.root / f".incoming-{hashlib.md5(data).hexdigest()}"
+    tmp.write_bytes(data)
+    return store.put(StoredUpload(tmp, len(data), hashlib.sha256(data).hexdigest()), name)
+
+
+def blob(db, path):
+    with db.get_storage().reader() as conn:
+        row = conn.execute("SELECT * FROM blobs WHERE path = ?", (str(path),)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def age(db, path, days):
+    db.get_storage().write(
+        lambda conn: conn.execute(
+            "UPDATE blobs SET last_used_at = datetime('now', ?) WHERE path = ?", (f"-{days} days", str(path))
+        )
+    )
+
+
+def test_identical_uploads_share_one_blob_and_count_references(db, store):
+    first = put(store, b"same bytes")
+    second = put(store, b"same bytes", name="other.png")
+    assert first == second and first.suffix == ".jpg"
+    assert store.stored == 1 and store.deduplicated == 1
+
+    db.save_events([("u1", "tg", "image", 10.0, "low_risk", str(first))] * 2)
+    db.save_event("u2", "tg", "text", 10.0, "low_risk", "")
+    assert blob(db, first)["refcount"] == 2
+
+
+def test_sweep_drops_old_orphans_but_not_recent_ones(db, store):
+    old, fresh = put(store, b"old orphan"), put(store, b"fresh orphan")
+    age(db, old, 1)
+
+    result = store.sweep()
+    assert result["evicted"] == 1
+    assert not old.exists() and blob(db, old) is None
+    assert fresh.exists() and blob(db, fresh) is not None
+
+
+def test_evicting_referenced_blob_releases_its_references(db, store):
+    kept, expired = put(store, b"recent"), put(store, b"expired")
+    ids = db.save_events([
+        ("u1", "tg", "image", 80.0, "high_risk", str(kept)),
+        ("u1", "tg", "image", 90.0, "high_risk", str(expired)),
+    ])
+    db.save_cached_result("h" * 64, "v1", "image", 90.0, "[]", str(expired))
+    age(db, kept, 2)
+    age(db, expired, 31)
+
+    assert store.sweep()["evicted"] == 1
+    assert not expired.exists() and blob(db, expired) is None
+    assert db.get_event(ids[1])["file_path"] is None
+    assert db.get_cached_result("h" * 64, "v1")["file_path"] is None
+    # Under the age limit and referenced: untouched
+    assert kept.exists() and db.get_event(ids[0])["file_path"] == str(kept)
+    assert blob(db, kept)["refcount"] == 1
+
+
+def test_budget_evicts_orphans_before_referenced_blobs(db, store, monkeypatch):
+    referenced = put(store, b"r" * 100)
+    orphan = put(store, b"o" * 100)
+    db.save_event("u1", "tg", "image", 10.0, "low_risk", str(referenced))
+    age(db, orphan, 1)
+    age(db, referenced, 2)  # older, but still referenced
+
+    monkeypatch.setattr(blobstore, "BLOB_BUDGET_BYTES", 150)
+    monkeypatch.setattr(blobstore, "BLOB_ORPHAN_GRACE_SECONDS", 10 * 86400)
+    result = store.sweep()
+    assert result["evicted"] == 1 and result["bytes"] == 100
+    assert referenced.exists() and not orphan.exists()
+
+
+def test_recently_used_blobs_are_never_evicted(db, store, monkeypatch):
+    path = put(store, b"in use")
+    monkeypatch.setattr(blobstore, "BLOB_BUDGET_BYTES", 1)
+    assert store.sweep()["evicted"] == 0
+    assert path.exists()
+
+
+def test_evicting_a_blob_prunes_its_near_duplicate_hashes(db, store):
+    phash.get_near_duplicate_index.cache_clear()
+    index = phash.get_near_duplicate_index()
+    old, kept = put(store, b"old image"), put(store, b"kept image")
+    index.add(0xF0F0, "v1", 90.0, [], str(old))
+    index.add(0x0F0F, "v1", 10.0, [], str(kept))
+    age(db, old, 1)
+
+    assert store.sweep()["evicted"] == 1
+    assert [row["file_path"] for row in db.load_image_hashes()] == [str(kept)]
+    assert index.lookup(0xF0F0, "v1") is None
+    assert index.lookup(0x0F0F, "v1")["score"] == 10.0
+    phash.get_near_duplicate_index.cache_clear()
+
+
+def test_reference_release_uses_the_file_path_indexes(db):
+    statements = [
+        (db.RELEASE_EVENT_SQL, 1),
+        (db.release_cache_sql("result_cache", 3), 3),
+        (db.prune_image_hashes_sql(3), 3),
+    ]
+    with db.get_storage().reader() as conn:
+        for sql, params in statements:
+            plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", ["x"] * params))
+            assert "USING INDEX" in plan and "SCAN" not in plan, (sql, plan)
@@ -0,0 +1,81 @@
+# tests/test_cascade.py
+
+import io
+
+import pytest
+from PIL import Image, PngImagePlugin
+
+from backend.cascade import Cascade, ImageInput, Stage, score_metadata
+
+_EXIF_SOFTWARE = 0x0131
+
+
+def png(**text):
+    info = PngImagePlugin.PngInfo()
+    for key, value in text.items():
+        info.add_text(key, value)
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), (120, 80, 40)).save(buf, format="PNG", pnginfo=info)
+    return ImageInput(data=buf.getvalue())
+
+
+def jpeg(software=None, xmp=None):
+    exif = Image.Exif()
+    if software:
+        exif[_EXIF_SOFTWARE] = software
+    buf = io.BytesIO()
+    kwargs = {"xmp": xmp} if xmp else {}
+    Image.new("RGB", (8, 8), (120, 80, 40)).save(buf, format="JPEG", exif=exif, **kwargs)
+    return ImageInput(data=buf.getvalue())
+
+
+@pytest.mark.parametrize("item", [
+    png(parameters="a cat\nNegative prompt: blurry\nSteps: 20, Sampler: Euler a, CFG scale: 7, Seed: 1"),
+    png(prompt='{"3": {"class_type": "KSampler", "inputs": {}}}'),
+    png(Software="ComfyUI"),
+    png(invokeai_metadata="{}"),
+    jpeg(software="Stable Diffusion"),
+    jpeg(xmp=b'<x:xmpmeta><rdf:Description xmp:CreatorTool="Adobe Firefly"/></x:xmpmeta>'),
+])
+def test_generator_metadata_is_flagged(item):
+    score, highlights = score_metadata(item)
+    assert score == 97.0 and highlights[0]["type"] == "metadata"
+
+
+def test_ai_source_type_is_flagged():
+    item = jpeg(xmp=b"<Iptc4xmpExt:DigitalSourceType>http://cv.iptc.org/newscodes/digitalsourcetype/trainedAlgorithmicMedia</Iptc4xmpExt:DigitalSourceType>")
+    assert score_metadata(item)[0] == 99.0
+
+
+@pytest.mark.parametrize("item", [
+    png(Comment="an influx of visitors, labelled with imagenet classes"),
+    png(Software="Influx Exporter"),
+    png(Software="imagenet-tools"),
+    png(dream="sweet dreams"),
+    png(parameters="width=8 height=8"),
+    png(Title="Made with Midjourney"),
+    jpeg(software="Adobe Photoshop 25.0"),
+    jpeg(),
+])
+def test_lookalike_metadata_abstains(item):
+    assert score_metadata(item) is None
+
+
+def test_cascade_stops_at_first_confident_stage():
+    calls = []
+
+    def stage(name, score):
+        def fn(item):
+            calls.append(name)
+            return score
+        return Stage(name, fn, margin=10)
+
+    cascade = Cascade([stage("cheap", None), stage("mid", (70.0, [])), stage("full", (5.0, []))], low=40, high=75)
+    assert cascade.run(ImageInput(data=b"")) == (5.0, [])
+    assert calls == ["cheap", "mid", "full"]
+
+    calls.clear()
+    cascade = Cascade([stage("mid", (95.0, [])), stage("full", (5.0, []))], low=40, high=75)
+    assert cascade.run(ImageInput(data=b"")) == (95.0, [])
+    assert calls == ["mid"]
+    assert cascade.stats()["decided_early"] == 1
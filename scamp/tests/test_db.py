@@ -0,0 +1,53 @@
+# tests/test_db.py
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+def row(i, label="low_risk"):
+    return (f"u{i % 3}", "telegram", "text", float(i), label, "", ["otp"] if i % 2 else None)
+
+
+def test_concurrent_inserts_get_their_own_ids(db):
+    with ThreadPoolExecutor(16) as ex:
+        results = list(ex.map(lambda i: (i, db.save_events([row(i), row(i)])), range(40)))
+    ids = sorted(i for _, pair in results for i in pair)
+    assert ids == list(range(1, 81))
+    for i, pair in results:
+        assert pair[1] == pair[0] + 1
+        assert db.get_event(pair[0])["score"] == float(i)
+
+
+def test_failing_write_does_not_fail_its_group(db):
+    storage = db.get_storage()
+
+    def bad(conn):
+        conn.execute("INSERT INTO no_such_table VALUES (1)")
+
+    with ThreadPoolExecutor(8) as ex:
+        good = [ex.submit(db.save_event, "u", "tg", "text", 1.0, "low_risk", "") for _ in range(6)]
+        failing = ex.submit(storage.write, bad)
+        assert all(f.result(timeout=5) > 0 for f in good)
+        with pytest.raises(sqlite3.OperationalError):
+            failing.result(timeout=5)
+
+
+def test_writer_survives_errors_outside_the_retry(db, monkeypatch):
+    storage = db.get_storage()
+    original = storage._commit_group
+    calls = []
+
+    def broken_once(conn, group):
+        calls.append(len(group))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("cannot rollback - no transaction is active")
+        return original(conn, group)
+
+    monkeypatch.setattr(storage, "_commit_group", broken_once)
+    with pytest.raises(sqlite3.OperationalError):
+        db.save_event("u", "tg", "text", 1.0, "low_risk", "")
+    # The writer thread is still alive and serving
+    assert storage._writer.is_alive()
+    assert db.save_event("u", "tg", "text", 2.0, "low_risk", "") > 0
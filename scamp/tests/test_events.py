@@ -0,0 +1,81 @@
+# tests/test_events.py
+
+import pytest
+
+from backend.events import (
+    EventQueryError,
+    decode_cursor,
+    encode_cursor,
+    parse_event_filters,
+    parse_stats_window,
+)
+
+
+def test_filters_convert_offsets_to_utc():
+    offset = parse_event_filters(since="2026-01-01T10:00:00+05:30", until="2026-01-01T02:00:00-03:00")
+    zulu = parse_event_filters(since="2026-01-01T04:30:00Z", until="2026-01-01T05:00:00Z")
+    assert offset["since"] == zulu["since"] == "2026-01-01 04:30:00"
+    assert offset["until"] == zulu["until"] == "2026-01-01 05:00:00"
+
+
+def test_filters_take_naive_times_as_utc():
+    assert parse_event_filters(since="2026-01-01T04:30:00")["since"] == "2026-01-01 04:30:00"
+
+
+def test_stats_window_converts_offsets_before_truncating():
+    offset = parse_stats_window(since="2026-01-01T10:45:00+05:30", until="2026-01-02T01:00:00+05:30")
+    zulu = parse_stats_window(since="2026-01-01T05:15:00Z", until="2026-01-01T19:30:00Z")
+    assert offset == zulu == ("2026-01-01 05:00:00", "2026-01-01 19:00:00", "hour")
+
+
+def test_stats_window_widens_long_windows_to_days():
+    assert parse_stats_window(since="2026-01-01T10:00:00Z", until="2026-01-05T03:00:00Z") == (
+        "2026-01-01 00:00:00", "2026-01-06 00:00:00", "day",
+    )
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"since": "yesterday"},
+    {"risk": "extreme"},
+    {"media_type": "video"},
+])
+def test_bad_filters_raise(kwargs):
+    with pytest.raises(EventQueryError):
+        parse_event_filters(**kwargs)
+
+
+def test_stats_window_rejects_inverted_range():
+    with pytest.raises(EventQueryError):
+        parse_stats_window(since="2026-01-02T00:00:00Z", until="2026-01-01T00:00:00Z")
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"created_at": "2026-01-01 04:30:00", "id": 42})
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2026-01-01 04:30:00", 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24", encode_cursor({"created_at": "x", "id": "y"})])
+def test_bad_cursor_raises(cursor):
+    with pytest.raises(EventQueryError):
+        decode_cursor(cursor)
+
+
+def test_keyset_pages_cover_every_event_once(db):
+    ids = db.save_events([("u1", "telegram", "text", float(i), "low_risk", None) for i in range(7)])
+    db.save_event("u2", "telegram", "text", 90.0, "high_risk", None)
+
+    seen, before = [], None
+    while True:
+        page = db.query_events(before=before, limit=3, user_id="u1")
+        if not page:
+            break
+        seen.extend(event["id"] for event in page)
+        before = decode_cursor(encode_cursor(page[-1]))
+
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_risk_filter_maps_bands_and_the_insufficient_speech_status():
+    assert parse_event_filters(risk="High")["label"] == "high_risk"
+    assert parse_event_filters(risk="insufficient_speech")["label"] == "insufficient_speech"
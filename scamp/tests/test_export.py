@@ -0,0 +1,81 @@
+# tests/test_export.py
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import export
+from backend.export import combined_pdf_path, iter_combined_pdf
+from backend.workers import InferencePool
+
+
+@pytest.fixture
+def renderer(db, monkeypatch):
+    """Combined exports rendered by a gated fake in a thread, not a process."""
+    started, release = threading.Event(), threading.Event()
+
+    def render(events, out_path):
+        started.set()
+        release.wait(5)
+        with open(out_path, "wb") as f:
+            f.write(b"%PDF-" + b"x" * 1000)
+        return out_path
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    pool = InferencePool({"io": 2}, queue_size=8)
+    monkeypatch.setattr(export, "get_export_executor", lambda: executor)
+    monkeypatch.setattr(export, "render_combined", render)
+    monkeypatch.setattr(export, "EXPORT_CHUNK_BYTES", 100)
+    try:
+        yield pool, started, release
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+        pool.shutdown()
+
+
+def test_finished_export_removes_its_temp_file(renderer, tmp_path):
+    pool, _, release = renderer
+    release.set()
+    tmp = combined_pdf_path(tmp_path)
+
+    async def scenario():
+        return b"".join([chunk async for chunk in iter_combined_pdf(pool, tmp, {})])
+
+    assert asyncio.run(scenario()).startswith(b"%PDF-")
+    assert not tmp.exists()
+
+
+def test_client_leaving_mid_stream_removes_the_temp_file(renderer, tmp_path):
+    pool, _, release = renderer
+    release.set()
+    tmp = combined_pdf_path(tmp_path)
+
+    async def scenario():
+        body = iter_combined_pdf(pool, tmp, {})
+        await body.__anext__()
+        assert tmp.exists()
+        await body.aclose()
+
+    asyncio.run(scenario())
+    assert not tmp.exists()
+
+
+def test_client_leaving_mid_render_removes_the_file_once_written(renderer, tmp_path):
+    pool, started, release = renderer
+    tmp = combined_pdf_path(tmp_path)
+
+    async def scenario():
+        task = asyncio.create_task(iter_combined_pdf(pool, tmp, {}).__anext__())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    # The render outlives the request; its file goes as soon as it lands
+    release.set()
+    export.get_export_executor().shutdown(wait=True)
+    assert not tmp.exists()
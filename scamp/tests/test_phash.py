@@ -0,0 +1,77 @@
+# tests/test_phash.py
+
+import io
+
+import pytest
+from PIL import Image, ImageFilter
+
+from backend import phash, preprocess
+from backend.phash import BKTree, dhash, hamming
+from backend.preprocess import ImageTooLarge
+
+
+def encoded(img, fmt="JPEG", **kwargs):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def photo():
+    return Image.radial_gradient("L").resize((320, 240)).convert("RGB")
+
+
+def test_recompressed_and_resized_copies_stay_close(photo):
+    original = dhash(encoded(photo, quality=95))
+    copy = dhash(encoded(photo.resize((160, 120)), quality=40))
+    other = dhash(encoded(Image.effect_noise((320, 240), 80).convert("RGB")))
+    assert hamming(original, copy) <= phash.PHASH_MAX_DISTANCE
+    assert hamming(original, other) > phash.PHASH_MAX_DISTANCE
+
+
+def test_oversized_images_are_rejected_before_decoding(photo, monkeypatch):
+    monkeypatch.setattr(preprocess, "MAX_IMAGE_PIXELS", 100)
+    with pytest.raises(ImageTooLarge):
+        dhash(encoded(photo))
+
+
+def test_pixel_cap_leaves_pillows_global_limit_alone(photo, monkeypatch):
+    # Pillow's own default, untouched by importing the backend
+    assert Image.MAX_IMAGE_PIXELS == int(1024 * 1024 * 1024 // 4 // 3)
+    # A stricter Pillow limit set elsewhere still surfaces as ImageTooLarge
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    with pytest.raises(ImageTooLarge):
+        dhash(encoded(photo))
+
+
+def test_bk_tree_returns_the_nearest_match_within_radius():
+    tree = BKTree()
+    for value in (0b0000, 0b0111, 0b1111_0000, 0b1111_1111):
+        tree.add(value, f"payload-{value}")
+    assert tree.nearest(0b0011, 2) == (1, "payload-7")
+    assert tree.nearest(0b1100_1100, 2) is None
+
+
+def test_bk_tree_removal_leaves_tombstones_until_compacted():
+    tree = BKTree()
+    for value in range(8):
+        tree.add(value, {"file_path": f"f{value}"})
+    for value in range(5):
+        assert tree.remove(value, lambda p: True)
+    assert not tree.remove(5, lambda p: False)
+    assert tree.size == 3 and tree.dead == 5
+    # Removed entries still route the search, but are never returned
+    assert tree.nearest(3, 1) == (1, {"file_path": "f7"})
+    assert all(tree.nearest(v, 0) is None for v in range(5))
+
+    assert tree.compact()
+    assert tree.size == 3 and tree.dead == 0
+    assert tree.nearest(7, 0) == (0, {"file_path": "f7"})
+
+
+def test_reindexing_the_same_file_adds_no_row(db):
+    for _ in range(3):
+        db.save_image_hash("ab" * 8, "v1", 80.0, "[]", "/uploads/x.jpg")
+    db.save_image_hash("ab" * 8, "v2", 80.0, "[]", "/uploads/x.jpg")
+    db.save_image_hash("ab" * 8, "v1", 80.0, "[]", "/uploads/y.jpg")
+    assert len(db.load_image_hashes()) == 3
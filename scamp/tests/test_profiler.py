@@ -0,0 +1,12 @@
+# tests/test_profiler.py
+
+from backend.profiler import Profiler
+
+
+def test_only_the_exact_token_triggers_a_profile():
+    profiler = Profiler(sample_rate=0.0, token="s3cret")
+    assert profiler.wants("/analyze", "s3cret") == "header"
+    for header in (None, "", "s3cre", "s3cret ", "ß3cret"):
+        assert profiler.wants("/analyze", header) is None
+    assert profiler.wants("/events", "s3cret") is None
+    assert Profiler(sample_rate=0.0, token="").wants("/analyze", "") is None
@@ -0,0 +1,70 @@
+# tests/test_report_store.py
+
+import asyncio
+
+import pytest
+
+from backend import report_store
+from backend.report_store import EventNotFound, ReportStore
+from backend.reporting import REPORT_TEMPLATE_VERSION
+
+
+class FakePool:
+    """Runs lane jobs in the default executor; optionally holds renders until released."""
+
+    def __init__(self, events):
+        self.events = events
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def run(self, lane, fn, *args):
+        if lane == "report":
+            await self.release.wait()
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    events = {1: {"id": 1, "media_type": "text", "platform": "test"}}
+    monkeypatch.setattr(report_store, "get_event", events.get)
+    monkeypatch.setattr(ReportStore, "_render", lambda self, event, path: path.write_bytes(b"%PDF") and path)
+    return ReportStore(tmp_path, FakePool(events))
+
+
+def test_purge_only_removes_older_cached_versions(store, tmp_path):
+    keep = [
+        "scamp_report_9.pdf",  # hand-made / tracked reports without a version
+        f"scamp_report_1.{REPORT_TEMPLATE_VERSION}.pdf",
+        "other.report-v0.pdf",
+    ]
+    stale = ["scamp_report_1.report-v0.pdf", "scamp_report_22.old.pdf"]
+    for name in keep + stale:
+        (tmp_path / name).write_bytes(b"%PDF")
+
+    assert store.purge_stale() == len(stale)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(keep)
+
+
+def test_cancelled_caller_does_not_fail_other_waiters(store):
+    async def scenario():
+        store.pool.release.clear()
+        first = asyncio.create_task(store.ensure(1))
+        second = asyncio.create_task(store.ensure(1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        store.pool.release.set()
+        path = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return path
+
+    path = asyncio.run(scenario())
+    assert path == store.path_for(1) and path.exists()
+    assert store.renders == 1 and not store._inflight
+
+
+def test_missing_event_raises(store):
+    with pytest.raises(EventNotFound):
+        asyncio.run(store.ensure(2))
+    assert store.failures == 0
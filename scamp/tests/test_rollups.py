@@ -0,0 +1,86 @@
+# tests/test_rollups.py
+
+import json
+from datetime import datetime, timedelta
+
+from backend import rollups
+from backend.rollups import apply_event_range, downsample, query_rollups
+
+FMT = "%Y-%m-%d %H:00:00"
+
+
+def add_events(db, events):
+    """Insert (created_at, platform, media_type, score, band, signals) rows and roll them up."""
+
+    def insert(conn):
+        first = None
+        for created_at, platform, media_type, score, band, signals in events:
+            cur = conn.execute(
+                """
+                INSERT INTO events (user_id, platform, media_type, score, label, file_path, created_at, signals)
+                VALUES ('u', ?, ?, ?, ?, '', ?, ?)
+                """,
+                (platform, media_type, score, f"{band}_risk", created_at, json.dumps(signals) if signals else None),
+            )
+            first = first or cur.lastrowid
+        apply_event_range(conn, first, cur.lastrowid)
+
+    db.get_storage().write(insert)
+
+
+def stats(db, since, until, **kwargs):
+    with db.get_storage().reader() as conn:
+        return query_rollups(conn, since, until, **kwargs)
+
+
+def test_hourly_buckets_merge_counts_bands_and_signals(db):
+    add_events(db, [
+        ("2026-01-01 10:05:00", "telegram", "text", 90.0, "high", ["otp", "link"]),
+        ("2026-01-01 10:55:00", "telegram", "image", 10.0, "low", None),
+        ("2026-01-01 11:00:00", "web", "text", 50.0, "medium", ["otp"]),
+    ])
+    # A second batch landing in an existing bucket adds to it
+    add_events(db, [("2026-01-01 10:30:00", "telegram", "text", 100.0, "high", ["otp"])])
+
+    result = stats(db, "2026-01-01 10:00:00", "2026-01-01 12:00:00")
+    assert [(p["bucket"], p["count"], p["bands"]) for p in result["series"]] == [
+        ("2026-01-01 10:00:00", 3, {"high": 2, "low": 1}),
+        ("2026-01-01 11:00:00", 1, {"medium": 1}),
+    ]
+    assert result["total"]["count"] == 4 and result["total"]["avg_score"] == 62.5
+    assert result["total"]["histogram"] == [0, 1, 0, 0, 0, 1, 0, 0, 0, 2]
+    assert result["by_platform"] == {"telegram": 3, "web": 1}
+    assert result["top_signals"][0] == {"signal": "otp", "count": 3, "high": 2}
+
+    only_web = stats(db, "2026-01-01 10:00:00", "2026-01-01 12:00:00", platform="web")
+    assert only_web["total"]["count"] == 1
+
+    daily = stats(db, "2026-01-01 00:00:00", "2026-01-02 00:00:00", resolution="day")
+    assert [(p["bucket"], p["count"]) for p in daily["series"]] == [("2026-01-01 00:00:00", 4)]
+
+
+def test_downsample_merges_into_aligned_wider_buckets():
+    start = datetime(2026, 1, 1)
+    points = [
+        {"bucket": (start + timedelta(hours=h)).strftime(FMT), "count": 1, "score_sum": float(h), "bands": {"low": 1}}
+        for h in range(0, 10)
+    ]
+    merged, step = downsample(points, start.strftime(FMT), (start + timedelta(hours=10)).strftime(FMT),
+                              FMT, timedelta(hours=1), max_points=4)
+    assert step == timedelta(hours=3)
+    assert [(p["bucket"][11:13], p["count"], p["score_sum"]) for p in merged] == [
+        ("00", 3, 3.0), ("03", 3, 12.0), ("06", 3, 21.0), ("09", 1, 9.0),
+    ]
+
+
+def test_rebuild_matches_incremental_rollups(db):
+    db.save_events([(f"u{i}", ("telegram", "web")[i % 2], "text", float(i * 7 % 101), "low_risk", "", ["otp"])
+                    for i in range(50)])
+    db.save_events([("u", "web", "image", 88.0, "high_risk", "")] * 5)
+    now = datetime.utcnow()
+    window = ((now - timedelta(hours=2)).strftime(FMT), (now + timedelta(hours=2)).strftime(FMT))
+
+    incremental = stats(db, *window)
+    assert rollups.rebuild(db.get_storage(), chunk=7, pause=0) == 55
+    assert stats(db, *window) == incremental
+    assert incremental["total"]["count"] == 55
@@ -0,0 +1,75 @@
+# tests/test_rules.py
+
+import re
+
+import pytest
+
+from backend.rules import DEFAULT_RULESET, CompiledRuleset
+
+LEGACY_WEIGHTS = {"kyc": 10, "otp": 20, "bank": 10, "link": 15, "urgency": 15, "threat": 20, "upi": 10, "refund": 10}
+
+
+def legacy_analyze_text(text):
+    """The hand-written scorer the compiled ruleset replaced: (score, sorted signal types)."""
+    text_lower = text.lower()
+    types = []
+    checks = [
+        (["kyc", "video kyc"], "kyc"),
+        (["otp", "one time password"], "otp"),
+        (["net banking", "upi", "imps", "rtgs", "neft", "account freeze", "account block"], "bank"),
+        ([
+            "within 15 minutes", "within 30 minutes", "immediately", "right now",
+            "or your account will be blocked", "or it will be blocked", "to avoid fir",
+        ], "urgency"),
+        (["refund", "prize", "lottery", "cashback"], "refund"),
+    ]
+    for phrases, htype in checks:
+        types.extend(htype for phrase in phrases if phrase in text_lower)
+    types.extend("link" for _ in re.finditer(r"https?://\S+", text))
+    score = sum(LEGACY_WEIGHTS.get(t, 5) for t in types)
+    return score, sorted(types)
+
+
+SAMPLES = [
+    "",
+    "Hello, see you tomorrow",
+    "Your KYC is pending. Complete video KYC immediately or your account will be blocked",
+    "Share the OTP (one time password) right now to avoid FIR",
+    "Refund of Rs 500 via UPI / IMPS / NEFT / RTGS, claim at http://x.example/a and https://y.example/b",
+    "Net banking account freeze! account block within 15 minutes, within 30 minutes at most",
+    "You won a lottery prize with cashback; otp otp otp kyc KYC",
+    "İstanbul KYC update: http://evil.example/İ",
+]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_default_ruleset_matches_legacy_scorer(text):
+    score, highlights = CompiledRuleset(DEFAULT_RULESET).scan(text)
+    legacy_score, legacy_types = legacy_analyze_text(text)
+    assert score == legacy_score
+    assert sorted(h["type"] for h in highlights) == legacy_types
+
+
+def test_highlight_offsets_point_into_original_text():
+    text = "İİ then KYC and http://a.example"
+    _, highlights = CompiledRuleset(DEFAULT_RULESET).scan(text)
+    for h in highlights:
+        assert text[h["start"]:h["end"]] == h["span"]
+    assert [h["span"] for h in highlights] == ["KYC", "http://a.example"]
+
+
+@pytest.mark.parametrize("ruleset", [
+    [],
+    {"weights": [1]},
+    {"weights": {"kyc": "ten"}},
+    {"default_weight": "5"},
+    {"keywords": ["kyc"]},
+    {"keywords": {"phrase": "kyc"}},
+    {"keywords": [{"phrase": 5}]},
+    {"keywords": [{"type": "kyc"}]},
+    {"patterns": ["https?://"]},
+    {"patterns": [{"regex": "("}]},
+])
+def test_malformed_rulesets_raise_value_error(ruleset):
+    with pytest.raises(ValueError):
+        CompiledRuleset(ruleset)
@@ -0,0 +1,136 @@
+# tests/test_uploads.py
+
+import hashlib
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from backend import uploads
+from backend.uploads import UploadFormError, UploadSizeLimitMiddleware, UploadTooLarge, receive_upload
+from backend.workers import InferencePool
+
+MAX_BYTES = 64 * 1024
+BOUNDARY = "scamptestboundary"
+
+
+@pytest.fixture
+def upload_app(tmp_path, monkeypatch):
+    # Small chunks so even the test payloads take several writes
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_BYTES", 4 * 1024)
+    pool = InferencePool({"io": 2}, queue_size=8)
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_BYTES, paths={"/upload"})
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            form = await receive_upload(request, tmp_path, pool, max_bytes=MAX_BYTES)
+        except UploadTooLarge:
+            return JSONResponse(status_code=413, content={"error": "too large"})
+        except UploadFormError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        stored = form.upload
+        data = stored.tmp_path.read_bytes()
+        stored.discard()
+        return {
+            "fields": form.fields,
+            "filename": form.filename,
+            "size": stored.size,
+            "sha256": stored.sha256,
+            "written": hashlib.sha256(data).hexdigest(),
+        }
+
+    try:
+        yield TestClient(app), tmp_path
+    finally:
+        pool.shutdown()
+
+
+def multipart_body(payload: bytes, fields=(("media_type", "image"),)) -> bytes:
+    parts = []
+    for name, value in fields:
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    parts.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="a.jpg"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n".encode()
+    )
+    parts.append(payload)
+    parts.append(f"\r\n--{BOUNDARY}--\r\n".encode())
+    return b"".join(parts)
+
+
+def chunked(body: bytes, size: int = 8 * 1024):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+HEADERS = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+def leftovers(tmp_path):
+    return list(tmp_path.glob(".incoming-*"))
+
+
+def test_upload_is_streamed_to_disk_and_hashed(upload_app):
+    client, tmp_path = upload_app
+    payload = bytes(range(256)) * 160  # 40 KB, spans several chunk writes
+    response = client.post("/upload", content=chunked(multipart_body(payload)), headers=HEADERS)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["fields"] == {"media_type": "image"}
+    assert body["filename"] == "a.jpg"
+    assert body["size"] == len(payload)
+    assert body["sha256"] == body["written"] == hashlib.sha256(payload).hexdigest()
+    assert leftovers(tmp_path) == []
+
+
+def test_declared_length_over_limit_is_rejected_up_front(upload_app):
+    client, tmp_path = upload_app
+    body = multipart_body(b"x" * (MAX_BYTES + uploads.MULTIPART_OVERHEAD_BYTES + 1))
+    response = client.post("/upload", content=body, headers=HEADERS)
+
+    assert response.status_code == 413
+    assert leftovers(tmp_path) == []
+
+
+def test_chunked_body_over_limit_is_rejected_and_cleaned_up(upload_app):
+    client, tmp_path = upload_app
+    # No Content-Length: only the middleware's running count can stop it
+    body = multipart_body(b"x" * (MAX_BYTES + uploads.MULTIPART_OVERHEAD_BYTES + 1))
+    response = client.post("/upload", content=chunked(body), headers=HEADERS)
+
+    assert response.status_code == 413
+    assert "error" in response.json()
+    assert leftovers(tmp_path) == []
+
+
+def test_file_part_over_limit_is_rejected_and_cleaned_up(upload_app):
+    client, tmp_path = upload_app
+    # Within the middleware's slack, but the file part itself is too big
+    body = multipart_body(b"x" * (MAX_BYTES + 1))
+    response = client.post("/upload", content=chunked(body), headers=HEADERS)
+
+    assert response.status_code == 413
+    assert leftovers(tmp_path) == []
+
+
+def test_truncated_body_is_rejected_and_cleaned_up(upload_app):
+    client, tmp_path = upload_app
+    body = multipart_body(b"y" * 20_000)
+    response = client.post("/upload", content=chunked(body[:-40]), headers=HEADERS)
+
+    assert response.status_code == 400
+    assert leftovers(tmp_path) == []
+
+
+def test_non_multipart_body_is_rejected(upload_app):
+    client, tmp_path = upload_app
+    response = client.post("/upload", content=b"{}", headers={"content-type": "application/json"})
+
+    assert response.status_code == 400
+    assert leftovers(tmp_path) == []
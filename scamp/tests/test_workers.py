@@ -0,0 +1,87 @@
+# tests/test_workers.py
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from backend.workers import InferencePool, PoolSaturated
+
+
+def test_cancelled_job_keeps_its_slot_until_it_finishes():
+    pool = InferencePool({"io": 1}, queue_size=0)
+    lane = pool.lane("io")
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def scenario():
+        task = asyncio.create_task(pool.run("io", blocking))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The job is still running: the lane must not admit another one
+        assert lane.stats()["pending"] == 1
+        with pytest.raises(PoolSaturated):
+            await pool.run("io", lambda: None)
+
+        release.set()
+        for _ in range(100):
+            if lane.stats()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        return await pool.run("io", lambda: "next")
+
+    try:
+        assert asyncio.run(scenario()) == "next"
+        stats = lane.stats()
+        assert stats["pending"] == 0 and stats["rejected"] == 1 and stats["completed"] == 2
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_failed_job_is_counted_and_raised():
+    pool = InferencePool({"text": 2}, queue_size=1)
+
+    def boom():
+        raise KeyError("x")
+
+    try:
+        with pytest.raises(KeyError):
+            asyncio.run(pool.run("text", boom))
+        stats = pool.lane("text").stats()
+        assert stats["failed"] == 1 and stats["pending"] == 0
+    finally:
+        pool.shutdown()
+
+
+_INITIALIZED = []
+
+
+def _mark_initialized():
+    _INITIALIZED.append(os.getpid())
+
+
+def _initialized_in_this_process():
+    return os.getpid(), _INITIALIZED == [os.getpid()]
+
+
+def test_process_workers_run_the_initializer_once_each():
+    pool = InferencePool({"image": 2}, queue_size=4, image_executor="process", image_initializer=_mark_initialized)
+
+    async def scenario():
+        return await asyncio.gather(*(pool.run("image", _initialized_in_this_process) for _ in range(6)))
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        pool.shutdown(wait=True)
+    assert all(ready for _, ready in results)
+    assert os.getpid() not in {pid for pid, _ in results}